@@ -14,6 +14,7 @@ setup(
 		'dcamp',
 		'dcamp.role',
 		'dcamp.service',
+		'dcamp.store',
 		'dcamp.types',
 		'dcamp.types.messages',
 		'dcamp.util',
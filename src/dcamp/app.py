@@ -7,6 +7,7 @@ from dcamp.types.messages.control import ASSIGN, POLO, STOP
 from dcamp.types.messages.topology import gen_uuid, MARCO
 from dcamp.types.specs import EndpntSpec
 from dcamp.role.base import Base
+from dcamp.role.host import Host
 
 
 class App:
@@ -33,6 +34,8 @@ class App:
         result = 0
         if 'base' == self.args.cmd:
             result = self._exec_base()
+        elif 'host' == self.args.cmd:
+            result = self._exec_host()
         elif 'root' == self.args.cmd:
             result = self._exec_root()
 
@@ -97,14 +100,22 @@ class App:
         del pub, rep
 
     def _exec_base(self):
+        return self._play(Base, self.args.address, gen_uuid(), self.args.runtime)
+
+    def _exec_host(self):
+        return self._play(Host, self.args.address, gen_uuid(), self.args.nodes,
+                          self.args.runtime)
+
+    def _play(self, role_cls, *args):
         # pair socket for controlling Role; not used here
         pipe, peer = zpipe(self.ctx)
 
         try:
-            role = Base(peer, self.args.address, gen_uuid())
+            role = role_cls(peer, *args)
             peer = None  # closed by peer
         except ZMQError as e:
-            self.logger.debug('exception while starting base role:', exc_info=True)
+            self.logger.debug('exception while starting %s role:' % role_cls.__name__,
+                              exc_info=True)
             self.logger.error('Unable to start base node: %s' % e)
             self.logger.error('Is one already running on the given address?')
             return -1
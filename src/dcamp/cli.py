@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 import logging
+import sys
 from argparse import ArgumentParser, ArgumentTypeError, FileType
 
 from dcamp.app import App
+from dcamp.service.runtime import RUNTIMES
 from dcamp.types.config_file import ConfigFileMixin, ParsingError
 from dcamp.types.specs import EndpntSpec
+import dcamp.util.datalog as datalog
+from dcamp.util.trace import MsgTracer
 
 
 def address(string):
@@ -14,6 +18,28 @@ def address(string):
         raise ArgumentTypeError(e)
 
 
+def count(string):
+    try:
+        value = int(string)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise ArgumentTypeError('must be a positive integer: %s' % string)
+    return value
+
+
+def trace_every(string):
+    (name, sep, every) = string.partition('=')
+    try:
+        every = int(every) if sep else 1
+    except ValueError:
+        every = 0
+    if not name or every < 1:
+        raise ArgumentTypeError('must be a message type, optionally followed by =N: %s' %
+                                string)
+    return name, every
+
+
 def main():
     # setup CLI parser and parse arguments
     parser = ArgumentParser(prog='dcamp', description='the %(prog)s cli')
@@ -32,7 +58,19 @@ def main():
                         dest="debug_mods",
                         help="make given %(prog)s module uber verbose",
                         action="append")
-    parser.set_defaults(verbose=False, debug=False, debug_mods=[])
+    parser.add_argument("--trace",
+                        dest="trace",
+                        help="trace one of every N messages of given type "
+                             "(e.g. DataBasic=10) when debugging",
+                        metavar="TYPE[=N]",
+                        type=trace_every,
+                        action="append")
+    parser.add_argument("--trace-verbose",
+                        dest="trace_verbose",
+                        help="also trace the contents of messages when debugging",
+                        action="store_true")
+    parser.set_defaults(verbose=False, debug=False, debug_mods=[], trace=[],
+                        trace_verbose=False)
 
     # configuration file
     subparsers = parser.add_subparsers(title='dcamp commands', dest='command')
@@ -53,7 +91,24 @@ def main():
     parser_base = subparsers.add_parser('base', parents=[],
                                         help='run base command')
     parser_base.add_argument('-a', '--address', dest='address', type=address, required=True)
-    parser_base.set_defaults(func=do_app, cmd='base')
+    parser_base.add_argument('--runtime', dest='runtime', choices=sorted(RUNTIMES),
+                             help='run each role\'s services as threads (default) or as '
+                                  'coroutines of one asyncio event loop')
+    parser_base.set_defaults(func=do_app, cmd='base', runtime='thread')
+
+    # host command
+    parser_host = subparsers.add_parser('host', parents=[],
+                                        help='run multiple base nodes in one process')
+    parser_host.add_argument('-a', '--address', dest='address', type=address,
+                             required=True,
+                             help='address of the first node; each next node uses the '
+                                  'next %d ports' % EndpntSpec.MAX_OFFSET)
+    parser_host.add_argument('-n', '--nodes', dest='nodes', type=count, required=True,
+                             help='number of nodes')
+    parser_host.add_argument('--runtime', dest='runtime', choices=sorted(RUNTIMES),
+                             help='run each role\'s services as threads (default) or as '
+                                  'coroutines of one asyncio event loop')
+    parser_host.set_defaults(func=do_app, cmd='host', runtime='thread')
 
     # config command
     parser_config = subparsers.add_parser('config',  help='run actions on the given %(prog)s config file')
@@ -68,6 +123,20 @@ def main():
 
     parser_config.set_defaults(func=do_config)
 
+    # datalog command
+    parser_datalog = subparsers.add_parser('datalog',
+                                           help='convert binary data logs to text')
+    parser_datalog.add_argument('files', help='binary data log FILE(s) to convert',
+                                type=FileType('rb'),
+                                metavar='FILE',
+                                nargs='+')
+    parser_datalog.add_argument('-o', '--output', dest='output',
+                                help='write text data log to FILE instead of stdout',
+                                type=FileType('w'),
+                                metavar='FILE',
+                                default=sys.stdout)
+    parser_datalog.set_defaults(func=do_datalog)
+
     args = parser.parse_args()
 
     logging.basicConfig(format='%(asctime)s %(name)-27s %(levelname)-8s %(message)s')
@@ -83,6 +152,9 @@ def main():
         mod_logger.setLevel(logging.DEBUG)
         mod_logger.debug('set "%s" logging level to debug' % mod)
 
+    MsgTracer.EVERY = dict(args.trace)
+    MsgTracer.VERBOSE = args.trace_verbose
+
     if args.command is None:
         parser.print_usage()
         exit(1)
@@ -123,5 +195,15 @@ def do_config(args):
         raise RuntimeError('unknown config action given')
 
 
+def do_datalog(args):
+    for f in args.files:
+        try:
+            datalog.convert(f, args.output)
+        except ValueError as e:
+            print('\n%s: %s\n' % (f.name, e), file=sys.stderr)
+            return -1
+    return 0
+
+
 if __name__ == '__main__':
     main()
@@ -12,7 +12,9 @@ class Base(RoleMixin):
             control_pipe,
             local_ep,
             local_uuid,
+            runtime='thread',
     ):
-        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid)
+        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid, runtime)
 
-        self._add_service(Node)
+        # the node's roles use the same runtime
+        self._add_service(Node, runtime)
@@ -17,8 +17,9 @@ class Collector(RoleMixin):
             local_uuid,
             parent_ep,
             group,
+            runtime='thread',
     ):
-        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid)
+        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid, runtime)
 
         ### add services
 
@@ -0,0 +1,37 @@
+from dcamp.role.role import RoleMixin
+from dcamp.service.node import Node
+from dcamp.types.messages.topology import gen_uuid
+from dcamp.types.specs import EndpntSpec
+import dcamp.util.inproc as inproc
+
+
+class Host(RoleMixin):
+    """
+    Host Role
+
+    Base role of multiple nodes in one process, for simulating large topologies. Node N
+    uses the given endpoint's port plus N * EndpntSpec.MAX_OFFSET. All nodes share the
+    process's zmq context, and traffic between them uses inproc (see dcamp.util.inproc).
+    """
+
+    def __init__(
+            self,
+            control_pipe,
+            local_ep,
+            local_uuid,
+            count,  # number of nodes
+            runtime='thread',
+    ):
+        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid, runtime)
+        assert count > 0
+
+        self.endpoints = [EndpntSpec(local_ep.host,
+                                     local_ep.port + (i * EndpntSpec.MAX_OFFSET))
+                          for i in range(count)]
+
+        for ep in self.endpoints:
+            inproc.register(ep)
+
+        # first node uses the role's uuid; the node's roles use the same runtime
+        for (i, ep) in enumerate(self.endpoints):
+            self._add_service_at(ep, local_uuid if 0 == i else gen_uuid(), Node, runtime)
@@ -6,6 +6,7 @@ from zmq import Context, Poller, POLLIN, ZMQError, ETERM  # pylint: disable-msg=
 from zhelpers import zpipe
 
 from dcamp.service.configuration import Configuration
+from dcamp.service.runtime import create_runtime
 from dcamp.types.messages.control import SOS
 from dcamp.types.specs import EndpntSpec
 from dcamp.util.decorators import runnable
@@ -18,6 +19,7 @@ class RoleMixin(object):
             pipe,
             ep,
             uuid,
+            runtime='thread',  # see dcamp.service.runtime.RUNTIMES
     ):
         self.ctx = Context.instance()
         self.__control_pipe = pipe
@@ -34,6 +36,7 @@ class RoleMixin(object):
 
         # { pipe: service, ...}
         self.__services = {}
+        self.runtime = create_runtime(runtime, str(self))
 
     def __str__(self):
         return self.__class__.__name__
@@ -52,9 +55,13 @@ class RoleMixin(object):
         return self.__config_service.copy_kvdict()
 
     def _add_service(self, cls, *args, **kwargs):
+        self._add_service_at(self.__endpoint, self.__uuid, cls, *args, **kwargs)
+
+    def _add_service_at(self, ep, uuid, cls, *args, **kwargs):
+        """ adds service for given endpoint and uuid, instead of the role's own """
         pipe, peer = zpipe(self.ctx)  # create control socket pair
         # create service, passing local values along with rest of given args
-        service = cls(peer, self.__endpoint, self.__uuid, self.__config_service, *args, **kwargs)
+        service = cls(peer, ep, uuid, self.__config_service, *args, **kwargs)
         self.__services[pipe] = service  # add to our dict, using pipe socket as key
         if Configuration == cls:
             self.__config_service = service
@@ -63,9 +70,8 @@ class RoleMixin(object):
         SOS(self.__endpoint, self.__uuid).send(self.__control_pipe)
 
     def play(self):
-        # start each service thread
-        for service in self.__services.values():
-            service.start()
+        # start each service (thread or coroutine)
+        self.runtime.start(list(self.__services.values()))
 
         # @todo: wait for READY message from each service / issue #37
 
@@ -149,8 +155,9 @@ class RoleMixin(object):
                     reply = pipe.recv_string()
                     if 'STOPPED' == reply:
                         self.logger.debug('received STOPPED control reply from %s service' % svc)
-                        svc.join(timeout=5)  # STOPPED response should be sent right before svc exit
-                        if svc.is_alive():
+                        # STOPPED response should be sent right before svc exit
+                        self.runtime.join(svc, timeout=5)
+                        if self.runtime.is_alive(svc):
                             self.logger.error('%s service is still alive; not waiting' % svc)
                         else:
                             self.logger.debug('%s service thread stopped' % svc)
@@ -173,6 +180,6 @@ class RoleMixin(object):
     def __some_alive(self):
         """returns True if at least one service of this Role is still running"""
         for service in self.__services.values():
-            if service.is_alive():
+            if self.runtime.is_alive(service):
                 return True
         return False
@@ -16,8 +16,9 @@ class Root(RoleMixin):
             local_ep,
             local_uuid,
             config_file,
+            runtime='thread',
     ):
-        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid)
+        RoleMixin.__init__(self, control_pipe, local_ep, local_uuid, runtime)
 
         ### add services (order matters)
 
@@ -3,7 +3,8 @@ from zmq import SUB, SUBSCRIBE, PUSH, Again  # pylint: disable-msg=E0611
 from dcamp.types.specs import EndpntSpec, MetricCollection
 from dcamp.service.service import ServiceMixin
 import dcamp.types.messages.data as data
-from dcamp.util.functions import now_secs, now_msecs
+from dcamp.util.functions import now_msecs
+from dcamp.util.scheduler import Scheduler
 
 
 class Aggregation(ServiceMixin):
@@ -28,28 +29,26 @@ class Aggregation(ServiceMixin):
 
         # { config-name: aggregate-metric }
         self.metric_aggregations = {}
-        self.metric_collections = []  # sorted by next collection time
+        self.scheduler = Scheduler()  # ordered by next aggregation time
         self.metric_seqid = -1
-        self.next_aggregation = now_secs()  # units: seconds
+        self.next_aggregation = now_msecs()  # units: msecs
+        self._watch_config('/CONFIG/', self.__check_config_for_metric_updates)
 
         # sub data from child(ren) ...
-        self.sub = self.ctx.socket(SUB)
+        self.sub = self._socket(SUB)
         self.sub.setsockopt(SUBSCRIBE, b'')
         self.sub.bind(self.endpoint.bind_uri(EndpntSpec.DATA_EXTERNAL))
         self.poller.register(self.sub)
 
         # ... and push them to Filter service
-        self.push = self.ctx.socket(PUSH)
+        self.push = self._socket(PUSH)
         self.push.connect(self.endpoint.connect_uri(EndpntSpec.DATA_INTERNAL, 'inproc'))
 
     def _pre_poll(self):
-        self.__check_config_for_metric_updates()
-
-        if self.next_aggregation <= now_secs():
+        if self.next_aggregation <= now_msecs():
             self.__aggregate_and_push_metrics()
 
-        # next_aggregation is in secs; subtract current msecs to get next wakeup epoch
-        wakeup = max(0, (self.next_aggregation * 1e3) - now_msecs())
+        wakeup = max(0, self.next_aggregation - now_msecs())
         self.logger.debug('next wakeup in %dms' % wakeup)
         self.poller_timer = wakeup
 
@@ -62,6 +61,10 @@ class Aggregation(ServiceMixin):
                     break
                 self.sub_cnt += 1
 
+                if msg.is_error:
+                    self.logger.error('received error message: %s' % msg)
+                    continue
+
                 if msg.is_hugz:
                     # noted. moving on...
                     self.logger.debug('received hug.')
@@ -74,7 +77,7 @@ class Aggregation(ServiceMixin):
                     self.logger.debug('dropped: <{}>'.format(msg))
                     continue
 
-                # only push metrics we know about
+                # only push metrics we know about; batches are pushed as-is
                 msg.send(self.push)
                 self.push_cnt += 1
 
@@ -85,8 +88,9 @@ class Aggregation(ServiceMixin):
                     # unknown metric OR aggregation not configured
                     continue
 
-                # store sample for later aggregation
-                aggr_data.add_sample(msg)
+                # store sample(s) for later aggregation
+                for sample in msg.samples:
+                    aggr_data.add_sample(sample)
 
     def _cleanup(self):
 
@@ -102,45 +106,36 @@ class Aggregation(ServiceMixin):
 
     def __aggregate_and_push_metrics(self):
 
-        if len(self.metric_collections) == 0:
+        if len(self.scheduler) == 0:
             # check for new metric specs every hb-interval seconds
-            self.next_aggregation = now_secs() + self.cfgsvc.config_get_hb_int()
+            self.next_aggregation = (now_msecs() +
+                                     int(self.cfgsvc.config_get_hb_int() * 1e3))
             return
 
-        aggregated = []
-        while True:
-            # pop first item from dict using collection list order
-            collection = self.metric_collections.pop(0)
-            assert collection.epoch <= now_secs(), 'next metric is not scheduled for collection'
+        now = now_msecs()
+        for collection in self.scheduler.pop_due(now):
             assert collection.spec.config_name in self.metric_aggregations
 
             aggr_data = self.metric_aggregations[collection.spec.config_name]
-            if aggr_data.aggregate(now_msecs()) is not None:
+            if aggr_data.aggregate(now) is not None:
                 aggr_data.send(self.push)
                 self.push_cnt += 1
+            else:
+                self.logger.error('{}: not enough samples to aggregate'.format(
+                    aggr_data['aggr-group']))
 
             # reset aggregation for the next period
             aggr_data.reset()
 
-            # update collection spec with next epoch
-            aggregated.append(MetricCollection(now_secs() + collection.spec.rate,
-                                               collection.spec))
-
-            if len(self.metric_collections) == 0:
-                # no more work
-                break
-
-            if self.metric_collections[0].epoch > now_secs():
-                # no more work scheduled
-                break
+            # add the aggregated metric back into the schedule; adaptive specs are
+            # aggregated at their longest rate, so each node has a new sample every period
+            period = collection.spec.longest_rate * 1000
+            self.scheduler.reschedule(collection, now, period)
 
-        # add the aggregated metrics back into our list
-        self.metric_collections = sorted(self.metric_collections + aggregated)
         # set the new collection wakeup
-        self.next_aggregation = self.metric_collections[0].epoch
+        self.next_aggregation = self.scheduler.next_epoch
 
     def __check_config_for_metric_updates(self):
-        # TODO: optimize this to only check the seq-id
         (specs, seqid) = self.cfgsvc.config_get_metric_specs()
         if seqid <= self.metric_seqid:
             self.logger.debug('no new metric specs: {} <= {}'.format(seqid, self.metric_seqid))
@@ -150,7 +145,7 @@ class Aggregation(ServiceMixin):
         aggregations = {}
 
         # add all old collections, saving their aggregated metrics
-        for c in self.metric_collections:
+        for c in self.scheduler:
             if c.spec in specs:
                 collections.append(c)
                 aggregations[c.spec.config_name] = self.metric_aggregations[c.spec.config_name]
@@ -162,7 +157,7 @@ class Aggregation(ServiceMixin):
             aggr_group = self.cfgsvc.group
 
         # add all new metric specs, using now+period for collection/aggregation time
-        now = now_secs()
+        now = now_msecs()
         for s in specs:
             if s.aggr is None:
                 # skip metrics without aggregation configured
@@ -178,7 +173,7 @@ class Aggregation(ServiceMixin):
             # create new spec with updated config_name
             s = s._replace(config_name=cname)
             c = MetricCollection(
-                epoch=now + s.rate,
+                epoch=now + (s.longest_rate * 1000),
                 spec=s)
 
             collections.append(c)
@@ -191,18 +186,22 @@ class Aggregation(ServiceMixin):
                 'type': 'aggregate-' + s.aggr,
             }
             assert cname not in aggregations
-            aggregations[cname] = data.DataAggregate(self.endpoint, props)
+            if props['type'] in data.DataSketch.QUANTILES:
+                aggregations[cname] = data.DataSketch(self.endpoint, props)
+            else:
+                aggregations[cname] = data.DataAggregate(self.endpoint, props)
 
         assert len(aggregations) == len(collections)
-        self.metric_collections = sorted(collections)
+        self.scheduler = Scheduler(collections)
         self.metric_aggregations = aggregations
         self.metric_seqid = seqid
 
-        self.logger.debug('new metric specs: %s' % self.metric_collections)
+        self.logger.debug('new metric specs: %s' % self.scheduler)
 
         # reset next collection wakeup with new values
-        if len(self.metric_collections) > 0:
-            self.next_aggregation = self.metric_collections[0].epoch
+        if len(self.scheduler) > 0:
+            self.next_aggregation = self.scheduler.next_epoch
         else:
             # check for new metric specs every hb-interval seconds
-            self.next_aggregation = now_secs() + self.cfgsvc.config_get_hb_int()
+            self.next_aggregation = (now_msecs() +
+                                     int(self.cfgsvc.config_get_hb_int() * 1e3))
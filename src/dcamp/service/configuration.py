@@ -1,23 +1,61 @@
 import re
+from collections import deque
 from threading import RLock, Condition
 from types import MethodType
 
-from zmq import PUB, SUB, SUBSCRIBE, POLLIN, DEALER, ROUTER  # pylint: disable-msg=E0611
+from zmq import PUB, SUB, SUBSCRIBE, POLLIN, DEALER, ROUTER, NOBLOCK, Again  # pylint: disable-msg=E0611
 
 import dcamp.types.messages.configuration as config
 from dcamp.types.specs import EndpntSpec
+from dcamp.types.admission import AdmissionIndex
+from dcamp.types.kvstore import KVStore
 from dcamp.service.service import ServiceMixin
 from dcamp.types.topo import TopoTreeMixin, TopoNode
 from dcamp.util.functions import now_secs, now_msecs
 from dcamp.types.config_file import ConfigFileMixin
 
 
+class Snapshot(object):
+    """
+    Snapshot session: the key-value pairs of one subtree, copied when requested and then
+    streamed to the requesting child as KVBATCH messages as the child grants credit.
+    """
+
+    def __init__(self, peer_id, subtree, items, max_seq, credit, delta=False):
+        self.peer_id = peer_id
+        self.subtree = subtree
+        self.items = items  # [ (key, value, seq-num) ]
+        self.max_seq = max_seq
+        self.credit = credit
+        self.delta = delta  # items are only the keys changed since the child's seq-num
+
+        self.position = 0
+        self.last_active = now_secs()
+
+    @property
+    def done(self):
+        return self.position == len(self.items)
+
+    def next_batch(self):
+        """ @returns next KVBATCH message of (up to KVBATCH.MAX_BYTES) remaining items """
+        batch = config.KVBATCH(self.peer_id, self.subtree)
+        while not self.done and batch.add(*self.items[self.position]):
+            self.position += 1
+        return batch
+
+
 class Configuration(ServiceMixin):
 
     # states
     STATE_SYNC = 0
     STATE_GOGO = 1
 
+    # number of KVBATCH messages each snapshot session may have in flight
+    SNAPSHOT_CREDIT = 4
+
+    # number of (seq-num, key) changes kept for delta snapshots
+    CHANGELOG_SIZE = 10000
+
     def __init__(
             self,
             control_pipe,  # control pipe for shutting down service
@@ -51,15 +89,26 @@ class Configuration(ServiceMixin):
         # writers (both the Management and Configuration services can write at the same time) and
         # multiple readers (all services, snapshots requests, etc).
         #
-        # When reading, the Lock only needs to be held while reading multiple values (i.e.
-        # iterating across the entire dictionary or walking the tree). Getting individual elements
-        # should not require the Lock.
+        # Readers of the key-value pairs do not take the Lock: after each batch of writes,
+        # the writer replaces __kvsnap with a new immutable version of __kvdict (see
+        # KVStore.freeze()), so readers always see a consistent version, even when reading
+        # multiple values. Walking the tree still requires the Lock.
 
         # { key : ( value, seq-num ) }
         self.__kvlock = RLock()  # reentrant lock because I'm lazy
-        self.__kvdict = {}
+        self.__kvdict = KVStore()
+        self.__kvdict.add_view('groups', '/CONFIG/', Configuration.__view_groups)
+        self.__kvdict.add_view('metrics', '/CONFIG/', Configuration.__view_metrics)
+        self.__kvdict.add_view('admission', '/CONFIG/', Configuration.__view_admission)
+        self.__kvsnap = self.__kvdict.freeze()
         self.__kv_seq = -1
 
+        # [ (seq-num, key) ] of all in-sequence writes, oldest first; used to answer
+        # snapshot requests with only the keys changed since the requester's seq-num. the
+        # log covers all changes after __changelog_floor.
+        self.__changelog = deque()
+        self.__changelog_floor = -1
+
         # 1) tree starts empty
         # 2) as config receives /TOPO keys, add nodes to tree as topo-node
         # tree.nodes contains { EndpntSpec: TopoNode }
@@ -83,6 +132,17 @@ class Configuration(ServiceMixin):
         self.hug_msg = None
         self.next_hug = None
 
+        # publishing updates to children; written keys are queued by any thread (while
+        # holding __kvlock) and sent in batches by __flush_updates()
+        # [ (key, value, seq-num) ]
+        self.__pub_pending = []
+        self.notify_sub = None  # wakes us up when keys are written
+
+        # last-seen updates of touched topo nodes, sent at most once every hb-interval
+        # { topo-key : last-seen }
+        self.__touched = {}
+        self.next_touch = None
+
         ### Branch/Leaf Members
 
         # detecting parent heartbeats
@@ -93,6 +153,16 @@ class Configuration(ServiceMixin):
         self.kvsync_completed = {}
         self.pending_updates = []
 
+        # re-syncing after missed heartbeats (in GOGO state)
+        # { topic : set-of-received-keys }
+        self.resync = None
+
+        ### Root/Branch Members
+
+        # sending snapshots
+        # { (peer-id, topic) : Snapshot }
+        self.snapshots = {}
+
         # TODO: fix timing issue w.r.t. root node sync--root needs to be sync'ed before any other node.
 
         # receiving updates
@@ -109,6 +179,11 @@ class Configuration(ServiceMixin):
 
         # sockets and message counts
         (self.update_sub, self.update_pub, self.kvsync_req, self.kvsync_rep) = (None, None, None, None)
+
+        # notify local services of changed keys (see watch()); written to by any thread
+        # storing keys, so only used while holding __kvlock
+        self.notify_pub = self._socket(PUB)
+        self.notify_pub.bind(self.endpoint.bind_uri(EndpntSpec.CONFIG_NOTIFY, 'inproc'))
         (self.subcnt, self.pubcnt, self.hugcnt, self.reqcnt, self.repcnt) = (0, 0, 0, 0, 0)
 
         # populate dict with config_file values if root level; values are used later
@@ -130,16 +205,22 @@ class Configuration(ServiceMixin):
 
     def copy_kvdict(self):
         assert 'root' == self.level
-        with self.__kvlock:
-            return self.__kvdict.copy()  # shallow copy; kvdict values should not be modified
-                                         # after this call
+        return self.__kvsnap.copy()  # shallow copy; kvdict values should not be modified
+                                     # after this call
+
+    def kvsnapshot(self):
+        """
+        returns current (immutable) KVSnapshot of all key-value pairs; use for consistent
+        reads of multiple values
+        """
+        return self.__kvsnap
 
     def get(self, k, default=None):
         """ returns (value, seq-id) """
-        return self.__kvdict.get(k, (default, -1))
+        return self.__kvsnap.get(k, (default, -1))
 
     def __getitem__(self, k):
-        (val, seq) = self.__kvdict[k]
+        (val, seq) = self.__kvsnap[k]
         return val
 
     def __setitem__(self, k, v):
@@ -151,12 +232,23 @@ class Configuration(ServiceMixin):
         self.__kvlist_store_and_pub([(k, None)])  # remove from our dict and publish update
 
     def __len__(self):
-        return len(self.__kvdict)
+        return len(self.__kvsnap)
 
     def __iter__(self):
-        return iter(self.__kvdict)
-
-    def __kvlist_store_and_pub(self, kvlist, ignore_seq=False, skip_topo=False):
+        return iter(self.__kvsnap)
+
+    def watch(self, prefix):
+        """
+        Returns socket receiving the key (as string) of every key written under given
+        prefix; it must be created, used, and closed by the watching service's thread.
+        """
+        socket = self.ctx.socket(SUB)
+        socket.setsockopt_string(SUBSCRIBE, prefix)
+        socket.connect(self.endpoint.connect_uri(EndpntSpec.CONFIG_NOTIFY, 'inproc'))
+        return socket
+
+    def __kvlist_store_and_pub(self, kvlist, ignore_seq=False, skip_topo=False,
+                               per_key=False):
         pub_kvlist = []
         with self.__kvlock:
             for item in kvlist:
@@ -178,30 +270,41 @@ class Configuration(ServiceMixin):
                     seq = self.__kv_seq + 1
 
                 # write to dict
-                if self.__kv_write(k, v, seq, ignore_seq):
+                if self.__kv_write(k, v, seq, ignore_seq, per_key):
                     # if successful, pub later
                     pub_kvlist.append((k, v, seq))
+                    self.notify_pub.send_string(k)
 
-        for (k, v, seq) in pub_kvlist:
-            # pass all topo updates to tree; if update is actually coming from
-            # tree, skip_topo should be True
-            if not skip_topo and k.startswith('/TOPO'):
-                self.__tree.kv_update(k, v)
+            # publish new version to readers
+            if len(pub_kvlist) > 0:
+                self.__kvsnap = self.__kvdict.freeze()
 
-            # wait until finished with sync state before sending updates
-            if self._is_gogo():
-                assert self.update_pub is not None
-                update = config.KVPUB(k, v, seq)
-                update.send(self.update_pub)
-                self.__hb_sent()
-                self.pubcnt += 1
+            # wait until finished with sync state before sending updates; leaves have no
+            # children to update
+            if self._is_gogo() and 'leaf' != self.level:
+                self.__pub_pending.extend(pub_kvlist)
+
+        # pass all topo updates to tree; if update is actually coming from tree, skip_topo
+        # should be True
+        if not skip_topo:
+            for (k, v, seq) in pub_kvlist:
+                if k.startswith('/TOPO'):
+                    self.__tree.kv_update(k, v)
 
-    def __kv_write(self, key, value, sequence, ignore_seq):
-        """ N.B.: self.__kvlock MUST be held when calling __kv_write() """
+    def __kv_write(self, key, value, sequence, ignore_seq, per_key=False):
+        """
+        N.B.: self.__kvlock MUST be held when calling __kv_write()
+
+        per_key: write only if newer than the key's current value (used when re-syncing)
+        """
 
         if ignore_seq:
             # during kvsync, we allow out of sequence updates; otherwise,
             assert self._is_sync()
+        elif per_key:
+            if sequence <= self.__kvdict.get(key, (None, -1))[1]:
+                return False
+            self.__kv_seq = max(self.__kv_seq, sequence)
         else:
             # if not greater than current kv-sequence, skip this one
             if sequence <= self.__kv_seq:
@@ -214,13 +317,71 @@ class Configuration(ServiceMixin):
             # always set seq-num if not ignore_seq
             self.__kv_seq = sequence
 
+            if len(self.__changelog) == Configuration.CHANGELOG_SIZE:
+                (self.__changelog_floor, _) = self.__changelog.popleft()
+            self.__changelog.append((sequence, key))
+
         # set/delete given key-value pair
-        self.__kvdict[key] = (value, sequence)
-        if value is None:
+        if value is not None:
+            self.__kvdict[key] = (value, sequence)
+        elif key in self.__kvdict:
             del self.__kvdict[key]
 
         return True
 
+    def __changes_since(self, since, subtree):
+        """
+        N.B.: self.__kvlock MUST be held when calling __changes_since()
+
+        @returns [ (key, value, seq-num) ] of keys in given subtree changed after given
+                 seq-num, in sequence order (deleted keys have a None value), or None if
+                 the change log does not go back that far
+        """
+        if since < self.__changelog_floor:
+            return None
+
+        changed = {}
+        for (seq, k) in reversed(self.__changelog):
+            if seq <= since:
+                break
+            if k.startswith(subtree) and k not in changed:
+                (v, s) = self.__kvdict.get(k, (None, seq))
+                changed[k] = (k, v, s)
+        return sorted(changed.values(), key=lambda item: item[2])
+
+    @staticmethod
+    def __view_groups(kvdict):
+        """ unique group names, from the /CONFIG/<group>/endpoints keys """
+        regex = re.compile(r'/CONFIG/(\w+)/endpoints$')
+        return frozenset(m.group(1) for m in map(regex.match, kvdict.keys('/CONFIG/'))
+                         if m is not None)
+
+    @staticmethod
+    def __view_metrics(kvdict):
+        """ (unique metrics of all groups, max seq-num of their keys) """
+        s = -1
+        m = set()
+        for g in kvdict.view('groups'):
+            (gm, gs) = kvdict.get('/CONFIG/%s/metrics' % g, ([], -1))
+            s = max(gs, s)
+            m.update(gm)
+        return frozenset(m), s
+
+    @staticmethod
+    def __view_admission(kvdict):
+        """ AdmissionIndex of the endpoints and filters of all groups """
+        groups = {}
+        for g in kvdict.view('groups'):
+            (endpoints, _) = kvdict.get('/CONFIG/%s/endpoints' % g, ([], -1))
+            (filters, _) = kvdict.get('/CONFIG/%s/filters' % g, ([], -1))
+            groups[g] = (endpoints, filters)
+        return AdmissionIndex(groups)
+
+    def __reset_changelog(self):
+        """ drops change log; N.B.: self.__kvlock MUST be held by the caller """
+        self.__changelog.clear()
+        self.__changelog_floor = self.__kv_seq
+
     # END dictionary access methods
     #####
 
@@ -243,8 +404,7 @@ class Configuration(ServiceMixin):
     # branch/collector access
 
     def topo_group_size(self, group):
-        c = self.topo_get_collector(group)
-        return c is not None and len(c.children) or 0
+        return self.__tree.group_size(group)
 
     def topo_get_collector(self, group):
         return self.__tree.get_collector(group)
@@ -281,9 +441,11 @@ class Configuration(ServiceMixin):
         return node
 
     def topo_touch_node(self, node):
+        # the tree keeps the node's last-seen time; last-seen changes are not key-value
+        # updates, so they have no seq-num and are sent separately (see __flush_touches())
         with self.__kvlock:
-            kvlist = self.__tree.touch_node(node)
-            self.__kvlist_store_and_pub(kvlist, skip_topo=True)
+            self.__tree.touch_node(node)
+            self.__touched[node.get_key()] = self.__tree.last_seen(node)
 
     # END topo tree access methods
     #####
@@ -313,27 +475,45 @@ class Configuration(ServiceMixin):
             return self['/CONFIG/global/heartbeat']
         return 60  # default hb interval until init is complete
 
+    def config_get_forward(self):
+        """
+        returns forwarding mode for branch nodes: 'raw' (default) or 'partial', i.e. only
+        the aggregates of metrics with aggregation configured
+        """
+        try:
+            return self['/CONFIG/global/forward']
+        except KeyError:
+            return 'raw'
+
+    def config_get_datalog(self):
+        """ returns data log options from the config as kwargs for datalog.open_sink() """
+        options = {}
+        for (key, option) in (('datalog', 'kind'),
+                              ('datalog-flush', 'flush_interval'),
+                              ('datalog-rotate', 'max_age'),
+                              ('datalog-size', 'max_bytes')):
+            try:
+                options[option] = self['/CONFIG/global/' + key]
+            except KeyError:
+                pass
+        return options
+
     def config_get_metric_specs(self, group=None):
         assert self._is_gogo()
 
         # root needs all metrics
         if self.level == 'root':
-            s = -1
-            m = set()  # returning unique set of metrics from all groups
-
-            for g in self.config_get_groups():
-                (gm, gs) = self.get('/CONFIG/%s/metrics' % g, [])
-                s = max(gs, s)
-                m.update(gm)
-
-            return m, s
+            # returning unique set of metrics from all groups
+            (m, s) = self.__kvsnap.view('metrics')
+            return set(m), s
 
         # otherwise, just return this group's metrics
         if group is None:
             group = self.group
 
-        # return tuple = (spec-list, seq-id) or (None, -1)
-        return self.get('/CONFIG/%s/metrics' % group, [])
+        # (spec-list, seq-id) or ([], -1); the list is a copy, since callers modify it
+        (specs, seq) = self.get('/CONFIG/%s/metrics' % group, [])
+        return list(specs), seq
 
     def config_get_endpoints(self, group=None):
         assert self._is_gogo()
@@ -348,16 +528,11 @@ class Configuration(ServiceMixin):
             return []
 
     def config_get_groups(self):
-        regex = re.compile('/CONFIG/(\w+)/endpoints')
-        gs = set()
-        with self.__kvlock:
-            for key in self.__kvdict:
-                m = regex.match(key)
-                if m is not None:
-                    # every group has three keys in the dict; lazily find the unique
-                    # groups names by using a set
-                    gs.add(m.group(1))
-        return gs
+        return set(self.__kvsnap.view('groups'))
+
+    def config_get_admission(self):
+        """ @returns AdmissionIndex of current config; rebuilt when the config changes """
+        return self.__kvsnap.view('admission')
 
     # END config access methods
     #####
@@ -387,7 +562,7 @@ class Configuration(ServiceMixin):
         assert len(self.topics) > 0
 
         # 1) subscribe to udpates from parent
-        self.update_sub = self.ctx.socket(SUB)
+        self.update_sub = self._socket(SUB)
         for t in self.topics:
             self.update_sub.setsockopt_string(SUBSCRIBE, t)
         self.update_sub.connect(self.parent.connect_uri(EndpntSpec.CONFIG_UPDATE))
@@ -395,20 +570,23 @@ class Configuration(ServiceMixin):
         self.poller.register(self.update_sub, POLLIN)
 
         # 2) request snapshot(s) from parent
-        self.kvsync_req = self.ctx.socket(DEALER)
+        self.kvsync_req = self._socket(DEALER)
         self.kvsync_req.connect(self.parent.connect_uri(EndpntSpec.CONFIG_SNAPSHOT))
-        for t in self.topics:
-            icanhaz = config.ICANHAZ(t)
-            icanhaz.send(self.kvsync_req)
+        self.__request_snapshots()
 
         self.poller.register(self.kvsync_req, POLLIN)
 
+    def __request_snapshots(self, since=None):
+        for t in self.topics:
+            icanhaz = config.ICANHAZ(t, Configuration.SNAPSHOT_CREDIT, since)
+            icanhaz.send(self.kvsync_req)
+
     def __init_producer_sockets(self):
         assert self.level in ['root', 'branch']
         assert self._is_gogo()
 
         # 3) publish updates to children (bind)
-        self.update_pub = self.ctx.socket(PUB)
+        self.update_pub = self._socket(PUB)
         self.update_pub.bind(self.endpoint.bind_uri(EndpntSpec.CONFIG_UPDATE))
 
         if 'branch' == self.level:
@@ -421,9 +599,13 @@ class Configuration(ServiceMixin):
 
         self.hug_msg = config.HUGZ(t)
         self.__hb_sent()  # start the hb timer
+        self.next_touch = now_secs()
+
+        self.notify_sub = self.watch('')
+        self.poller.register(self.notify_sub, POLLIN)
 
         # 4) service snapshot requests to children (bind)
-        self.kvsync_rep = self.ctx.socket(ROUTER)
+        self.kvsync_rep = self._socket(ROUTER)
         self.kvsync_rep.bind(self.endpoint.bind_uri(EndpntSpec.CONFIG_SNAPSHOT))
         self.poller.register(self.kvsync_rep, POLLIN)
 
@@ -440,9 +622,8 @@ class Configuration(ServiceMixin):
         # print each key-value pair; value is really (value, seq-num)
         self.logger.debug('kv-seq: %d' % self.__kv_seq)
         width = len(str(self.__kv_seq))
-        with self.__kvlock:
-            for (k, (v, s)) in sorted(self.__kvdict.items()):
-                self.logger.debug('({0:0{width}d}) {1}: {2}'.format(s, k, v, width=width))
+        for (k, (v, s)) in self.__kvsnap.items():
+            self.logger.debug('({0:0{width}d}) {1}: {2}'.format(s, k, v, width=width))
 
         self.__tree.print()
 
@@ -462,6 +643,13 @@ class Configuration(ServiceMixin):
             self.kvsync_rep.close()
         del self.kvsync_rep
 
+        if self.notify_sub is not None:
+            self.notify_sub.close()
+        del self.notify_sub
+
+        with self.__kvlock:
+            self.notify_pub.close()
+
         ServiceMixin._cleanup(self)
 
     def _pre_poll(self):
@@ -471,9 +659,14 @@ class Configuration(ServiceMixin):
             return
 
         if self.level in ['root', 'branch']:
+            self.__flush_updates()
+            if self.next_touch <= now_secs():
+                self.__flush_touches()
+
             assert self.next_hug is not None
             if self.next_hug <= now_secs():
                 self.__send_hug()
+            self.__expire_snapshots()
 
         if self.level in ['branch', 'leaf']:
             assert self.next_sos is not None
@@ -481,9 +674,23 @@ class Configuration(ServiceMixin):
                 self.sos()
                 self.__hb_received()  # reset hb monitor so we don't flood the system with sos
 
+                # updates may have been missed; ask parent for anything changed since our
+                # last update. keys received by any unfinished re-sync are kept, as
+                # replies to those requests may still arrive.
+                pending = self.resync or {}
+                self.resync = dict((t, pending.get(t, set())) for t in self.topics)
+                self.__request_snapshots(since=self.__kv_seq)
+
         self.poller_timer = self.__get_next_wakeup()
 
     def _post_poll(self, items):
+        if self.notify_sub in items:
+            # written keys are sent by _pre_poll()
+            try:
+                while True:
+                    self.notify_sub.recv(flags=NOBLOCK)
+            except Again:
+                pass
         if self.update_sub in items:
             self.__recv_update()
         if self.kvsync_req in items:
@@ -491,6 +698,58 @@ class Configuration(ServiceMixin):
         if self.kvsync_rep in items:
             self.__send_snapshot()
 
+    def __flush_updates(self):
+        """ publishes queued updates, one KVPUBBATCH per run of keys of the same topic """
+        with self.__kvlock:
+            (pending, self.__pub_pending) = (self.__pub_pending, [])
+        if len(pending) == 0:
+            return
+
+        assert self.update_pub is not None
+
+        # only the last write of each key is needed. batches keep the seq-num order, so
+        # children subscribed to multiple topics receive all updates in order.
+        last = dict((k, i) for (i, (k, v, seq)) in enumerate(pending))
+        batch = None
+        for (i, (k, v, seq)) in enumerate(pending):
+            if last[k] != i:
+                continue
+            topic = config.KVPUBBATCH.topic(k)
+            if batch is None or batch.subtree != topic or not batch.add(k, v, seq):
+                if batch is not None:
+                    batch.send(self.update_pub)
+                    self.pubcnt += 1
+                batch = config.KVPUBBATCH(topic, [(k, v, seq)])
+        batch.send(self.update_pub)
+        self.pubcnt += 1
+
+        self.__hb_sent()
+
+    def __flush_touches(self):
+        """ publishes last-seen times of nodes touched since the last call """
+        with self.__kvlock:
+            (touched, self.__touched) = (self.__touched, {})
+        if len(touched) == 0:
+            return
+
+        # only branches subscribe to touches, i.e. only the root's children
+        if 'root' == self.level:
+            assert self.update_pub is not None
+            touch = config.TOUCH(touched)
+            touch.send(self.update_pub)
+            self.pubcnt += 1
+            self.__hb_sent()
+
+        self.next_touch = now_secs() + self.config_get_hb_int()
+
+    def __apply_touches(self, touched):
+        with self.__kvlock:
+            for (k, last_seen) in touched.items():
+                (node, _) = self.__kvdict.get(k, (None, -1))
+                if (isinstance(node, TopoNode) and
+                        self.__tree.get_node(node.endpoint) is node):
+                    self.__tree.touch_node(node, last_seen)
+
     def __send_hug(self):
         assert self.level in ['root', 'branch']
         assert self._is_gogo()
@@ -513,6 +772,9 @@ class Configuration(ServiceMixin):
             assert self.next_hug is not None  # initialized by __init_producer_sockets()
             # next_hug is in secs; subtract current msecs to get next wakeup
             next_hug_wakeup = (self.next_hug * 1e3) - now_msecs()
+            if len(self.__touched) > 0:
+                next_hug_wakeup = min(next_hug_wakeup,
+                                      (self.next_touch * 1e3) - now_msecs())
             next_wakeup = next_hug_wakeup
 
         if self.level in ['branch', 'leaf']:
@@ -557,22 +819,29 @@ class Configuration(ServiceMixin):
             self.logger.debug('received hug.')
             return
 
+        if isinstance(update, config.TOUCH):
+            # snapshots include last-seen times, so touches are not needed while syncing
+            if self._is_gogo():
+                self.__apply_touches(update.value)
+            return
+
+        updates = update.items if isinstance(update, config.KVPUBBATCH) else [update]
+
         if self._is_sync():
             # another solution is to just not read the message; let them queue
             # up on the socket itself...but that relies on the HWM of the socket
             # being set high enough to account for all messages received while
             # in the SYNC state. this approach guarantees no updates are lost.
-            self.pending_updates.append(update)
+            self.pending_updates.extend(updates)
         elif self._is_gogo():
-            self.__kvlist_store_and_pub([update])
+            self.__kvlist_store_and_pub(updates)
         else:
             raise NotImplementedError('unknown state')
 
     def __recv_snapshot(self):
         assert self.level in ['branch', 'leaf']
-        assert self._is_sync()
 
-        # should either be KVSYNC or KTHXBAI
+        # should either be KVBATCH, KVSYNC, or KTHXBAI
         response = config.CONFIG.recv(self.kvsync_req)
         self.__hb_received()  # any message from parent is considered a heartbeat
         self.repcnt += 1
@@ -581,18 +850,31 @@ class Configuration(ServiceMixin):
             self.logger.error(response)
             return
 
-        if isinstance(response, config.KTHXBAI):
+        if isinstance(response, config.KVBATCH):
+            self.__store_snapshot(response.items)
+
+            # batch processed; let parent send another one
+            moar = config.MOAR(response.subtree)
+            moar.send(self.kvsync_req)
+
+        elif isinstance(response, config.KTHXBAI):
             if response.value not in self.topics:
                 self.logger.error('received KTHXBAI of unexpected subtree: %s' % response.value)
                 return
 
+            if self._is_gogo():
+                self.__finish_resync(response)
+                return
+
             # add given subtree to completed list; return if still waiting for other
             # subtree kvsync sessions
             self.kvsync_completed[response.value] = response.sequence
             if len(self.kvsync_completed) != len(self.topics):
                 return
 
-            self.__kv_seq = max(self.kvsync_completed.values())
+            with self.__kvlock:
+                self.__kv_seq = max(self.kvsync_completed.values())
+                self.__reset_changelog()
             del self.kvsync_completed
 
             # set GOGO state; this basically means we have all the config values
@@ -602,7 +884,47 @@ class Configuration(ServiceMixin):
                 self.__init_producer_sockets()
 
         else:
-            self.__kvlist_store_and_pub([response], ignore_seq=True)
+            self.__store_snapshot([response])
+
+    def __store_snapshot(self, kvlist):
+        """ stores given KVSYNC messages or (key, value, seq-num) tuples """
+        if self._is_sync():
+            self.__kvlist_store_and_pub(kvlist, ignore_seq=True)
+            return
+
+        # re-syncing; keep newer values we already have, and note the received keys
+        for item in kvlist:
+            k = item.key if isinstance(item, config.CONFIG) else item[0]
+            for (t, keys) in (self.resync or {}).items():
+                if k.startswith(t):
+                    keys.add(k)
+        self.__kvlist_store_and_pub(kvlist, per_key=True)
+
+    def __finish_resync(self, response):
+        """ completes the re-sync session of the subtree of given KTHXBAI """
+        keys = (self.resync or {}).pop(response.value, None)
+        if keys is None:
+            self.logger.debug('re-sync of %s already finished' % response.value)
+            return
+
+        if not response.delta:
+            # full snapshot; delete the keys our parent no longer has
+            stale = [(k, None, response.sequence)
+                     for (k, (v, s)) in self.__kvsnap.items(response.value)
+                     if k not in keys and s < response.sequence]
+            self.__kvlist_store_and_pub(stale, per_key=True)
+            self.logger.info('re-synced %s; %d keys, %d stale' % (
+                response.value, len(keys), len(stale)))
+        else:
+            self.logger.info('re-synced %s; %d changed keys' %
+                             (response.value, len(keys)))
+
+        if len(self.resync) == 0:
+            self.resync = None
+            # re-synced values were written out of sequence; children must not get deltas
+            # spanning them
+            with self.__kvlock:
+                self.__reset_changelog()
 
     def __send_snapshot(self):
         assert self._is_gogo()
@@ -615,19 +937,63 @@ class Configuration(ServiceMixin):
             return
 
         peer_id = request.peer_id
-        subtree = request.value  # subtree stored as value in ICANHAZ message
+        subtree = request.value  # subtree stored as value in ICANHAZ/MOAR message
 
-        # send all the key-value pairs in our dict
-        max_seq = -1
-        with self.__kvlock:
-            for (k, (v, s)) in self.__kvdict.items():
-                # skip keys not in the requested subtree
-                if not k.startswith(subtree):
-                    continue
-                max_seq = max([max_seq, s])
+        if isinstance(request, config.MOAR):
+            session = self.snapshots.get((peer_id, subtree))
+            if session is None:
+                # session already finished (or expired); child sends MOAR for every batch
+                self.logger.debug('MOAR for unknown snapshot session: %s' % subtree)
+                return
+            session.credit += request.credit
+            self.__stream_snapshot(session)
+            return
+
+        # the subtree's changes since the child's seq-num if still in the change log, or
+        # else a copy of the subtree from the current (never modified) version
+        items = None
+        if request.since is not None:
+            with self.__kvlock:
+                items = self.__changes_since(request.since, subtree)
+        delta = items is not None
+        if not delta:
+            items = [(k, v, s) for (k, (v, s)) in self.__kvsnap.items(subtree)]
+
+        # final seq-num; for no items, the child already has everything up to its own
+        max_seq = max([s for (k, v, s) in items] or [request.since if delta else 0])
+
+        if request.credit is None:
+            # child does not batch; send all the key-value pairs one by one
+            for (k, v, s) in items:
                 snap = config.KVSYNC(k, v, s, peer_id)
                 snap.send(self.kvsync_rep)
+            config.KTHXBAI(max_seq, peer_id, subtree, delta).send(self.kvsync_rep)
+            return
 
-        # send final message, closing the kvsync session
-        snap = config.KTHXBAI(max_seq, peer_id, subtree)
-        snap.send(self.kvsync_rep)
+        session = Snapshot(peer_id, subtree, items, max_seq, request.credit, delta)
+        self.snapshots[(peer_id, subtree)] = session
+        self.__stream_snapshot(session)
+
+    def __stream_snapshot(self, session):
+        """ sends batches while session has credit, and the final message when done """
+        session.last_active = now_secs()
+        while session.credit > 0 and not session.done:
+            batch = session.next_batch()
+            batch.send(self.kvsync_rep)
+            session.credit -= 1
+
+        if session.done:
+            # send final message, closing the kvsync session
+            snap = config.KTHXBAI(session.max_seq, session.peer_id, session.subtree,
+                                  session.delta)
+            snap.send(self.kvsync_rep)
+            del self.snapshots[(session.peer_id, session.subtree)]
+
+    def __expire_snapshots(self):
+        """ drops snapshot sessions of children which stopped granting credit """
+        expired = now_secs() - (self.config_get_hb_int() * 5)
+        for (key, session) in list(self.snapshots.items()):
+            if session.last_active < expired:
+                self.logger.warn('dropping stalled snapshot session: %s' %
+                                 session.subtree)
+                del self.snapshots[key]
@@ -1,15 +1,18 @@
-import tempfile
-from os import makedirs
-
-from zmq import PUB, PULL, Again  # pylint: disable-msg=E0611
+from zmq import NOBLOCK, PULL, XPUB, XPUB_VERBOSE, Again  # pylint: disable-msg=E0611
 
 import dcamp.types.messages.data as data
+import dcamp.util.datalog as datalog
+from dcamp.store.store import Store
 from dcamp.types.specs import EndpntSpec
 from dcamp.service.service import ServiceMixin
 from dcamp.util.functions import now_secs, now_msecs
+from dcamp.util.reduce import Reducer
 
 
 class Filter(ServiceMixin):
+    EXPIRE_INT = 60  # store retention check interval; units: seconds
+    STORE_INT = 1000  # store write interval; units: msecs
+
     def __init__(
             self,
             control_pipe,
@@ -27,29 +30,47 @@ class Filter(ServiceMixin):
         assert level in ['root', 'branch', 'leaf']
         self.level = level
 
-        # { config-name: (metric-spec, cached-list }
+        # { config-name: (metric-spec, cached-list, reducer, threshold-check) }; reducer
+        # is None unless the spec has a reduce mode, threshold-check is its compiled
+        # threshold (or None)
         self.metric_specs = {}
         self.metric_seqid = -1
 
+        # branches forward their children's samples ('raw') or, for metrics with
+        # aggregation configured, only their aggregates ('partial'); see ConfigFileMixin
+        self.forward = 'raw'
+
         (self.pull_cnt, self.pubs_cnt, self.hugz_cnt) = (0, 0, 0)
 
         # pull metrics on this socket; all levels will pull (either from the
         # sensor service or the aggregation service)
-        self.pull_socket = self.ctx.socket(PULL)
+        self.pull_socket = self._socket(PULL)
         self.pull_socket.bind(self.endpoint.bind_uri(EndpntSpec.DATA_INTERNAL, 'inproc'))
         self.poller.register(self.pull_socket)
 
-        makedirs('./logs/', exist_ok=True)
-        self.data_file = tempfile.NamedTemporaryFile(mode='w', delete=False,
-                                                     prefix='{}-{}.'.format(self.level, self.endpoint),
-                                                     suffix='.dcamp-data', dir='./logs/')
-        self.logger.debug('writing data to %s' % self.data_file.name)
-
-        # pub metrics on this sockets; only non-root level nodes will pub (to the parent)
+        # data log sink; opened once the config (and its datalog options) is available
+        self.sink = None
+
+        # only the root keeps the collected data queryable; received messages are written
+        # to the store in batches, every STORE_INT, instead of while receiving
+        self.store = None
+        self.store_pending = []
+        self.next_store = None  # units: msecs; None when nothing is pending
+        if self.level == 'root':
+            self.store = Store('./store/')
+            self.next_expire = now_secs() + Filter.EXPIRE_INT  # units: seconds
+
+        # pub metrics on this sockets; only non-root level nodes will pub (to the parent).
+        # XPUB tells us when the parent (re)subscribes, so property schemas are announced
+        # to it right away; see data.PropSchemas
         self.pubs_socket = None
         if self.level in ['branch', 'leaf']:
-            self.pubs_socket = self.ctx.socket(PUB)
+            self.pubs_socket = self._socket(XPUB)
+            self.pubs_socket.setsockopt(XPUB_VERBOSE, 1)
             self.pubs_socket.connect(self.parent.connect_uri(EndpntSpec.DATA_EXTERNAL))
+            self.poller.register(self.pubs_socket)
+
+        self._watch_config('/CONFIG/', self.__check_config)
 
         self.next_hug = now_secs()  # units: seconds
         self.last_pub = now_secs()  # units: seconds
@@ -59,7 +80,11 @@ class Filter(ServiceMixin):
         self.logger.debug("%d pulls; %d pubs; %d hugz; metrics= [%s]" %
                           (self.pull_cnt, self.pubs_cnt, self.hugz_cnt, self.metric_specs))
 
-        self.data_file.close()
+        if self.sink is not None:
+            self.sink.close()
+        if self.store is not None:
+            self.store.write(self.store_pending)
+            self.store.close()
         self.pull_socket.close()
         del self.pull_socket
 
@@ -70,13 +95,32 @@ class Filter(ServiceMixin):
         ServiceMixin._cleanup(self)
 
     def _pre_poll(self):
-        self.__check_config_for_metric_updates()
+        if self.sink is None:
+            prefix = '{}-{}'.format(self.level, self.endpoint)
+            self.sink = datalog.open_sink('./logs/', prefix,
+                                          **self.cfgsvc.config_get_datalog())
+        self.sink.flush()
+        self.poller_timer = self.sink.next_flush()
+
+        if self.next_store is not None:
+            wait = self.next_store - now_msecs()
+            if wait <= 0:
+                self.store.write(self.store_pending)
+                (self.store_pending, self.next_store) = ([], None)
+            elif self.poller_timer is None or wait < self.poller_timer:
+                self.poller_timer = wait
+
+        if self.store is not None and self.next_expire <= now_secs():
+            self.store.expire()
+            self.next_expire = now_secs() + Filter.EXPIRE_INT
 
         if self.level in ['branch', 'leaf']:
             if self.next_hug <= now_secs():
                 self.__send_hug()
 
-            self.poller_timer = self.__get_next_wakeup()
+            wakeup = self.__get_next_wakeup()
+            if self.poller_timer is None or wakeup < self.poller_timer:
+                self.poller_timer = wakeup
 
     def __send_hug(self):
         assert (self.level in ['branch', 'leaf'])
@@ -87,7 +131,13 @@ class Filter(ServiceMixin):
         self.last_pub = now_secs()
 
     def _post_poll(self, items):
+        if self.pubs_socket is not None and self.pubs_socket in items:
+            self.__recv_subscriptions()
+
         if self.pull_socket in items:
+            # non-local data forwarded to the parent, batched per source and metric
+            forward = []
+
             while True:
                 # read all messages on socket, i.e. keep reading until there is nothing
                 # left to process
@@ -101,7 +151,11 @@ class Filter(ServiceMixin):
                     self.logger.error('received error message: %s' % msg)
                     continue
 
-                self.data_file.write(msg.log_str() + '\n')
+                self.sink.write(msg.samples)
+                if self.store is not None:
+                    self.store_pending.append(msg)
+                    if self.next_store is None:
+                        self.next_store = now_msecs() + Filter.STORE_INT
 
                 # process message (i.e. do the filtering) and then forward to parent
                 if self.level in ['branch', 'leaf']:
@@ -115,33 +169,79 @@ class Filter(ServiceMixin):
                     # if non-local data, just send it off to the parent
                     if msg.source != self.endpoint or msg.config_name.endswith('-aggr'):
                         assert (self.level in ['branch'])
-                        msg.send(self.pubs_socket)
-                        self.pubs_cnt += 1
+
+                        # in partial mode, children's samples of aggregated metrics
+                        # only reach the parent via this node's (mergeable) aggregates;
+                        # samples of other metrics are forwarded as in raw mode
+                        if (self.forward == 'partial' and
+                                self.__is_aggregated(msg.config_name)):
+                            continue
+
+                        if msg.is_batch:
+                            # already batched; forward as-is
+                            msg.send(self.pubs_socket)
+                            self.pubs_cnt += 1
+                        else:
+                            forward.append(msg)
                         continue
 
                     # lookup metric spec, default is None and an empty cache list
-                    (metric, cache) = self.metric_specs.get(msg.config_name, (None, []))
+                    (metric, cache, reducer, check) = self.metric_specs.get(
+                        msg.config_name, (None, [], None, None))
 
                     if metric is None:
                         self.logger.warn('unknown metric config-name (%s); dropping data'
                                          % msg.config_name)
                         continue
 
-                    cache.append(msg)
-                    self.logger.debug('cache size: %d' % len(cache))
-                    self.__filter_and_send(metric, cache)
+                    for sample in msg.samples:
+                        cache.append(sample)
+                        self.logger.debug('cache size: %d' % len(cache))
+                        self.__filter_and_send(metric, cache, reducer, check)
+
+            if len(forward) > 0:
+                self.__send(forward)
+
+    def __recv_subscriptions(self):
+        """ re-announces property schemas when the parent (re)subscribes """
+        subscribed = False
+        while True:
+            try:
+                frame = self.pubs_socket.recv(NOBLOCK)
+            except Again:
+                break
+            # first byte is 1 for subscribe, 0 for unsubscribe
+            subscribed = subscribed or frame[:1] == b'\x01'
+
+        if subscribed:
+            self.logger.debug('parent subscribed; re-announcing property schemas')
+            data.reannounce(self.pubs_socket)
+
+    def __is_aggregated(self, config_name):
+        """ @returns whether given config-name's metric has aggregation configured """
+        spec = self.metric_specs.get(config_name)
+        return spec is not None and spec[0].aggr is not None
+
+    def __send(self, samples):
+        """ sends given samples to parent, batching them where possible """
+        for message in data.batch(samples):
+            message.send(self.pubs_socket)
+            self.pubs_cnt += 1
+
+        self.last_pub = now_secs()
 
-    def __filter_and_send(self, metric, cache):
+    def __filter_and_send(self, metric, cache, reducer, check):
         assert (self.level in ['branch', 'leaf'])
         do_send = True
         saved = cache[-1]  # save most recent message
 
         if metric.threshold is not None:
-            value = None
+            (value, time) = (None, None)
             if metric.threshold.is_timed:
                 # add to local cache and run time check with first message
                 assert '*' == metric.threshold.op, 'only "hold" operation supported'
                 value = cache[0].time  # time-based threshold compares against the earliest time
+                time = now_msecs()
 
             elif metric.threshold.is_limit:
                 # if first sample, just add to cache and skip further processing
@@ -150,30 +250,35 @@ class Filter(ServiceMixin):
 
                 assert len(cache) == 2
                 value = cache[0].calculate(cache[1])
+                time = cache[1].time
 
             # check threshold
             assert value is not None
-            if not metric.threshold.check(value):
+            if not check(value, time):
                 self.logger.debug('%s failed filter (%s): %.2f' % (metric.config_name,
                                                                    metric.threshold, value))
                 do_send = False
 
         if do_send:
             # forward message(s) to parent
-            for message in cache:
-                message.send(self.pubs_socket)
-                self.pubs_cnt += 1
-
-            self.last_pub = now_secs()
+            send = cache
+            if reducer is not None:
+                send = reducer.reduce(cache)
+            if len(send) > 0:
+                self.__send(send)
 
             # clear cache since we just sent all the messages
             cache.clear()
 
         # limit-based thresholds need the previous data message for calculations
-        if metric.threshold is None or metric.threshold.is_limit:
+        if metric.threshold is not None and metric.threshold.is_limit:
             cache.clear()
             cache.append(saved)
 
+    def __check_config(self):
+        self.forward = self.cfgsvc.config_get_forward()
+        self.__check_config_for_metric_updates()
+
     def __check_config_for_metric_updates(self):
         (specs, seq) = self.cfgsvc.config_get_metric_specs()
         if seq <= self.metric_seqid:
@@ -182,8 +287,22 @@ class Filter(ServiceMixin):
         # TODO: instead of clearing the list, try to keep old specs (and cached data)
         self.metric_specs = {}
         for s in specs:
-            self.metric_specs[s.config_name] = (s, [])
+            reducer = None
+            if s.reduce is not None:
+                reducer = Reducer(s.reduce)
+            # compiled once per spec; threshold expressions keep state in the closure
+            check = None
+            if s.threshold is not None:
+                check = s.threshold.compile()
+            self.metric_specs[s.config_name] = (s, [], reducer, check)
         self.metric_seqid = seq
+
+        if self.store is not None:
+            # size new series to hold the store's max-age of samples
+            rates = {s.config_name: s.shortest_rate for s in specs}
+            rates.update((s.config_name + '-aggr', s.longest_rate) for s in specs
+                         if s.aggr is not None)
+            self.store.set_rates(rates)
         self.logger.debug('new metric specs: {}'.format(self.metric_specs))
         # XXX: trigger new metric setup
 
@@ -39,14 +39,14 @@ class Management(ServiceMixin):
         # setup service for polling.
 
         # we receive join requests on this socket
-        self.join_socket = self.ctx.socket(ROUTER)
+        self.join_socket = self._socket(ROUTER)
         self.join_socket.bind(self.endpoint.bind_uri(EndpntSpec.CONTROL))
 
         # we receive special control messages on this socket during recovery
         self.control_sock = None
 
         # we send topo discovery messages on this socket
-        self.disc_socket = self.ctx.socket(PUB)
+        self.disc_socket = self._socket(PUB)
         self.disc_socket.set_hwm(1)  # don't hold onto more than 1 pub
 
         for group in self.cfgsvc.config_get_groups():
@@ -161,7 +161,7 @@ class Management(ServiceMixin):
     def __stop_group(self, stop_group):
         collector = self.cfgsvc.topo_get_collector(stop_group)
         assert collector is not None
-        size = len(collector.children)
+        size = self.cfgsvc.topo_group_size(stop_group)
 
         # remove group's branch from the tree (by removing collector)
         self.cfgsvc.topo_del_branch(collector)
@@ -182,7 +182,7 @@ class Management(ServiceMixin):
         stop_msg = STOP(self.endpoint, self.uuid)
         num_rep = 0
 
-        self.control_sock = self.ctx.socket(ROUTER)
+        self.control_sock = self._socket(ROUTER)
         bind_addr = self.control_sock.bind_to_random_port("tcp://*")
 
         # subtract CONTROL offset so the port calculated by the remote node matches the
@@ -238,34 +238,41 @@ class Management(ServiceMixin):
 
         # lookup node group
         # @todo need to keep track of nodes which have already POLO'ed / issue #39
-        for group in self.cfgsvc.config_get_groups():
-            if polo_msg.endpoint in self.cfgsvc.config_get_endpoints(group):
-                self.logger.debug('found base group: %s' % group)
-
-                collector = self.cfgsvc.topo_get_collector(group)
-                if collector is not None:
-                    # group already exists, make sensor (leaf) node
-                    parent = collector
-                    level = 'leaf'
-                else:
-                    # first node in group, make collector
-                    parent = self.cfgsvc.topo_get_root()
-                    level = 'branch'
-
-                node = self.cfgsvc.topo_insert_endpoint(
-                    polo_msg.endpoint,
-                    polo_msg.uuid,
-                    level,
-                    group,
-                    parent)
+        admission = self.cfgsvc.config_get_admission()
+        (group, rule, admitted) = admission.lookup(polo_msg.endpoint)
+
+        if group is None:
+            # silently ignore unknown base endpoints
+            self.logger.debug('no base group found for %s' % str(polo_msg.endpoint))
+            # @todo: cannot return None--using strict REQ/REP pattern / issue #26
+            return None
+
+        if not admitted:
+            self.logger.debug('%s filtered from group %s by %s%s' % (
+                str(polo_msg.endpoint), group, rule.action, rule.match))
+            return None
+
+        self.logger.debug('found base group: %s' % group)
+
+        collector = self.cfgsvc.topo_get_collector(group)
+        if collector is not None:
+            # group already exists, make sensor (leaf) node
+            parent = collector
+            level = 'leaf'
+        else:
+            # first node in group, make collector
+            parent = self.cfgsvc.topo_get_root()
+            level = 'branch'
 
-                # create reply message
-                return node.assignment()
+        node = self.cfgsvc.topo_insert_endpoint(
+            polo_msg.endpoint,
+            polo_msg.uuid,
+            level,
+            group,
+            parent)
 
-        # silently ignore unknown base endpoints
-        self.logger.debug('no base group found for %s' % str(polo_msg.endpoint))
-        # @todo: cannot return None--using strict REQ/REP pattern / issue #26
-        return None
+        # create reply message
+        return node.assignment()
 
     def __check_sos(self, remote):
         group = remote.group
@@ -289,7 +296,7 @@ class Management(ServiceMixin):
             self.logger.warn('received SOS from {} for unknown group: {}'.format(remote, group))
         else:
             have = len(nodes)
-            need = len(c.children) / 3
+            need = self.cfgsvc.topo_group_size(group) / 3
             if have < need:
                 # not enough nodes have detected the down node; ignore for now
                 self.logger.debug('have SOS from {} nodes; need {} more to continue'.format(have, need - have))
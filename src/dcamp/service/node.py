@@ -34,10 +34,13 @@ class Node(ServiceMixin):
             local_ep,
             local_uuid,
             config_svc,  # must be None
+            runtime='thread',  # runtime of the assigned roles' services
     ):
         ServiceMixin.__init__(self, control_pipe, local_ep, local_uuid, config_svc)
         assert config_svc is None
 
+        self.runtime = runtime
+
         self.polo_msg = POLO(self.endpoint, self.uuid)
 
         ####
@@ -47,7 +50,7 @@ class Node(ServiceMixin):
         self.logger.debug('binding to %s' % self.topo_endpoint)
 
         # @todo these sockets need a better naming convention.
-        self.topo_socket = self.ctx.socket(SUB)
+        self.topo_socket = self._socket(SUB)
         self.logger.debug('adding filter: "{}"'.format(TOPO.marco_key()))
         self.topo_socket.setsockopt_string(SUBSCRIBE, TOPO.marco_key())
         self.topo_socket.bind(self.topo_endpoint)
@@ -63,6 +66,8 @@ class Node(ServiceMixin):
         self.role = None
         self.role_pipe = None
         self.role_thread = None
+        # set while waiting for stopped role's thread to exit
+        self.role_stop_deadline = None
         self.state = None
 
         self.level = None
@@ -124,6 +129,10 @@ class Node(ServiceMixin):
 
         ServiceMixin._cleanup(self)
 
+    def _pre_poll(self):
+        if self.role_stop_deadline is not None:
+            self.__check_role_stopped()
+
     def _post_poll(self, items):
         if self.topo_socket in items:
             topo_msg = TOPO.recv(self.topo_socket)
@@ -145,7 +154,7 @@ class Node(ServiceMixin):
             self.control_uuid = topo_msg.uuid
             self.control_ep = topo_msg.endpoint
 
-            self.control_socket = self.ctx.socket(DEALER)
+            self.control_socket = self._socket(DEALER)
             self.control_socket.connect(self.control_ep.connect_uri(EndpntSpec.CONTROL))
             self.poller.register(self.control_socket, POLLIN)
 
@@ -209,24 +218,35 @@ class Node(ServiceMixin):
                 self.poller.unregister(self.role_pipe)
                 self.role_pipe = None
 
-                # wait for thread to exit
-                self.role_thread.join(timeout=60)
-                if self.role_thread.isAlive():
-                    self.logger.error('!!! %s role is still alive !!!' % self.role)
-                else:
-                    self.logger.debug('%s role stopped' % self.role)
-
-                self.role_thread = None
-                self.role = None
-                self.level = None
-
-                self.logger.debug('node stopped; back to BASE')
-                self.set_state(Node.BASE)
+                # wait for thread to exit without blocking; other nodes may share our
+                # event loop (see AsyncioRuntime) and the role may be waiting on them
+                # while stopping
+                self.role_stop_deadline = now_msecs() + 60e3
+                self.__check_role_stopped()
 
             else:
                 self.logger.error('unknown control command: %s' % response.command)
                 return
 
+    def __check_role_stopped(self):
+        """ finishes stopping the role once its thread exited (or the deadline passed) """
+        if self.role_thread.is_alive():
+            if now_msecs() < self.role_stop_deadline:
+                self.poller_timer = 100  # check again soon
+                return
+            self.logger.error('!!! %s role is still alive !!!' % self.role)
+        else:
+            self.logger.debug('%s role stopped' % self.role)
+
+        self.role_thread = None
+        self.role_stop_deadline = None
+        self.poller_timer = None
+        self.role = None
+        self.level = None
+
+        self.logger.debug('node stopped; back to BASE')
+        self.set_state(Node.BASE)
+
     def __handle_recovery(self, msg):
 
         if 'branch' != self.level:
@@ -312,6 +332,7 @@ class Node(ServiceMixin):
                 self.endpoint,
                 self.uuid,
                 response['config-file'],
+                self.runtime,
             )
 
         else:
@@ -333,6 +354,7 @@ class Node(ServiceMixin):
                     self.uuid,
                     response['parent'],
                     response['group'],
+                    self.runtime,
                 )
 
             else:
@@ -342,6 +364,7 @@ class Node(ServiceMixin):
                     self.uuid,
                     response['parent'],
                     response['group'],
+                    self.runtime,
                 )
 
         peer = None  # closed by peer/role
@@ -9,6 +9,8 @@ from dcamp.types.messages.control import CONTROL, SOS, YO
 from dcamp.types.messages.topology import RECOVERY, gen_uuid, TOPO
 from dcamp.types.specs import EndpntSpec
 from dcamp.util.functions import now_msecs, isInstance_orNone
+from dcamp.util.inproc import LocalSocket
+from dcamp.util.trace import MsgTracer
 
 RECOVERY_SILENCE_PERIOD_MS = 5 * 60 * 1000  # wait five minutes before retrying recovery activity
 RECOVERY_ELECTION_WAIT_MS = 30 * 1000  # wait thirty seconds before confirming new leader
@@ -91,6 +93,12 @@ class RecoveryThread(Thread):
         self.__msg_queue = []
 
         self.logger = getLogger('dcamp.service.node.Recovery')
+        self.tracer = MsgTracer(self.logger)
+
+    def _socket(self, socket_type):
+        socket = self.ctx.socket(socket_type, socket_class=LocalSocket)
+        socket.tracer = self.tracer
+        return socket
 
     def add_to_queue(self, msg):
         with self.lock:
@@ -131,7 +139,7 @@ class MetricSOS(RecoveryThread):
         self.recovery_socket = None
 
     def _run(self):
-        self.recovery_socket = self.ctx.socket(DEALER)
+        self.recovery_socket = self._socket(DEALER)
         self.recovery_socket.connect(self.root_ep.connect_uri(EndpntSpec.CONTROL))
 
         msg = SOS(self.endpoint, self.uuid)
@@ -188,10 +196,10 @@ class CollectorSOS(RecoveryThread):
 
     def __init_sockets(self):
         # we send election commands (in response to a SUB'ed message) on this socket
-        self.control_out = self.ctx.socket(DEALER)
+        self.control_out = self._socket(DEALER)
 
         # we receive election commands (in response to a PUB'ed message) on this socket
-        self.control_in = self.ctx.socket(ROUTER)
+        self.control_in = self._socket(ROUTER)
         bind_addr = self.control_in.bind_to_random_port("tcp://*")
         self.poller.register(self.control_in, POLLIN)
 
@@ -201,7 +209,7 @@ class CollectorSOS(RecoveryThread):
         self.logger.debug('binding recovery socket to {}'.format(self.recovery_ep))
 
         # we send election PUBs on this socket
-        self.pub = self.ctx.socket(PUB)
+        self.pub = self._socket(PUB)
 
         for c in self.cfgsvc.topo_get_all_collectors():
             if c.endpoint == self.endpoint:
@@ -0,0 +1,86 @@
+import asyncio
+from logging import getLogger
+from threading import Event, Thread
+
+__all__ = [
+    'RUNTIMES',
+    'create_runtime',
+    'ThreadRuntime',
+    'AsyncioRuntime',
+]
+
+
+class ThreadRuntime(object):
+    """ runs each service of a role in its own thread (see ServiceMixin.run()) """
+
+    name = 'thread'
+
+    def __init__(self, role_name):
+        self.role_name = role_name
+
+    def start(self, services):
+        for service in services:
+            service.start()
+
+    def join(self, service, timeout=None):
+        service.join(timeout=timeout)
+
+    def is_alive(self, service):
+        return service.is_alive()
+
+
+class AsyncioRuntime(object):
+    """
+    Runs all services of a role as coroutines of one event loop, in one thread (see
+    ServiceMixin.run_async()). Services still use their _pre_poll() / _post_poll()
+    methods; only the poll itself waits on the event loop.
+
+    N.B.: a service blocking outside its poll (e.g. waiting on a socket) blocks the role's
+    other services.
+    """
+
+    name = 'asyncio'
+
+    def __init__(self, role_name):
+        self.role_name = role_name
+        self.logger = getLogger('dcamp.service.runtime')
+
+        # { service : Event }; set when the service's coroutine returns
+        self.__done = {}
+        self.__thread = None
+
+    def start(self, services):
+        assert self.__thread is None, 'services already started'
+        for service in services:
+            self.__done[service] = Event()
+
+        self.__thread = Thread(target=asyncio.run, args=(self.__run_all(services),),
+                               name='dcamp.runtime.{}'.format(self.role_name))
+        self.__thread.start()
+
+    async def __run_all(self, services):
+        # each service handles its own errors; a failing service does not stop the others
+        await asyncio.gather(*[self.__run(service) for service in services])
+
+    async def __run(self, service):
+        try:
+            await service.run_async()
+        except Exception:
+            self.logger.exception('%s service failed' % service)
+        finally:
+            self.__done[service].set()
+
+    def join(self, service, timeout=None):
+        self.__done[service].wait(timeout=timeout)
+
+    def is_alive(self, service):
+        return service in self.__done and not self.__done[service].is_set()
+
+
+# { name : runtime-class }
+RUNTIMES = dict((cls.name, cls) for cls in (ThreadRuntime, AsyncioRuntime))
+
+
+def create_runtime(name, role_name):
+    """ @returns new runtime of given name, for the services of given role """
+    return RUNTIMES[name](role_name)
@@ -1,11 +1,13 @@
 import psutil
 
-from zmq import PUSH  # pylint: disable-msg=E0611
+from zmq import PUSH, PULL, POLLIN, Again  # pylint: disable-msg=E0611
 
 import dcamp.types.messages.data as data
 from dcamp.types.specs import EndpntSpec, MetricCollection
 from dcamp.service.service import ServiceMixin
-from dcamp.util.functions import now_secs, now_msecs
+from dcamp.util.functions import now_msecs
+from dcamp.util.probes import ProbePool, disk_io, scan_processes
+from dcamp.util.scheduler import AdaptiveRate, Scheduler
 
 
 class Sensor(ServiceMixin):
@@ -18,76 +20,151 @@ class Sensor(ServiceMixin):
     ):
         ServiceMixin.__init__(self, control_pipe, local_ep, local_uuid, config_svc)
 
-        # goal: sort by next collection time
-        self.metric_collections = []
+        # metric collections, ordered by next collection time
+        self.scheduler = Scheduler()
         self.metric_seqid = -1
 
+        # { metric-spec : AdaptiveRate } of adaptive specs
+        self.adaptive = {}
+
         self.push_cnt = 0
 
         # we push metrics on this socket (to filter service)
-        self.metrics_socket = self.ctx.socket(PUSH)
+        self.metrics_socket = self._socket(PUSH)
         self.metrics_socket.connect(self.endpoint.connect_uri(EndpntSpec.DATA_INTERNAL, 'inproc'))
 
-        self.next_collection = now_secs()  # units: seconds
+        self.next_collection = now_msecs()  # units: msecs
+        self._watch_config('/CONFIG/', self.__check_config_for_metric_updates)
+
+        # expensive metrics (process table scans and disk counters) are probed in the
+        # worker pool; results are received on this socket
+        self.probe_socket = self._socket(PULL)
+        self.probe_socket.bind(self.endpoint.bind_uri(EndpntSpec.PROBE_RESULTS, 'inproc'))
+        self.probes = ProbePool(self.endpoint.connect_uri(EndpntSpec.PROBE_RESULTS,
+                                                          'inproc'))
+        self.poller.register(self.probe_socket, POLLIN)
 
     def _cleanup(self):
         # service exiting; return some status info and cleanup
         self.logger.debug("%d pushes; metrics = [%s]" %
-                          (self.push_cnt, self.metric_collections))
+                          (self.push_cnt, self.scheduler))
 
         self.metrics_socket.close()
         del self.metrics_socket
 
+        self.probe_socket.close()
+        del self.probe_socket
+
         ServiceMixin._cleanup(self)
 
     def _pre_poll(self):
-        self.__check_config_for_metric_updates()
-
-        now = now_secs()
-        if self.next_collection <= now:
+        if self.next_collection <= now_msecs():
             self.__collect_and_push_metrics()
 
-        # next_collection is in secs; subtract current msecs to get next wakeup epoch
-        wakeup = max(0, (self.next_collection * 1e3) - now_msecs())
+        for (name, collections) in self.probes.expire():
+            self.logger.error('%s probe timed out; %d metrics not collected' % (
+                name, len(collections)))
+
+        next_wakeup = self.next_collection
+        if self.probes.next_deadline is not None:
+            next_wakeup = min(next_wakeup, self.probes.next_deadline)
+
+        wakeup = max(0, next_wakeup - now_msecs())
         self.logger.debug('next wakeup in %dms' % wakeup)
         self.poller_timer = wakeup
 
     def _post_poll(self, items):
-        pass
+        if self.probe_socket in items:
+            self.__recv_probe_results()
 
     def __collect_and_push_metrics(self):
 
-        if len(self.metric_collections) == 0:
-            # check for new metric specs every hb-interval seconds
-            self.next_collection = now_secs() + self.cfgsvc.config_get_hb_int()
+        if len(self.scheduler) == 0:
+            # nothing to collect until new metric specs arrive (see _watch_config())
+            self.next_collection = (now_msecs() +
+                                    int(self.cfgsvc.config_get_hb_int() * 1e3))
             return
 
-        collected = []
-        while True:
-            collection = self.metric_collections.pop(0)
-            assert collection.epoch <= now_secs(), 'next metric is not scheduled for collection'
+        now = now_msecs()
+        due = self.scheduler.pop_due(now)
 
-            (msg, collection) = self.__process(collection)
-            if msg is not None:
-                msg.send(self.metrics_socket)
-                self.push_cnt += 1
-            collected.append(collection)
-
-            if len(self.metric_collections) == 0:
-                # no more work
-                break
-
-            if self.metric_collections[0].epoch > now_secs():
-                # no more work scheduled
-                break
+        collected = []
+        (procs, disks) = ([], [])
+        for collection in due:
+            detail = collection.spec.detail
+            if detail.startswith('PROC_'):
+                procs.append(collection)
+            elif 'DISK' == detail:
+                disks.append(collection)
+            else:
+                msg = self.__process(collection, now)
+                if msg is not None:
+                    collected.append(msg)
+
+            # add the collected metric back into the schedule; probed metrics keep their
+            # cadence regardless of when their probe finishes
+            self.scheduler.reschedule(collection, now, self.__period(collection.spec))
+
+        # walk the process table once for all PROC_* metrics due this tick; sensors of the
+        # same metrics share their scans (see ProbePool.submit())
+        if len(procs) > 0:
+            wanted = {}
+            for c in procs:
+                wanted.setdefault(c.spec.param, set()).add(c.spec.detail)
+            share = ('process-table',
+                     frozenset((c.spec.param, c.spec.detail) for c in procs))
+            self.__probe('process-table', procs, share, scan_processes, wanted)
+        if len(disks) > 0:
+            self.__probe('disk-io', disks, 'disk-io', disk_io)
+
+        self.__push(collected)
 
-        # add the collected metrics back into our list
-        self.metric_collections = sorted(self.metric_collections + collected)
         # set the new collection wakeup
-        self.next_collection = self.metric_collections[0].epoch
+        self.next_collection = self.scheduler.next_epoch
+
+    def __period(self, spec):
+        """ @returns current sampling period (in msecs) of given spec """
+        if spec in self.adaptive:
+            return self.adaptive[spec].period
+        return spec.rate * 1000
+
+    def __push(self, collected):
+        for msg in data.batch(collected):
+            msg.send(self.metrics_socket)
+            self.push_cnt += 1
+
+    def __probe(self, name, collections, share, fn, *args):
+        # probe must finish before its metrics are due again
+        timeout = min(self.__period(c.spec) for c in collections) / 1e3
+        if not self.probes.submit(name, timeout, collections, fn, *args, share=share):
+            self.logger.warn('%s probe still running; %d metrics not collected' % (
+                name, len(collections)))
+
+    def __recv_probe_results(self):
+        while True:
+            try:
+                result = self.probes.recv(self.probe_socket)
+            except Again:
+                return
+
+            if result is None:
+                self.logger.debug('dropped probe result received after its timeout')
+                continue
+
+            # samples are timed by the probe, which another sensor may have started
+            (name, collections, value, error, time) = result
+            if error is not None:
+                self.logger.error('%s probe failed: %s' % (name, error))
+                continue
+
+            collected = []
+            for collection in collections:
+                msg = self.__process(collection, time, value)
+                if msg is not None:
+                    collected.append(msg)
+            self.__push(collected)
 
     def __check_config_for_metric_updates(self):
-        # TODO: optimize this to only check the seq-id
         (specs, seq) = self.cfgsvc.config_get_metric_specs()
         if seq <= self.metric_seqid:
             return
@@ -95,32 +172,40 @@ class Sensor(ServiceMixin):
         old_specs = []
 
         # add all old metric specs, continue with its next collection time
-        for collection in self.metric_collections:
+        for collection in self.scheduler:
             if collection.spec in specs:
                 old_specs.append(collection)
                 specs.remove(collection.spec)
 
         # add all new metric specs, starting collection now
-        new_specs = [MetricCollection(0, elem) for elem in specs]
+        now = now_msecs()
+        new_specs = [MetricCollection(now, elem) for elem in specs]
 
-        self.metric_collections = sorted(old_specs + new_specs)
+        self.scheduler = Scheduler(old_specs + new_specs)
         self.metric_seqid = seq
 
-        self.logger.debug('new metric specs: %s' % self.metric_collections)
+        # keep the adapted periods of old specs
+        self.adaptive = dict((c.spec, self.adaptive.get(c.spec) or AdaptiveRate(c.spec))
+                             for c in self.scheduler if c.spec.is_adaptive)
+
+        self.logger.debug('new metric specs: %s' % self.scheduler)
 
         # reset next collection wakeup with new values
-        if len(self.metric_collections) > 0:
-            self.next_collection = self.metric_collections[0].epoch
+        if len(self.scheduler) > 0:
+            self.next_collection = self.scheduler.next_epoch
         else:
-            # check for new metric specs every hb-interval seconds
-            self.next_collection = now_secs() + self.cfgsvc.config_get_hb_int()
-
-    def __process(self, collection):
-        """ returns tuple of (data-msg, metric-collection) """
+            # nothing to collect until new metric specs arrive
+            self.next_collection = (now_msecs() +
+                                    int(self.cfgsvc.config_get_hb_int() * 1e3))
+
+    def __process(self, collection, time, probed=None):
+        """
+        returns data-msg or None; probed is the result of the collection's probe (see
+        __collect_and_push_metrics())
+        """
         # TODO: move this to another class?
 
         (value, base_value) = (None, None)
-        time = now_msecs()
 
         props = {
             'detail': collection.spec.detail,
@@ -152,8 +237,7 @@ class Sensor(ServiceMixin):
             props['type'] = 'rate'
             msg_cls = data.DataRate
 
-            disk = psutil.disk_io_counters()
-            value = disk.read_bytes + disk.write_bytes
+            value = probed
 
         elif 'NETWORK' == detail:
             props['type'] = 'rate'
@@ -163,76 +247,35 @@ class Sensor(ServiceMixin):
             value = net.bytes_sent + net.bytes_recv
 
         elif detail.startswith('PROC_'):
-
-            # get new list of processes every time in order to not miss any new
-            # processes that are started after the first collection
-            pcount = 0
-            value = 0
-            for proc in psutil.process_iter():
-                try:
-                    pinfo = proc.as_dict(attrs=['pid', 'name'])
-                except psutil.NoSuchProcess:
-                    continue
-
-                if pinfo['name'] != param:
-                    continue
-
-                pcount += 1
-                value += self.__get_proc_value(detail, proc)
+            assert probed is not None, 'process table not scanned for this collection'
+            (pcount, value, base_value) = probed.get((param, detail), (0, 0, None))
 
             if 0 == pcount:
-                c = MetricCollection(now_secs() + collection.spec.rate, collection.spec)
-                return None, c
+                return None
 
             props['p-count'] = pcount
 
+            # base values are read by the probe, along with the values
             if 'PROC_CPU' == detail:
                 props['type'] = 'percent'
                 msg_cls = data.DataPercent
-                # cpu_times() is accurate to two decimal points
-                base_value = int(sum(psutil.cpu_times()) * 1e2)
 
             elif 'PROC_MEM' == detail:
                 props['type'] = 'percent'
                 msg_cls = data.DataPercent
-                base_value = psutil.virtual_memory().total
 
             elif 'PROC_IO' == detail:
                 props['type'] = 'rate'
                 msg_cls = data.DataRate
-            
+
             else:
                 raise NotImplementedError('unknown process metric type: {}'.format(detail))
 
-
         else:
             raise NotImplementedError('unknown metric type: {}'.format(detail))
 
-        m = msg_cls(self.endpoint, props, time, value, base_value)
-
-        # create new collection with next collection time
-        c = MetricCollection(now_secs() + collection.spec.rate, collection.spec)
-
-        return m, c
-
-    def __get_proc_value(self, detail, proc):
-        if 'PROC_CPU' == detail:
-            # cpu_times() is accurate to two decimal points
-            return int(sum(proc.cpu_times()) * 1e2)
-
-        elif 'PROC_MEM' == detail:
-            return proc.memory_info().rss
-
-        elif 'PROC_IO' == detail:
-            try:
-                io = proc.io_counters()
-                value = io.read_bytes + io.write_bytes
-                if value < 0:
-                    # no support for *_bytes in bsd
-                    value = 0
-            except AttributeError:
-                # no support for io_counters() in osx
-                value = 0
-
-            return value
-
+        msg = msg_cls(self.endpoint, props, time, value, base_value)
+        adaptive = self.adaptive.get(collection.spec)
+        if adaptive is not None:
+            adaptive.update(msg)
+        return msg
@@ -1,11 +1,15 @@
+from asyncio import get_running_loop
 from logging import getLogger
 from threading import Thread
 from uuid import UUID
 
-from zmq import Context, Poller, POLLIN, ZMQError, ETERM  # pylint: disable-msg=E0611
+from zmq import Context, Poller, POLLIN, ZMQError, ETERM, Again, NOBLOCK  # pylint: disable-msg=E0611
+from zmq.asyncio import Poller as AsyncPoller
 
 from dcamp.types.specs import EndpntSpec
 from dcamp.util.decorators import runnable
+from dcamp.util.inproc import LocalSocket
+from dcamp.util.trace import MsgTracer
 
 
 @runnable
@@ -24,10 +28,16 @@ class ServiceMixin(Thread):
         self.__cfgsvc = config_svc
 
         self.logger = getLogger('dcamp.service.%s' % self)
+        self.tracer = MsgTracer(self.logger)
 
         self.poller = Poller()
         self.poller_timer = None
 
+        # [ (prefix, callback) ] given to _watch_config(), and their sockets once started
+        self.__watches = []
+        # { socket : callback }
+        self.__watch_sockets = {}
+
         self.poller.register(self.__control_pipe, POLLIN)
 
     def __str__(self):
@@ -45,6 +55,38 @@ class ServiceMixin(Thread):
     def uuid(self):
         return self.__uuid
 
+    def _socket(self, socket_type):
+        """ creates socket which traces messages with this service's tracer """
+        socket = self.ctx.socket(socket_type, socket_class=LocalSocket)
+        socket.tracer = self.tracer
+        return socket
+
+    def _watch_config(self, prefix, callback):
+        """
+        Calls given callback once the configuration is available, and then (from the
+        service loop, before _post_poll()) whenever keys under given prefix are written.
+        """
+        self.__watches.append((prefix, callback))
+
+    def __start_watches(self):
+        for (prefix, callback) in self.__watches:
+            socket = self.__cfgsvc.watch(prefix)
+            self.poller.register(socket, POLLIN)
+            self.__watch_sockets[socket] = callback
+            callback()
+
+    def __do_watches(self, items):
+        for (socket, callback) in self.__watch_sockets.items():
+            if socket not in items:
+                continue
+            # any number of changes result in one callback
+            try:
+                while True:
+                    socket.recv(flags=NOBLOCK)
+            except Again:
+                pass
+            callback()
+
     def __send_control(self, message):
         self.__control_pipe.send_string(message)
 
@@ -62,6 +104,10 @@ class ServiceMixin(Thread):
         self.__control_pipe.close()
         del self.__control_pipe
 
+        for socket in self.__watch_sockets:
+            socket.close()
+        self.__watch_sockets.clear()
+
         self.logger.debug('service cleanup finished; exiting')
 
     def _pre_poll(self):
@@ -83,27 +129,57 @@ class ServiceMixin(Thread):
             self.__send_control('WTF')
             self.logger.error('unknown control command: %s' % msg)
 
+    def __handle(self, items):
+        """ handles the sockets returned by one poll """
+        self.__do_watches(items)
+        self._post_poll(items)
+        if self.__control_pipe in items:
+            self._do_control()
+
+    def __handle_error(self, e):
+        if e.errno == ETERM:
+            self.logger.debug('received ETERM: %s' % self.__class__)
+            self.error_state()
+        else:
+            raise e
+
     def run(self):
         self.run_state()
 
         # wait for configuration service to init
         if self.__cfgsvc is not None:
             self.__cfgsvc.wait_for_gogo()
+            self.__start_watches()
 
         while self.in_running_state:
             try:
                 self._pre_poll()
-                items = dict(self.poller.poll(self.poller_timer))
-                self._post_poll(items)
-                if self.__control_pipe in items:
-                    self._do_control()
-
+                self.__handle(dict(self.poller.poll(self.poller_timer)))
             except ZMQError as e:
-                if e.errno == ETERM:
-                    self.logger.debug('received ETERM: %s' % self.__class__)
-                    self.error_state()
-                else:
-                    raise
+                self.__handle_error(e)
 
         # thread is stopping; cleanup and exit
         return self._cleanup()
+
+    async def run_async(self):
+        """ same as run(), but awaits the poll on the event loop; see AsyncioRuntime """
+        self.run_state()
+
+        # wait for configuration service to init, without blocking the other services
+        if self.__cfgsvc is not None:
+            await get_running_loop().run_in_executor(None, self.__cfgsvc.wait_for_gogo)
+            self.__start_watches()
+
+        # sockets are (un)registered with self.poller; share its list of sockets
+        poller = AsyncPoller()
+        poller.sockets = self.poller.sockets
+
+        while self.in_running_state:
+            try:
+                self._pre_poll()
+                self.__handle(dict(await poller.poll(self.poller_timer)))
+            except ZMQError as e:
+                self.__handle_error(e)
+
+        # coroutine is stopping; cleanup and exit
+        return self._cleanup()
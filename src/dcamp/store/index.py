@@ -0,0 +1,125 @@
+import json
+from os import path, replace
+
+from dcamp.types.messages.common import _PROPS
+from dcamp.types.specs import EndpntSpec
+
+__all__ = [
+    'Series',
+    'SeriesIndex',
+]
+
+
+class Series(object):
+    """
+    One stored time-series: a (source, config-name) pair and its segment file.
+
+    Segments only hold (time, value, base-value) rows, so a series keeps a single set of
+    properties: those of its first sample. Samples written later are stored with those
+    properties too, whatever their own, e.g. a newer config-seqid or per-sample properties
+    such as p-count. A config-name whose metric changes type must therefore not reuse an
+    existing series; its rows would be calculated as the old type.
+    """
+
+    def __init__(self, sid, source, config_name, properties):
+        self.sid = sid
+        self.source = source
+        self.config_name = config_name
+        self.properties = properties  # of the first sample; used to rebuild Data messages
+
+        # state of the segment, tracked so retention can be checked without opening it;
+        # not persisted, see Segment.peek()
+        self.capacity = None
+        self.count = 0
+        self.first_time = None
+        self.last_time = None
+
+    def __str__(self):
+        return '%s/%s' % (self.source, self.config_name)
+
+    def update(self, capacity, count, first_time, last_time):
+        """ tracks given state of the series' segment """
+        (self.capacity, self.count) = (capacity, count)
+        (self.first_time, self.last_time) = (first_time, last_time)
+
+    @property
+    def key(self):
+        return self.source, self.config_name
+
+    @property
+    def filename(self):
+        return 'series-%d.seg' % self.sid
+
+
+class SeriesIndex(object):
+    """
+    Index of all series in a store directory, persisted as json next to the segments.
+
+    Adding or removing series only marks the index dirty; the owner saves it in batches
+    (see Store.expire()). It is written to a temp file first and then renamed into place
+    so a crash never leaves a partial index behind.
+    """
+
+    FILENAME = 'index.json'
+    VERSION = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.__next_sid = 0
+        self.dirty = False
+
+        # { (source, config-name) : Series }
+        self.__series = {}
+
+        filename = path.join(self.directory, SeriesIndex.FILENAME)
+        if path.exists(filename):
+            with open(filename) as f:
+                self.__load(json.load(f))
+
+    def __load(self, doc):
+        if doc.get('version') != SeriesIndex.VERSION:
+            raise ValueError('unsupported store index version: %s' % doc.get('version'))
+
+        self.__next_sid = doc['next-sid']
+        for s in doc['series']:
+            series = Series(s['sid'], EndpntSpec.from_str(s['source']), s['config-name'],
+                            _PROPS._decode_dict(s['properties']))
+            self.__series[series.key] = series
+
+    def save(self):
+        doc = {
+            'version': SeriesIndex.VERSION,
+            'next-sid': self.__next_sid,
+            'series': [{
+                'sid': s.sid,
+                'source': str(s.source),
+                'config-name': s.config_name,
+                'properties': _PROPS._encode_dict(s.properties).decode(),
+            } for s in self.__series.values()],
+        }
+
+        filename = path.join(self.directory, SeriesIndex.FILENAME)
+        with open(filename + '.tmp', 'w') as f:
+            json.dump(doc, f, indent=1)
+        replace(filename + '.tmp', filename)
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.__series)
+
+    def __iter__(self):
+        return iter(list(self.__series.values()))
+
+    def get(self, source, config_name):
+        return self.__series.get((source, config_name))
+
+    def add(self, source, config_name, properties):
+        series = Series(self.__next_sid, source, config_name, dict(properties))
+        self.__next_sid += 1
+        self.__series[series.key] = series
+        self.dirty = True
+        return series
+
+    def remove(self, series):
+        del self.__series[series.key]
+        self.dirty = True
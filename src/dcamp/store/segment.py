@@ -0,0 +1,196 @@
+import mmap
+from bisect import bisect_left
+from os import path
+from struct import Struct
+
+__all__ = [
+    'Segment',
+]
+
+
+class _Column(object):
+    """ logical (oldest-first) view of one ring buffer column; used for bisecting """
+
+    def __init__(self, column, start, count, capacity):
+        (self.column, self.start) = (column, start)
+        (self.count, self.capacity) = (count, capacity)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return self.column[(self.start + i) % self.capacity]
+
+
+class Segment(object):
+    """
+    Fixed-capacity ring buffer of (time, value, base-value) rows in a memory-mapped file.
+
+    The file is a header followed by three fixed-width columns, each with room for
+    capacity rows: times (uint64 msecs), values and base values (doubles; None is stored
+    as NaN). Columns use the native byte order, so segment files are not portable between
+    hosts. Once full, each append overwrites the oldest row.
+
+    Rows must be appended in time order; older rows are dropped (see append()).
+    """
+
+    MAGIC = b'DCSEGMNT'
+    VERSION = 1
+
+    # magic, version, capacity, count, head (next physical row to write)
+    HEADER = Struct('=8sIQQQ')
+    HEADER_SIZE = 64  # keeps the columns 8-byte aligned
+    TIME = Struct('=Q')
+
+    def __init__(self, filename, capacity):
+        """ opens given segment file, creating it with given capacity if missing """
+        self.filename = filename
+
+        if not path.exists(filename):
+            with open(filename, 'wb') as f:
+                f.write(Segment.HEADER.pack(Segment.MAGIC, Segment.VERSION, capacity,
+                                            0, 0))
+                # sparse file; unused rows take no disk space
+                f.truncate(Segment.size_for(capacity))
+
+        self.__file = open(filename, 'r+b')
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0)
+
+        (magic, version, capacity, count, head) = Segment.HEADER.unpack_from(self.__mmap)
+        if magic != Segment.MAGIC or version != Segment.VERSION:
+            self.close()
+            raise ValueError('not a dcamp store segment: %s' % filename)
+        if len(self.__mmap) != Segment.size_for(capacity):
+            self.close()
+            raise ValueError('truncated dcamp store segment: %s' % filename)
+
+        # an existing segment keeps the capacity it was created with
+        self.capacity = capacity
+        self.count = count
+        self.head = head
+
+        view = memoryview(self.__mmap)
+        offset = Segment.HEADER_SIZE
+        (self.__times, self.__values, self.__bases) = [
+            view[offset + i * 8 * capacity:offset + (i + 1) * 8 * capacity].cast(fmt)
+            for (i, fmt) in enumerate('Qdd')]
+        view.release()
+
+    @staticmethod
+    def peek(filename):
+        """
+        Reads the state of given segment file without mapping it.
+
+        @returns (capacity, count, first-time, last-time); times are None if it is empty
+        """
+        with open(filename, 'rb') as f:
+            (magic, version, capacity, count, head) = Segment.HEADER.unpack(
+                f.read(Segment.HEADER.size))
+            if magic != Segment.MAGIC or version != Segment.VERSION:
+                raise ValueError('not a dcamp store segment: %s' % filename)
+            if count == 0:
+                return capacity, count, None, None
+
+            times = []
+            for row in ((head - count) % capacity, (head - 1) % capacity):
+                f.seek(Segment.HEADER_SIZE + 8 * row)
+                times.append(Segment.TIME.unpack(f.read(Segment.TIME.size))[0])
+            return (capacity, count) + tuple(times)
+
+    @staticmethod
+    def size_for(capacity):
+        """ returns file size (in bytes) of a segment with given capacity """
+        return Segment.HEADER_SIZE + 3 * 8 * capacity
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def start(self):
+        """ physical row of the oldest row """
+        return (self.head - self.count) % self.capacity
+
+    @property
+    def first_time(self):
+        return self.__times[self.start] if self.count > 0 else None
+
+    @property
+    def last_time(self):
+        return self.__times[(self.head - 1) % self.capacity] if self.count > 0 else None
+
+    @property
+    def state(self):
+        """ (capacity, count, first-time, last-time); see peek() """
+        return self.capacity, self.count, self.first_time, self.last_time
+
+    def append(self, time, value, base_value):
+        """ appends given row, returning False if it is older than the newest row """
+        return self.extend((time,), (value,), (base_value,)) == 1
+
+    def extend(self, times, values, base_values):
+        """
+        appends given rows (in time order), skipping rows older than the newest row;
+        returns number of rows appended
+        """
+        last = self.last_time
+        appended = 0
+        for (time, value, base_value) in zip(times, values, base_values):
+            if last is not None and time < last:
+                continue
+
+            self.__times[self.head] = time
+            self.__values[self.head] = float('nan') if value is None else value
+            self.__bases[self.head] = float('nan') if base_value is None else base_value
+
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            last = time
+            appended += 1
+
+        if appended > 0:
+            Segment.HEADER.pack_into(self.__mmap, 0, Segment.MAGIC, Segment.VERSION,
+                                     self.capacity, self.count, self.head)
+        return appended
+
+    def bounds(self, start=None, end=None):
+        """ returns logical (oldest-first) row range [lo, hi) with start <= time < end """
+        times = _Column(self.__times, self.start, self.count, self.capacity)
+        lo = 0 if start is None else bisect_left(times, start)
+        hi = self.count if end is None else bisect_left(times, end)
+        return lo, max(lo, hi)
+
+    def rows(self, lo, hi):
+        """ returns lists of times, values, and base values for logical rows [lo, hi) """
+        (times, values, bases) = ([], [], [])
+        for i in range(lo, hi):
+            p = (self.start + i) % self.capacity
+            times.append(self.__times[p])
+            values.append(self.__values[p])
+            bases.append(self.__bases[p])
+
+        # NaN marks "no value"
+        return (times,
+                [None if v != v else v for v in values],
+                [None if b != b else b for b in bases])
+
+    def drop_before(self, time):
+        """ forgets all rows older than given time; returns number of rows dropped """
+        times = _Column(self.__times, self.start, self.count, self.capacity)
+        dropped = bisect_left(times, time)
+        if dropped > 0:
+            self.count -= dropped
+            Segment.HEADER.pack_into(self.__mmap, 0, Segment.MAGIC, Segment.VERSION,
+                                     self.capacity, self.count, self.head)
+        return dropped
+
+    def flush(self):
+        self.__mmap.flush()
+
+    def close(self):
+        # exported views must be released before the map can be closed
+        for column in ('_Segment__times', '_Segment__values', '_Segment__bases'):
+            if hasattr(self, column):
+                getattr(self, column).release()
+                delattr(self, column)
+        self.__mmap.close()
+        self.__file.close()
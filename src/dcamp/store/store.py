@@ -0,0 +1,247 @@
+import logging
+from math import ceil
+from collections import OrderedDict
+from os import makedirs, path, remove
+
+from dcamp.store.index import SeriesIndex
+from dcamp.store.segment import Segment
+from dcamp.types.messages.data import DataBasic, DataBatch
+from dcamp.util.functions import now_msecs
+
+__all__ = [
+    'Store',
+]
+
+
+class Store(object):
+    """
+    Time-series store for the data collected at the root.
+
+    Each (source, config-name) series gets its own Segment: a memory-mapped ring buffer
+    holding the most recent capacity samples. Samples therefore never live in Python
+    objects, except while being written or queried. Rows do not carry properties; queries
+    return the properties of the series' first sample (see Series).
+
+    A new series is sized to hold max_age of samples at the fastest rate of its metric
+    (see set_rates()); series of unknown rate get the default capacity, and keep less than
+    max_age if sampled faster than every max_age / capacity. Segment files are sparse, so
+    a series only takes disk space for the rows it has kept. An existing segment keeps the
+    capacity it was created with.
+
+    Retention is enforced by expire(): rows older than max_age are dropped (and emptied
+    series removed), then whole series are removed, least recently updated first, until
+    the store is no larger than max_bytes. The time bounds of each segment are tracked in
+    its Series, so only segments holding expired rows are opened.
+
+    At most MAX_OPEN segments are mapped at once; others are closed (least recently used
+    first) and reopened on demand.
+    """
+
+    CAPACITY = 64 * 1024  # rows per series of unknown rate; ~1.5Mb per segment file
+    MAX_AGE = 14 * 24 * 60 * 60  # units: seconds
+    MAX_BYTES = 4 * 1024 ** 3
+    MAX_OPEN = 512
+
+    AGGREGATIONS = {
+        'avg': lambda vals: sum(vals) / len(vals),
+        'min': min,
+        'max': max,
+        'sum': sum,
+        'count': len,
+        'last': lambda vals: vals[-1],
+    }
+
+    def __init__(self, directory, capacity=None, max_age=None, max_bytes=None):
+        self.logger = logging.getLogger('dcamp.store')
+
+        self.directory = directory
+        self.capacity = capacity or Store.CAPACITY
+        self.max_age = 1000 * (max_age or Store.MAX_AGE)  # msecs
+        self.max_bytes = max_bytes or Store.MAX_BYTES
+
+        # { config-name : rate }; units: seconds
+        self.rates = {}
+
+        makedirs(self.directory, exist_ok=True)
+        self.index = SeriesIndex(self.directory)
+        for series in self.index:
+            try:
+                series.update(*Segment.peek(path.join(self.directory, series.filename)))
+            except (OSError, ValueError) as e:
+                self.logger.warning('dropping series %s: %s' % (series, e))
+                self.index.remove(series)
+
+        # { sid : Segment }, in least-recently-used order
+        self.__open = OrderedDict()
+
+        (self.write_cnt, self.drop_cnt) = (0, 0)
+
+    def set_rates(self, rates):
+        """ sets the shortest rate (in secs) of each config-name; see capacity_for() """
+        self.rates = dict(rates)
+
+    def capacity_for(self, config_name):
+        """ returns capacity (in rows) of a new series of given config-name """
+        rate = self.rates.get(config_name)
+        if rate is None:
+            return self.capacity
+        return int(ceil(self.max_age / (rate * 1e3))) + 1
+
+    def __segment(self, series):
+        segment = self.__open.get(series.sid)
+        if segment is not None:
+            self.__open.move_to_end(series.sid)
+            return segment
+
+        if len(self.__open) >= Store.MAX_OPEN:
+            (_, oldest) = self.__open.popitem(last=False)
+            oldest.close()
+
+        segment = Segment(path.join(self.directory, series.filename),
+                          series.capacity or self.capacity_for(series.config_name))
+        self.__open[series.sid] = segment
+        return segment
+
+    def __remove(self, series):
+        segment = self.__open.pop(series.sid, None)
+        if segment is not None:
+            segment.close()
+        remove(path.join(self.directory, series.filename))
+        self.index.remove(series)
+        self.logger.debug('removed series %s' % series)
+
+    def series(self):
+        """ returns list of all stored Series """
+        return list(self.index)
+
+    def write(self, messages):
+        """
+        appends the samples of given Data (or DataBatch) messages to their series,
+        creating new series as needed; the samples of a batch are appended at once
+        """
+        for msg in messages:
+            if msg.config_name is None:
+                continue
+
+            series = self.index.get(msg.source, msg.config_name)
+            if series is None:
+                series = self.index.add(msg.source, msg.config_name, msg.properties)
+                self.logger.debug('new series %s' % series)
+
+                # left behind by a series added after the index was last saved
+                filename = path.join(self.directory, series.filename)
+                if path.exists(filename):
+                    remove(filename)
+
+            if isinstance(msg, DataBatch):
+                rows = (msg.times, msg.values, msg.base_values)
+            else:
+                rows = ((msg.time,), (msg.value,), (msg.base_value,))
+
+            segment = self.__segment(series)
+            appended = segment.extend(*rows)
+            if appended > 0:
+                series.update(*segment.state)
+            self.write_cnt += appended
+            self.drop_cnt += len(rows[0]) - appended
+
+    def query(self, source, config_name, start=None, end=None):
+        """
+        Returns the series' samples with start <= time < end (times in msecs; None for no
+        bound) as a DataBatch, or None if the series does not exist.
+        """
+        return self.__query(source, config_name, start, end, 0)
+
+    def __query(self, source, config_name, start, end, before):
+        series = self.index.get(source, config_name)
+        if series is None:
+            return None
+
+        segment = self.__segment(series)
+        (lo, hi) = segment.bounds(start, end)
+        (times, values, bases) = segment.rows(max(0, lo - before), hi)
+        return DataBatch(series.source, dict(series.properties), times, values, bases)
+
+    def downsample(self, source, config_name, interval, start=None, end=None, how='avg'):
+        """
+        Returns list of (bucket-time, value) for the series' calculated values (see
+        Data.calculate()) with start <= time < end, aggregated into buckets of interval
+        msecs using the given aggregation (see AGGREGATIONS).
+        """
+        if how not in Store.AGGREGATIONS:
+            raise ValueError('unknown aggregation: %s' % how)
+        aggregate = Store.AGGREGATIONS[how]
+
+        # values are calculated from consecutive samples, so include the preceding sample
+        batch = self.__query(source, config_name, start, end, 1)
+        if batch is None:
+            return None
+
+        # { bucket-time : [ value, ... ] }, in time order
+        buckets = OrderedDict()
+        prev = None
+        for s in batch.samples:
+            value = None
+            if start is not None and s.time < start:
+                pass  # the preceding sample
+            elif isinstance(s, DataBasic):
+                value = s.value
+            elif (prev is not None and prev.time < s.time and
+                    None not in (prev.value, s.value)):
+                value = prev.calculate(s)
+            prev = s
+
+            if value is not None:
+                buckets.setdefault(s.time - s.time % interval, []).append(value)
+
+        return [(t, aggregate(vals)) for (t, vals) in buckets.items()]
+
+    def expire(self, now=None):
+        """
+        enforces retention by age and size, and saves the index if series were added or
+        removed; returns number of series removed
+        """
+        if now is None:
+            now = now_msecs()
+        removed = 0
+
+        # { series : (last-time, size) }
+        remaining = {}
+        oldest = now - self.max_age
+        for series in self.index:
+            if series.count > 0 and series.first_time < oldest <= series.last_time:
+                # only partially expired; the segment must be opened to drop rows
+                segment = self.__segment(series)
+                segment.drop_before(oldest)
+                series.update(*segment.state)
+
+            if series.count == 0 or series.last_time < oldest:
+                self.__remove(series)
+                removed += 1
+            else:
+                # rows kept, rather than capacity; see class doc
+                remaining[series] = (series.last_time, Segment.size_for(series.count))
+
+        size = sum(s for (_, s) in remaining.values())
+        for series in sorted(remaining, key=remaining.get):
+            if size <= self.max_bytes:
+                break
+            size -= remaining[series][1]
+            self.__remove(series)
+            removed += 1
+
+        if self.index.dirty:
+            self.index.save()
+        return removed
+
+    def flush(self):
+        for segment in self.__open.values():
+            segment.flush()
+
+    def close(self):
+        for segment in self.__open.values():
+            segment.flush()
+            segment.close()
+        self.__open.clear()
+        if self.index.dirty:
+            self.index.save()
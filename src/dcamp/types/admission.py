@@ -0,0 +1,147 @@
+from ipaddress import ip_address, ip_network
+
+from dcamp.types.specs import EndpntSpec, FilterSpec
+
+__all__ = [
+    'AdmissionIndex',
+    'parse_filter',
+]
+
+
+def parse_filter(match):
+    """
+    Parses the match of a filter specification; raises ValueError if invalid.
+
+        192.168.1.0/24, 10.0.0.1  -- ip network (or address) of the node
+        .example.com, *.example.com -- any host name in the domain
+        host.example.com          -- the host name
+
+    @returns ('net', ip-network) or ('suffix', '.domain') or ('host', name)
+    """
+    assert isinstance(match, str)
+    try:
+        return 'net', ip_network(match, strict=False)
+    except ValueError:
+        pass
+
+    name = match.lower()
+    if name.startswith('*.'):
+        name = name[1:]
+    labels = name[1:].split('.') if name.startswith('.') else name.split('.')
+    if not all(label and label.replace('-', '').replace('_', '').isalnum()
+               for label in labels):
+        raise ValueError('filter specification must be ip network or host/domain name: '
+                         '[%s]' % match)
+
+    return name.startswith('.') and ('suffix', name) or ('host', name)
+
+
+class _Rules(object):
+    """
+    Compiled filters of one group. Filters are checked in order and the first match wins,
+    i.e. the matching filter with the lowest index; all kinds of matches are dict lookups,
+    so the cost does not grow with the number of filters.
+    """
+
+    def __init__(self, filters):
+        self.filters = list(filters)
+
+        # { host-name : index }
+        self.hosts = {}
+        # { '.domain' : index }
+        self.suffixes = {}
+        # { (ip-version, prefix-length) : { network-address : index } }
+        self.nets = {}
+
+        for (i, f) in enumerate(self.filters):
+            (kind, match) = parse_filter(f.match)
+            if 'net' == kind:
+                nets = self.nets.setdefault((match.version, match.prefixlen), {})
+                nets.setdefault(int(match.network_address), i)
+            elif 'suffix' == kind:
+                self.suffixes.setdefault(match, i)
+            else:
+                self.hosts.setdefault(match, i)
+
+        # (ip-version, netmask, nets) of every prefix length used by the filters
+        self.masks = [(version, ((1 << bits) - 1) ^ ((1 << (bits - length)) - 1), nets)
+                      for ((version, length), nets) in self.nets.items()
+                      for bits in [32 if 4 == version else 128]]
+
+    def match(self, host):
+        """ @returns first filter matching given host name or address, or None """
+        found = []
+
+        try:
+            address = ip_address(host)
+        except ValueError:
+            address = None
+
+        if address is not None:
+            value = int(address)
+            for (version, mask, nets) in self.masks:
+                if version == address.version and (value & mask) in nets:
+                    found.append(nets[value & mask])
+        else:
+            name = host.lower()
+            if name in self.hosts:
+                found.append(self.hosts[name])
+            # every domain suffix of the name, e.g. ".b.c" and ".c" of "a.b.c"
+            dot = name.find('.')
+            while dot >= 0:
+                if name[dot:] in self.suffixes:
+                    found.append(self.suffixes[name[dot:]])
+                dot = name.find('.', dot + 1)
+
+        return len(found) > 0 and self.filters[min(found)] or None
+
+
+class AdmissionIndex(object):
+    """
+    Index of the configured groups, used by the Management service to admit joining nodes.
+
+    Each endpoint is listed in (at most) one group; a node whose endpoint is not listed is
+    not admitted. The group's filter specifications are then checked in order, and the
+    first matching filter decides: "-" rejects the node, "+" admits it. Nodes matching no
+    filter are admitted. Host names are matched as given; they are never resolved.
+
+    Built once per config version (see Configuration.config_get_admission()).
+    """
+
+    def __init__(self, groups):
+        """ groups is { group : (endpoints, filters) } """
+        # { endpoint : group }
+        self.__groups = {}
+        # { group : _Rules }
+        self.__rules = {}
+
+        # endpoints listed in more than one group belong to the first group, by name
+        for (group, (endpoints, filters)) in sorted(groups.items()):
+            for ep in endpoints:
+                assert isinstance(ep, EndpntSpec)
+                self.__groups.setdefault(ep, group)
+            if len(filters) > 0:
+                assert all(isinstance(f, FilterSpec) for f in filters)
+                self.__rules[group] = _Rules(filters)
+
+    def __len__(self):
+        return len(self.__groups)
+
+    def lookup(self, endpoint):
+        """
+        @returns (group, filter, admitted) for given endpoint; group is None (and admitted
+                 False) if the endpoint is not listed, and filter is the filter deciding
+                 admission, or None
+        """
+        group = self.__groups.get(endpoint)
+        if group is None:
+            return None, None, False
+        if group not in self.__rules:
+            return group, None, True
+        rule = self.__rules[group].match(endpoint.host)
+        return group, rule, rule is None or '-' != rule.action
+
+    def admit(self, endpoint):
+        """ @returns group given endpoint is admitted to, or None """
+        (group, _, admitted) = self.lookup(endpoint)
+        return group if admitted else None
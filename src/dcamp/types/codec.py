@@ -0,0 +1,293 @@
+from datetime import datetime
+from functools import partial
+from struct import Struct, error as struct_error
+from uuid import UUID
+
+from dcamp.types.specs import EndpntSpec, FilterSpec, MetricSpec, ReduceSpec, ThreshSpec
+
+__all__ = [
+    'CodecError',
+    'VERSION',
+    'decode',
+    'encode',
+    'is_pickle',
+    'register',
+]
+
+# bumped whenever the encoding, or the fields of a registered record, change; nodes reject
+# values of other versions rather than mis-decode them
+#   2 -- MetricSpec.reduce field, ReduceSpec ("x") records
+#   3 -- MetricSpec.rate_min and rate_max fields
+VERSION = 3
+
+
+class CodecError(ValueError):
+    pass
+
+
+_PICKLE = 0x80  # first byte of a pickle, protocol 2 and later
+
+_LEN = Struct('!I')
+_INT = Struct('!q')
+_FLOAT = Struct('!d')
+_DATETIME = Struct('!HBBBBBI')
+
+_HEADER = bytes([VERSION])
+
+# { type : (tag, fields-function) }; fields-function returns the record's field values
+_RECORDS = {}
+# { tag-ordinal : (type, field-count, factory) }; factory is called with decoded values
+_FACTORIES = {}
+
+
+def register(cls, tag, fields, factory, count):
+    """
+    Registers given type as record with given (single character) tag: fields(obj) returns
+    the count values to encode, and factory(values) re-creates the object from the list of
+    decoded values.
+    """
+    assert len(tag) == 1 and tag not in 'sN' and ord(tag) not in _TAGS and \
+        ord(tag) not in _FACTORIES, 'tag in use: %s' % tag
+    _RECORDS[cls] = (tag.encode(), fields)
+    _FACTORIES[ord(tag)] = (cls, count, factory)
+
+
+def is_pickle(buffer):
+    return len(buffer) > 0 and buffer[0] == _PICKLE
+
+
+def encode(value):
+    """
+    Encodes given configuration value (see CONFIG messages) as the version byte followed
+    by the tagged value; raises CodecError if the value's type is not supported.
+
+        value    = tag-byte payload
+        None     = "N"
+        bool     = "T" / "F"
+        int      = "i" 8 bytes signed  /  "I" length (4 bytes) signed big-endian bytes
+        float    = "f" 8 bytes
+        str      = "s" length (4 bytes) utf-8 bytes
+        bytes    = "b" length (4 bytes) bytes
+        list     = "l" count (4 bytes) *value
+        tuple    = "t" count (4 bytes) *value
+        dict     = "d" count (4 bytes) *( value value )
+        UUID     = "u" 16 bytes
+        datetime = "D" year (2 bytes) month day hour minute second (1 byte each)
+                   microsecond (4 bytes); naive only
+        record   = registered-tag *value  (one value per field; see register())
+
+    All integers are in network order. Specification types are records, as are topology
+    nodes (registered by dcamp.types.topo). Callers fall back to pickle for other types;
+    pickles are told apart by their first byte (see is_pickle()).
+    """
+    if type(value) is str:  # common case
+        data = value.encode()
+        return _HEADER + b's' + _LEN.pack(len(data)) + data
+
+    out = bytearray(_HEADER)
+    _encode(value, out)
+    return bytes(out)
+
+
+def decode(buffer):
+    """ @returns value decoded from given bytes; raises CodecError if invalid """
+    buffer = bytes(buffer)
+    if len(buffer) == 0 or buffer[0] != VERSION:
+        raise CodecError('unsupported value encoding: %r' % buffer[:1])
+    try:
+        (value, pos) = _decode(buffer, 1)
+    except (struct_error, IndexError, UnicodeDecodeError, RecursionError) as e:
+        raise CodecError('truncated or invalid value: %s' % e)
+    if pos != len(buffer):
+        raise CodecError('trailing bytes after value')
+    return value
+
+
+def _encode(value, out):
+    t = type(value)
+    if t is str:
+        data = value.encode()
+        out += b's'
+        out += _LEN.pack(len(data))
+        out += data
+    elif value is None:
+        out += b'N'
+    elif t in _RECORDS:
+        (tag, fields) = _RECORDS[t]
+        out += tag
+        for v in fields(value):
+            _encode(v, out)
+    elif t is int:
+        if -2 ** 63 <= value < 2 ** 63:
+            out += b'i'
+            out += _INT.pack(value)
+        else:
+            data = value.to_bytes((value.bit_length() + 8) // 8, 'big', signed=True)
+            out += b'I'
+            out += _LEN.pack(len(data))
+            out += data
+    elif t is float:
+        out += b'f'
+        out += _FLOAT.pack(value)
+    elif t is bool:
+        out += b'T' if value else b'F'
+    elif t is list or t is tuple:
+        out += b'l' if t is list else b't'
+        out += _LEN.pack(len(value))
+        for v in value:
+            _encode(v, out)
+    elif t is dict:
+        out += b'd'
+        out += _LEN.pack(len(value))
+        for (k, v) in value.items():
+            _encode(k, out)
+            _encode(v, out)
+    elif t is bytes:
+        out += b'b'
+        out += _LEN.pack(len(value))
+        out += value
+    elif t is UUID:
+        out += b'u'
+        out += value.bytes
+    elif t is datetime:
+        if value.tzinfo is not None:
+            raise CodecError('cannot encode timezone-aware datetime')
+        out += b'D'
+        out += _DATETIME.pack(value.year, value.month, value.day, value.hour,
+                              value.minute, value.second, value.microsecond)
+    else:
+        raise CodecError('cannot encode value of type %s' % t.__name__)
+
+
+def _decode(buf, pos, _unpack_len=_LEN.unpack_from, _unpack_int=_INT.unpack_from):
+    """ @returns (value, position after value) """
+    tag = buf[pos]
+    pos += 1
+
+    # common cases first
+    if tag == 0x73:  # 's'
+        end = pos + 4 + _unpack_len(buf, pos)[0]
+        if end > len(buf):
+            raise CodecError('truncated value')
+        return buf[pos + 4:end].decode(), end
+    if tag == 0x4e:  # 'N'
+        return None, pos
+
+    record = _FACTORIES.get(tag)
+    if record is not None:
+        (cls, count, factory) = record
+        values = []
+        for _ in range(count):
+            # record fields are mostly strings, integers, or None; decode those inline
+            tag = buf[pos]
+            if tag == 0x73:  # 's'
+                end = pos + 5 + _unpack_len(buf, pos + 1)[0]
+                if end > len(buf):
+                    raise CodecError('truncated value')
+                values.append(buf[pos + 5:end].decode())
+                pos = end
+            elif tag == 0x69:  # 'i'
+                values.append(_unpack_int(buf, pos + 1)[0])
+                pos += 9
+            elif tag == 0x4e:  # 'N'
+                values.append(None)
+                pos += 1
+            else:
+                (v, pos) = _decode(buf, pos)
+                values.append(v)
+        try:
+            return factory(values), pos
+        except (TypeError, AssertionError) as e:
+            raise CodecError('invalid %s: %s' % (cls.__name__, e))
+
+    reader = _TAGS.get(tag)
+    if reader is None:
+        raise CodecError('unknown tag %r at %d' % (chr(tag), pos - 1))
+    return reader(buf, pos)
+
+
+def _decode_sized(buf, pos):
+    (size,) = _LEN.unpack_from(buf, pos)
+    pos += _LEN.size
+    if pos + size > len(buf):
+        raise CodecError('truncated value')
+    return buf[pos:pos + size], pos + size
+
+
+def _decode_bigint(buf, pos):
+    (data, pos) = _decode_sized(buf, pos)
+    return int.from_bytes(data, 'big', signed=True), pos
+
+
+def _decode_items(buf, pos):
+    (count,) = _LEN.unpack_from(buf, pos)
+    pos += _LEN.size
+    if count > len(buf) - pos:  # every value takes at least one byte
+        raise CodecError('truncated value')
+    items = []
+    for _ in range(count):
+        (v, pos) = _decode(buf, pos)
+        items.append(v)
+    return items, pos
+
+
+def _decode_tuple(buf, pos):
+    (items, pos) = _decode_items(buf, pos)
+    return tuple(items), pos
+
+
+def _decode_dict(buf, pos):
+    (count,) = _LEN.unpack_from(buf, pos)
+    pos += _LEN.size
+    if 2 * count > len(buf) - pos:
+        raise CodecError('truncated value')
+    result = {}
+    for _ in range(count):
+        (k, pos) = _decode(buf, pos)
+        (v, pos) = _decode(buf, pos)
+        try:
+            result[k] = v
+        except TypeError:
+            raise CodecError('unhashable dict key')
+    return result, pos
+
+
+def _decode_uuid(buf, pos):
+    if pos + 16 > len(buf):
+        raise CodecError('truncated value')
+    return UUID(bytes=buf[pos:pos + 16]), pos + 16
+
+
+def _decode_datetime(buf, pos):
+    try:
+        value = datetime(*_DATETIME.unpack_from(buf, pos))
+    except (ValueError, OverflowError) as e:
+        raise CodecError('invalid datetime: %s' % e)
+    return value, pos + _DATETIME.size
+
+
+def _fixed(struct):
+    def reader(buf, pos):
+        return struct.unpack_from(buf, pos)[0], pos + struct.size
+    return reader
+
+
+# { tag : reader }; reader returns (value, position after value); see _decode()
+_TAGS = {
+    ord('T'): lambda buf, pos: (True, pos),
+    ord('F'): lambda buf, pos: (False, pos),
+    ord('i'): _fixed(_INT),
+    ord('I'): _decode_bigint,
+    ord('f'): _fixed(_FLOAT),
+    ord('b'): _decode_sized,
+    ord('l'): _decode_items,
+    ord('t'): _decode_tuple,
+    ord('d'): _decode_dict,
+    ord('u'): _decode_uuid,
+    ord('D'): _decode_datetime,
+}
+
+# specification types are records of their (namedtuple) fields
+for (_cls, _tag) in ((EndpntSpec, 'e'), (FilterSpec, 'r'), (MetricSpec, 'm'),
+                     (ThreshSpec, 'h'), (ReduceSpec, 'x')):
+    register(_cls, _tag, tuple, partial(tuple.__new__, _cls), len(_cls._fields))
@@ -1,7 +1,9 @@
 import logging
 from configparser import ConfigParser, Error as ConfigParserError
 
-from dcamp.types.specs import EndpntSpec, FilterSpec, GroupSpec, MetricSpec, ThreshSpec
+from dcamp.types.admission import parse_filter
+from dcamp.types.specs import (EndpntSpec, FilterSpec, GroupSpec, MetricSpec, ReduceSpec,
+                               ThreshSpec)
 from dcamp.util.decorators import prefixable
 import dcamp.util.functions as util
 
@@ -14,7 +16,9 @@ class ParsingError(ConfigParserError):
 class ConfigFileMixin(ConfigParser):
     def __init__(self):
         self.logger = logging.getLogger('dcamp.types.config')
-        ConfigParser.__init__(self, allow_no_value=True, delimiters='=')
+        # no interpolation; '%' is literal (e.g. relative reduce deadbands)
+        ConfigParser.__init__(self, allow_no_value=True, delimiters='=',
+                              interpolation=None)
 
         self.isvalid = False
         self.__num_errors = 0
@@ -81,6 +85,20 @@ class ConfigFileMixin(ConfigParser):
         result = {
             'heartbeat': util.str_to_seconds(self['global']['heartbeat'])
         }
+
+        # optional forwarding mode; see Filter
+        if 'forward' in self['global']:
+            result['forward'] = self['global']['forward']
+
+        # optional data log settings; defaults are left to the data sink
+        if 'datalog' in self['global']:
+            result['datalog'] = self['global']['datalog']
+        for key in ('datalog-flush', 'datalog-rotate'):
+            if key in self['global']:
+                result[key] = util.str_to_seconds(self['global'][key])
+        if 'datalog-size' in self['global']:
+            result['datalog-size'] = util.str_to_bytes(self['global']['datalog-size'])
+
         self.global_cfg = result
 
     def __create_metrics(self):
@@ -113,7 +131,8 @@ class ConfigFileMixin(ConfigParser):
             if 'aggregate' in self[name]:
                 aggr = self[name]['aggregate']
 
-            valid_aggr = (None, 'max', 'min', 'avg', 'sum')
+            valid_aggr = (None, 'max', 'min', 'avg', 'sum', 'p50', 'p95', 'p99',
+                          'histogram')
             if aggr not in valid_aggr:
                 self.__eprint('aggregation value "%s" not valid for "%s" metric; choose: %s' %
                               (aggr, name, valid_aggr))
@@ -121,7 +140,38 @@ class ConfigFileMixin(ConfigParser):
             if aggr is not None and threshold is not None:
                 self.__eprint('aggregation cannot be configured along with threshold: %s' % name)
 
-            result[name] = MetricSpec(name, rate, threshold, detail, param, aggr)
+            reduce = None
+            if 'reduce' in self[name]:
+                try:
+                    reduce = ReduceSpec.from_str(self[name]['reduce'])
+                except ValueError as e:
+                    self.__eprint('%s: %s' % (e, name))
+
+            if reduce is not None:
+                if aggr is not None:
+                    self.__eprint('reduction cannot be configured along with '
+                                  'aggregation: %s' % name)
+                if reduce.is_summary:
+                    if threshold is None or '*' != threshold.op:
+                        self.__eprint('summary reduction requires a hold ("*") '
+                                      'threshold: %s' % name)
+                elif threshold is not None:
+                    self.__eprint('%s reduction cannot be configured along with '
+                                  'threshold: %s' % (reduce.mode, name))
+
+            # optional adaptive sampling; either bound defaults to the rate
+            (rate_min, rate_max) = (None, None)
+            if 'rate-min' in self[name] or 'rate-max' in self[name]:
+                default = self[name]['rate']
+                rate_min = util.str_to_seconds(self[name].get('rate-min', default))
+                rate_max = util.str_to_seconds(self[name].get('rate-max', default))
+                if not rate_min <= rate <= rate_max:
+                    self.__eprint('rate must be within rate-min and rate-max: %s' % name)
+                if rate_min < 1:
+                    self.__eprint('rate-min must be at least one second: %s' % name)
+
+            result[name] = MetricSpec(name, rate, threshold, detail, param, aggr, reduce,
+                                      rate_min, rate_max)
 
         self.metrics = result
 
@@ -163,7 +213,8 @@ class ConfigFileMixin(ConfigParser):
 
         # add global_cfg specs
         prefix = self._push_prefix('global')
-        result[prefix + 'heartbeat'] = self.global_cfg['heartbeat']
+        for (key, value) in self.global_cfg.items():
+            result[prefix + key] = value
         self._pop_prefix()
 
         for (group, spec) in self.groups.items():
@@ -214,8 +265,21 @@ class ConfigFileMixin(ConfigParser):
             if 'heartbeat' not in self['global']:
                 self.__eprint("missing 'heartbeat' option in [global] section")
 
-            if len(self['global']) > 1:
-                self.__eprint("extraneous values in [global] section")
+            valid_global = ('heartbeat', 'forward',
+                            'datalog', 'datalog-flush', 'datalog-rotate', 'datalog-size')
+            for key in self['global']:
+                if key not in valid_global:
+                    self.__eprint("extraneous value in [global] section: %s" % key)
+
+            valid_forward = ('raw', 'partial')
+            if self['global'].get('forward', 'raw') not in valid_forward:
+                self.__eprint('forward value "%s" not valid; choose: %s' %
+                              (self['global']['forward'], valid_forward))
+
+            valid_datalog = ('binary', 'text')
+            if self['global'].get('datalog', 'binary') not in valid_datalog:
+                self.__eprint('datalog value "%s" not valid; choose: %s' %
+                              (self['global']['datalog'], valid_datalog))
 
         # check for at least one group and one metric
         if len(self.metric_sections) < 1:
@@ -233,7 +297,11 @@ class ConfigFileMixin(ConfigParser):
                     used_metrics.add(key)
                     continue
                 elif key.startswith(('+', '-')):
-                    # skip filter specs
+                    # validate filter spec
+                    try:
+                        parse_filter(key[1:])
+                    except ValueError as e:
+                        self.__eprint('%s in %s' % (e, group))
                     continue
                 try:
                     nodecnt += 1
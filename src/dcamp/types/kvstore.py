@@ -0,0 +1,171 @@
+from bisect import bisect_left, insort
+
+__all__ = [
+    'KVSnapshot',
+    'KVStore',
+]
+
+
+class KVSnapshot(object):
+    """
+    Immutable version of a KVStore, as returned by KVStore.freeze().
+
+    Snapshots are never modified, so any number of threads may read them (including
+    reading multiple keys, or iterating) without locking. Views (see KVStore.add_view())
+    are computed on first access and cached per snapshot.
+    """
+
+    def __init__(self, shards, keys, size, views, cache, version):
+        # [ { key : (value, seq-num) } ]; each key is in shards[hash(key) % len(shards)]
+        self._shards = shards
+        self._keys = keys  # sorted
+        self._size = size
+        # { name : (prefix, function) }; function is called with the store (or snapshot)
+        self._views = views
+        # { name : result }
+        self._cache = cache
+
+        self.version = version
+
+    def _shard(self, k):
+        return self._shards[hash(k) % len(self._shards)]
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, k):
+        return k in self._shard(k)
+
+    def __iter__(self):
+        """ iterates keys in sorted order """
+        return iter(self._keys)
+
+    def __getitem__(self, k):
+        """ returns (value, seq-num) """
+        return self._shard(k)[k]
+
+    def get(self, k, default=None):
+        return self._shard(k).get(k, default)
+
+    def copy(self):
+        """ returns shallow copy as dict """
+        result = {}
+        for shard in self._shards:
+            result.update(shard)
+        return result
+
+    def __range(self, prefix):
+        """ returns (start, stop) indexes of keys starting with given prefix """
+        start = bisect_left(self._keys, prefix)
+        # all keys starting with prefix sort before prefix + highest code point
+        stop = bisect_left(self._keys, prefix + '\U0010ffff', start)
+        return start, stop
+
+    def keys(self, prefix=''):
+        """ returns list of keys starting with given prefix, in sorted order """
+        (start, stop) = self.__range(prefix)
+        return self._keys[start:stop]
+
+    def items(self, prefix=''):
+        """ returns list of (key, (value, seq-num)) of keys starting with given prefix """
+        return [(k, self._shard(k)[k]) for k in self.keys(prefix)]
+
+    def view(self, name):
+        """ returns (cached) result of given view; results must not be modified """
+        try:
+            return self._cache[name]
+        except KeyError:
+            (_, function) = self._views[name]
+            result = self._cache[name] = function(self)
+            return result
+
+
+class KVStore(KVSnapshot):
+    """
+    Key-value store of (value, seq-num) pairs, with keys kept in sorted order.
+
+    Keys under a prefix are found by bisecting the sorted keys instead of scanning them
+    all. Views are values derived from all keys under a prefix (e.g. the configured group
+    names), computed on first access and cached until a key under the prefix is written.
+
+    freeze() returns the current contents as a KVSnapshot without copying them; the store
+    copies what it writes to afterwards instead (copy-on-write). The contents are split
+    into SHARDS dicts, and only the shards written to are copied, so a small batch of
+    writes between two freeze() calls (e.g. a TOUCH) copies a small part of the contents.
+    The sorted keys are only copied when keys are added or removed.
+
+    N.B.: the store is not thread-safe; see Configuration for its locking.
+    """
+
+    SHARDS = 256
+
+    def __init__(self):
+        KVSnapshot.__init__(self, [{} for _ in range(KVStore.SHARDS)], [], 0, {}, {}, 0)
+
+        # contents are referenced by a snapshot; copy before writing
+        self.__shared = False
+        # indexes of shards copied since the last freeze(); None if all are
+        self.__owned = None
+        # sorted keys copied since the last freeze()
+        self.__owned_keys = True
+
+    def __setitem__(self, k, value_seq):
+        assert isinstance(value_seq, tuple) and 2 == len(value_seq)
+        self.__unshare()
+        shard = self.__own_shard(k)
+        if k not in shard:
+            self.__own_keys()
+            insort(self._keys, k)
+            self._size += 1
+        shard[k] = value_seq
+        self.__invalidate(k)
+
+    def __delitem__(self, k):
+        self.__unshare()
+        shard = self.__own_shard(k)
+        del shard[k]
+        self.__own_keys()
+        del self._keys[bisect_left(self._keys, k)]
+        self._size -= 1
+        self.__invalidate(k)
+
+    def add_view(self, name, prefix, function):
+        """ adds view of keys under given prefix; function(store) computes the view """
+        self.__unshare()
+        self._views[name] = (prefix, function)
+        self._cache.pop(name, None)
+
+    def freeze(self):
+        """ returns KVSnapshot of the current contents """
+        self.__shared = True
+        return KVSnapshot(self._shards, self._keys, self._size, self._views, self._cache,
+                          self.version)
+
+    def __unshare(self):
+        self.version += 1
+        if self.__shared:
+            # copy the list of shards, not the shards themselves (see __own_shard())
+            self._shards = self._shards[:]
+            self._views = self._views.copy()
+            self._cache = self._cache.copy()
+            self.__owned = set()
+            self.__owned_keys = False
+            self.__shared = False
+
+    def __own_shard(self, k):
+        """ returns shard of given key, copied first if shared with a snapshot """
+        i = hash(k) % len(self._shards)
+        if self.__owned is not None and i not in self.__owned:
+            self._shards[i] = self._shards[i].copy()
+            self.__owned.add(i)
+        return self._shards[i]
+
+    def __own_keys(self):
+        if not self.__owned_keys:
+            self._keys = self._keys[:]
+            self.__owned_keys = True
+
+    def __invalidate(self, k):
+        for (name, (prefix, _)) in self._views.items():
+            if k.startswith(prefix):
+                self._cache.pop(name, None)
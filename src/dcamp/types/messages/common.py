@@ -2,7 +2,7 @@ import logging
 from struct import pack, unpack, error as struct_error
 from uuid import UUID
 
-# imports for pickling
+# imports for pickling (legacy config values and values the codec does not support)
 import importlib
 import io
 import pickle
@@ -11,12 +11,9 @@ import pickle
 import zmq.utils.jsonapi as jsonapi
 from zmq import DEALER, ROUTER, NOBLOCK  # pylint: disable-msg=E0611
 
+from dcamp.types import codec
 from dcamp.types.specs import SerializableSpecTypes
-import dcamp.util.functions as funcs
-
-# TODO: use a new log level instead
-verbose_debug = False
-dev_mode = False
+from dcamp.util.trace import MsgTracer
 
 
 class DCMsg(object):
@@ -26,6 +23,12 @@ class DCMsg(object):
 
     logger = logging.getLogger("dcamp.dcmsg")
 
+    # used for sockets without their own tracer (see TracedSocket)
+    tracer = MsgTracer(logger)
+
+    # trace one of every N messages of this type; see MsgTracer
+    trace_every = 1
+
     def __init__(self, peer_id=None):
         self._peer_id = peer_id
 
@@ -62,6 +65,15 @@ class DCMsg(object):
     def from_msg(cls, msg, peer_id):
         raise NotImplementedError('subclass must implement method')
 
+    def _frames_for(self, socket):
+        """ frames to send on the given socket; sub-class may encode per socket """
+        return self.frames
+
+    @classmethod
+    def _from_frames(cls, frames, peer_id, socket):
+        """ decode frames received on given socket; sub-class may decode per socket """
+        return cls.from_msg(frames, peer_id)
+
     @staticmethod
     def _encode_float(val):
         if val is None:
@@ -92,11 +104,16 @@ class DCMsg(object):
 
     @staticmethod
     def _encode_blob(val):
-        return pickle.dumps(val)
+        try:
+            return codec.encode(val)
+        except codec.CodecError:
+            return pickle.dumps(val)
 
     @staticmethod
     def _decode_blob(buffer):
-        return RestrictedUnpickler.restricted_loads(buffer)
+        if codec.is_pickle(buffer):
+            return RestrictedUnpickler.restricted_loads(buffer)
+        return codec.decode(buffer)
 
     @staticmethod
     def _encode_uuid(val):
@@ -111,17 +128,13 @@ class DCMsg(object):
             return None
         return UUID(bytes=buffer)
 
-    def send(self, socket):
-        logger = self.logger
-        if dev_mode:
-            logger = funcs.get_logger_from_caller(self.logger)
+    def _trace(self, direction, socket):
+        (getattr(socket, 'tracer', None) or DCMsg.tracer).trace(direction, self)
 
-        logger.debug('S:{}'.format(self.name))
-        if verbose_debug:
-            for part in str(self).split('\n'):
-                logger.debug('  ' + part)
+    def send(self, socket):
+        self._trace('S', socket)
 
-        parts = self.frames
+        parts = self._frames_for(socket)
         if DEALER == socket.socket_type:
             parts.insert(0, b'')  # DEALER needs empty first frame (i.e. delimiter)
         elif ROUTER == socket.socket_type:
@@ -144,7 +157,7 @@ class DCMsg(object):
 
         try:
             # try to decode message with given class
-            msg = cls.from_msg(frames, peer_id)
+            msg = cls._from_frames(frames, peer_id, socket)
         except (ValueError, struct_error) as e:
             try:
                 # otherwise, try decoding WTF message
@@ -156,15 +169,7 @@ class DCMsg(object):
         if msg.peer_id is None:  # sub-class may set peer_id
             msg._peer_id = peer_id
 
-        logger = cls.logger
-        if dev_mode:
-            logger = funcs.get_logger_from_caller(cls.logger)
-
-        logger.debug('R:{}'.format(msg.name))
-        if verbose_debug:
-            for part in str(msg).split('\n'):
-                logger.debug('  ' + part)
-
+        msg._trace('R', socket)
         return msg
 
 
@@ -233,7 +238,7 @@ class _PROPS(object):
         type_name = type(value).__name__
         # special case spec types (namedtuple) to use dict as values instead of list
         if type_name in SerializableSpecTypes:
-            value = vars(value)
+            value = dict(value._asdict())
         return type_name, value
 
     @staticmethod
@@ -287,15 +292,23 @@ class RestrictedUnpickler(pickle.Unpickler):
         'uuid':     ['UUID'],
     }
 
+    # { (module, name) : class }
+    __allowed = {}
+
     def find_class(self, module, name):
+        cls = RestrictedUnpickler.__allowed.get((module, name))
+        if cls is not None:
+            return cls
+
         # Only allow safe classes from builtins.
         if ((module in RestrictedUnpickler.SAFE_IMPORTS and
                 name in RestrictedUnpickler.SAFE_IMPORTS[module])
                 or module.startswith('dcamp.types')):
 
-            # TODO: is it inneficient to import the same module over and over?
             mod = importlib.import_module(module)
-            return getattr(mod, name)
+            cls = getattr(mod, name)
+            RestrictedUnpickler.__allowed[(module, name)] = cls
+            return cls
 
         # Forbid everything else.
         raise pickle.UnpicklingError("global '%s.%s' is forbidden" %
@@ -1,3 +1,4 @@
+from struct import pack, unpack_from, calcsize, error as struct_error
 from uuid import UUID
 
 from dcamp.types.messages.common import DCMsg, _PROPS
@@ -46,15 +47,24 @@ class CONFIG(DCMsg, _PROPS):
         seq = DCMsg._decode_uint(msg[1])
         uuid = DCMsg._decode_uuid(msg[2])
         props = _PROPS._decode_dict(msg[3])
-        val = DCMsg._decode_blob(msg[4])
+        batch = 'KVBATCH' == key or key.endswith('/KVPUB')
+        val = None if batch else DCMsg._decode_blob(msg[4])
 
         if key.endswith('/HUGZ'):
             # common case
             return HUGZ(key.rsplit('/', 1)[0])  # drop the last part, i.e. '/HUGZ'
+        elif key.endswith('/KVPUB'):
+            return KVPUBBATCH(props.get('subtree'), KVBATCH._decode_items(msg[4]))
+        elif '/TOUCH' == key:
+            return TOUCH(val)
+        elif 'KVBATCH' == key:
+            return KVBATCH(peer_id, props.get('subtree'), KVBATCH._decode_items(msg[4]))
         elif 'ICANHAZ' == key:
-            return ICANHAZ(val)
+            return ICANHAZ(val, props.get('credit'), props.get('since'))
+        elif 'MOAR' == key:
+            return MOAR(val, props.get('credit', 1))
         elif 'KTHXBAI' == key:
-            return KTHXBAI(seq, peer_id, val)
+            return KTHXBAI(seq, peer_id, val, props.get('delta', False))
         elif peer_id is not None:
             return KVSYNC(key, val, seq, peer_id, props)
         else:
@@ -72,21 +82,177 @@ class HUGZ(CONFIG):
 
 
 class ICANHAZ(CONFIG):
-    def __init__(self, subtree=None):
-        CONFIG.__init__(self, key='ICANHAZ', value=subtree)
+    """
+    Snapshot request for given subtree. If credit is given, the snapshot is sent as
+    KVBATCH messages, no more than credit at a time (see MOAR); otherwise, as one KVSYNC
+    per key.
+
+    If since is given, only keys changed after that seq-num are sent (deleted keys with a
+    None value), unless the parent no longer knows all those changes; see KTHXBAI.
+    """
+    def __init__(self, subtree=None, credit=None, since=None):
+        props = {}
+        if credit is not None:
+            props['credit'] = credit
+        if since is not None:
+            props['since'] = since
+        CONFIG.__init__(self, key='ICANHAZ', value=subtree, properties=props)
+
+    @property
+    def credit(self):
+        return self.get('credit')
+
+    @property
+    def since(self):
+        return self.get('since')
 
     def __str__(self):
         return '%s %s' % (self.key, self.value)
 
 
+class MOAR(CONFIG):
+    """ grants more credit (i.e. KVBATCH messages) to the given subtree's snapshot """
+    def __init__(self, subtree, credit=1):
+        CONFIG.__init__(self, key='MOAR', value=subtree, properties={'credit': credit})
+
+    @property
+    def credit(self):
+        return self['credit']
+
+    def __str__(self):
+        return '%s %s +%d' % (self.key, self.value, self.credit)
+
+
 class KTHXBAI(CONFIG):
-    def __init__(self, seq, pid, subtree=None):
-        CONFIG.__init__(self, key='KTHXBAI', value=subtree, sequence=seq, peer_id=pid)
+    """ closes snapshot session; delta is True if only changed keys were sent """
+    def __init__(self, seq, pid, subtree=None, delta=False):
+        props = {'delta': True} if delta else None
+        CONFIG.__init__(self, key='KTHXBAI', value=subtree, sequence=seq, peer_id=pid,
+                        properties=props)
+
+    @property
+    def delta(self):
+        return self.get('delta', False)
 
     def __str__(self):
         return '%s %s' % (self.key, self.value)
 
 
+class KVBATCH(CONFIG):
+    """
+    Multiple snapshot key-value pairs of one subtree, sent in place of one KVSYNC per key.
+
+    Frames are those of CONFIG; the subtree is given in the properties, and the value
+    frame contains the key-value pairs, each as:
+        key-length (2 bytes), key, seq (8 bytes), value-length (4 bytes), encoded value
+    Batches are bounded by MAX_BYTES, except that a single oversized pair is sent alone.
+    """
+
+    MAX_BYTES = 64 * 1024
+
+    __KEY = '!H'
+    __VALUE = '!QI'
+
+    def __init__(self, pid, subtree, items=None):
+        CONFIG.__init__(self, key='KVBATCH', peer_id=pid, properties={'subtree': subtree})
+        self.items = []  # [ (key, value, seq-num) ]
+        self.__encoded = []
+        self.__size = 0
+        for (k, v, seq) in items or []:
+            self.add(k, v, seq)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __str__(self):
+        return '%s %s (%d keys)' % (self.key, self.get('subtree'), len(self.items))
+
+    @property
+    def subtree(self):
+        return self.get('subtree')
+
+    def add(self, k, v, seq):
+        """ adds given key-value pair unless the batch is full; @returns True if added """
+        key = k.encode()
+        blob = DCMsg._encode_blob(v)
+        encoded = (pack(KVBATCH.__KEY, len(key)) + key +
+                   pack(KVBATCH.__VALUE, seq, len(blob)) + blob)
+
+        if len(self.items) > 0 and self.__size + len(encoded) > KVBATCH.MAX_BYTES:
+            return False
+
+        self.items.append((k, v, seq))
+        self.__encoded.append(encoded)
+        self.__size += len(encoded)
+        self.sequence = max(self.sequence, seq)
+        return True
+
+    @property
+    def frames(self):
+        frames = super().frames
+        frames[4] = b''.join(self.__encoded)
+        return frames
+
+    @staticmethod
+    def _decode_items(buffer):
+        items = []
+        offset = 0
+        try:
+            while offset < len(buffer):
+                (klen,) = unpack_from(KVBATCH.__KEY, buffer, offset)
+                offset += calcsize(KVBATCH.__KEY)
+                key = bytes(buffer[offset:offset + klen]).decode()
+                offset += klen
+
+                (seq, vlen) = unpack_from(KVBATCH.__VALUE, buffer, offset)
+                offset += calcsize(KVBATCH.__VALUE)
+                if offset + vlen > len(buffer):
+                    raise ValueError('truncated batch value')
+                items.append((key, DCMsg._decode_blob(buffer[offset:offset + vlen]), seq))
+                offset += vlen
+        except struct_error:
+            raise ValueError('truncated batch')
+        return items
+
+
+class KVPUBBATCH(KVBATCH):
+    """
+    Multiple updates of one topic (see topic()), sent in place of one KVPUB per key.
+
+    Same as KVBATCH, except that the key is the topic followed by '/KVPUB', so children
+    subscribed to the topic receive it.
+    """
+
+    def __init__(self, topic, items=None):
+        KVBATCH.__init__(self, None, topic, items)
+        self.key = '%s/KVPUB' % topic.rstrip('/')
+
+    @staticmethod
+    def topic(k):
+        """
+        @returns topic of given key, i.e. its first two levels (e.g. '/CONFIG/global/'),
+                 or the key itself if shorter (e.g. '/TOPO/root')
+        """
+        parts = k.split('/', 3)
+        if len(parts) < 4:
+            return k
+        return '/%s/%s/' % (parts[1], parts[2])
+
+
+class TOUCH(CONFIG):
+    """
+    Last-seen times of topology nodes, as { topo-key : datetime }. Touches are not
+    key-value updates (no seq-num); they are sent to the '/TOUCH' topic, which only
+    branches subscribe to.
+    """
+    def __init__(self, touched):
+        assert isinstance(touched, dict)
+        CONFIG.__init__(self, key='/TOUCH', value=touched)
+
+    def __str__(self):
+        return '%s (%d nodes)' % (self.key, len(self.value))
+
+
 class KVSYNC(CONFIG):
     def __init__(self, k, v, seq, pid, props=None):
         CONFIG.__init__(self, key=k, value=v, sequence=seq, peer_id=pid, properties=props)
@@ -1,6 +1,13 @@
-from dcamp.types.messages.common import DCMsg, _PROPS, dev_mode
+from random import getrandbits
+from struct import pack, unpack, unpack_from, calcsize
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+from dcamp.types.messages.common import DCMsg, _PROPS
 from dcamp.types.specs import EndpntSpec
-from dcamp.util.functions import isInstance_orNone, now_msecs, get_logger_from_caller
+from dcamp.util.aggregate import SampleTable
+from dcamp.util.sketch import DDSketch
+from dcamp.util.functions import isInstance_orNone, now_msecs
 
 __all__ = [
     'Data',
@@ -14,13 +21,205 @@ __all__ = [
     'DataPercent',
 
     'DataAggregate',
+    'DataSketch',
+
+    'DataBatch',
+    'batch',
+    'log_str',
+
+    'PropSchemas',
+    'reannounce',
 ]
 
 
+class PropSchemas(object):
+    """
+    Interned property schemas for data messages.
+
+    The properties which never change for a given metric spec (SCHEMA_KEYS) are interned
+    as a numeric schema id. The first time a schema is sent on a socket, and then again
+    with a doubling interval from ANNOUNCE_MIN_MS up to every ANNOUNCE_MS, the id is
+    announced along with the schema's properties; otherwise only the id is sent.
+    Receivers learn announced schemas per socket, so decoding the properties frame is a
+    dict lookup. Properties outside of the schema (e.g. "p-count" or the aggregation
+    properties) are still sent as a json document alongside the id.
+
+    Properties frame is one of:
+        '{' json-properties                             -- no schema (see Data.frames)
+        '=' nonce id schema-length schema-json [ json ] -- schema announcement
+        '@' nonce id [ json ]                           -- schema reference
+
+    The nonce is random per process so a restarted sender can never be matched to the
+    schemas announced by its previous incarnation. Data referencing a schema which was
+    never announced on the receiving socket (e.g. the announcement was lost to a PUB/SUB
+    slow joiner, hence the quick re-announcements at first) fails to decode until the next
+    announcement. There is no way to ask a PUB sender for a schema, so senders use XPUB
+    sockets instead and re-announce all schemas as soon as a subscriber (re)joins (see
+    reannounce()), rather than waiting for the announcement back-off.
+
+    Schemas are forgotten once a newer config-seqid is seen, by the sender (its ids) and
+    by the receivers (per sender, i.e. nonce); receivers also forget senders which have
+    not announced anything for FORGET_MS (e.g. the previous incarnation of a restarted
+    sender).
+    """
+
+    SCHEMA_KEYS = ('type', 'detail', 'config-name', 'config-seqid')
+    ANNOUNCE_MIN_MS = 500
+    ANNOUNCE_MS = 10 * 1000
+    FORGET_MS = 3 * ANNOUNCE_MS
+
+    __REF_HEADER = '!cII'
+    __ANNOUNCE_HEADER = '!cIII'
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__nonce = getrandbits(32)
+
+        # { schema-tuple : schema-id }, of the newest config-seqid (and older ones in use)
+        self.__ids = {}
+        self.__next_id = 0
+        self.__seqid = -1
+        # { socket : { schema-id : (next-announce-time, announce-interval) } }
+        self.__announced = WeakKeyDictionary()
+        # { socket : { nonce : { schema-id : schema-dict } } }
+        self.__known = WeakKeyDictionary()
+        # { socket : { nonce : (last-announce-time, config-seqid) } }
+        self.__heard = WeakKeyDictionary()
+        # { socket : next-forget-time }
+        self.__next_forget = WeakKeyDictionary()
+
+    def __per_socket(self, sockets, socket):
+        # sockets are only used by a single thread, but the dicts are shared by all
+        result = sockets.get(socket)
+        if result is None:
+            with self.__lock:
+                result = sockets.setdefault(socket, {})
+        return result
+
+    @staticmethod
+    def __seqid_of(schema):
+        """ @returns config-seqid of given schema (tuple or dict), or -1 if none """
+        return dict(schema).get('config-seqid', -1)
+
+    def __intern(self, schema):
+        """ @returns new id for given schema, forgetting schemas of older configs """
+        seqid = PropSchemas.__seqid_of(schema)
+        with self.__lock:
+            if seqid > self.__seqid:
+                self.__seqid = seqid
+                self.__ids = {s: i for (s, i) in self.__ids.items()
+                              if PropSchemas.__seqid_of(s) in (-1, seqid)}
+                current = set(self.__ids.values())
+                for announced in self.__announced.values():
+                    for old in [i for i in announced if i not in current]:
+                        announced.pop(old, None)
+
+            sid = self.__ids.get(schema)
+            if sid is None:
+                sid = self.__ids[schema] = self.__next_id
+                self.__next_id += 1
+            return sid
+
+    def __learn(self, socket, nonce, sid, schema):
+        """ remembers given schema announced on given socket """
+        known = self.__per_socket(self.__known, socket)
+        heard = self.__per_socket(self.__heard, socket)
+        now = now_msecs()
+
+        schemas = known.setdefault(nonce, {})
+        seqid = PropSchemas.__seqid_of(schema)
+        (_, newest) = heard.get(nonce, (now, -1))
+        if seqid > newest:
+            # sender moved on to a newer config
+            for old in [i for (i, s) in schemas.items()
+                        if PropSchemas.__seqid_of(s) not in (-1, seqid)]:
+                del schemas[old]
+            newest = seqid
+        schemas[sid] = schema
+        heard[nonce] = (now, newest)
+
+        if now >= self.__next_forget.get(socket, 0):
+            for gone in [n for (n, (t, _)) in heard.items()
+                         if t < now - PropSchemas.FORGET_MS]:
+                del heard[gone]
+                known.pop(gone, None)
+            with self.__lock:
+                self.__next_forget[socket] = now + PropSchemas.FORGET_MS
+
+    def encode(self, socket, properties):
+        """ returns properties frame to send on given socket """
+        schema = tuple((k, properties[k]) for k in PropSchemas.SCHEMA_KEYS
+                       if k in properties)
+
+        sid = self.__ids.get(schema)
+        if sid is None:
+            sid = self.__intern(schema)
+
+        extra = b''
+        if len(properties) > len(schema):
+            extra = _PROPS._encode_dict({k: v for (k, v) in properties.items()
+                                         if k not in PropSchemas.SCHEMA_KEYS})
+
+        announced = self.__per_socket(self.__announced, socket)
+        now = now_msecs()
+        (due, interval) = announced.get(sid, (now, 0))
+        if now < due:
+            return pack(PropSchemas.__REF_HEADER, b'@', self.__nonce, sid) + extra
+
+        interval = min(max(2 * interval, PropSchemas.ANNOUNCE_MIN_MS),
+                       PropSchemas.ANNOUNCE_MS)
+        announced[sid] = (now + interval, interval)
+        encoded = _PROPS._encode_dict(dict(schema))
+        return (pack(PropSchemas.__ANNOUNCE_HEADER, b'=', self.__nonce, sid,
+                     len(encoded)) + encoded + extra)
+
+    def reannounce(self, socket):
+        """ announces every schema again the next time it is sent on given socket """
+        self.__per_socket(self.__announced, socket).clear()
+
+    def decode(self, socket, buffer):
+        """ returns properties dict from given frame received on given socket """
+        tag = buffer[:1]
+        if b'{' == tag:
+            return _PROPS._decode_dict(buffer)
+
+        if socket is None:
+            raise ValueError('interned properties received without a socket')
+
+        if b'@' == tag:
+            (_, nonce, sid) = unpack_from(PropSchemas.__REF_HEADER, buffer)
+            offset = calcsize(PropSchemas.__REF_HEADER)
+            schema = self.__per_socket(self.__known, socket).get(nonce, {}).get(sid)
+            if schema is None:
+                raise ValueError('unknown property schema: %d' % sid)
+
+        elif b'=' == tag:
+            (_, nonce, sid, length) = unpack_from(PropSchemas.__ANNOUNCE_HEADER, buffer)
+            offset = calcsize(PropSchemas.__ANNOUNCE_HEADER) + length
+            schema = _PROPS._decode_dict(buffer[offset - length:offset])
+            self.__learn(socket, nonce, sid, schema)
+
+        else:
+            raise ValueError('unknown properties frame')
+
+        result = dict(schema)
+        if len(buffer) > offset:
+            result.update(_PROPS._decode_dict(buffer[offset:]))
+        return result
+
+
+_schemas = PropSchemas()
+
+
+def reannounce(socket):
+    """ announces every schema again the next time it is sent on given socket """
+    _schemas.reannounce(socket)
+
+
 class Data(DCMsg, _PROPS):
     """
     Frame 0: data source (leaf or collector node endpoint), as 0MQ string
-    Frame 1: properties, as 0MQ string
+    Frame 1: properties, as 0MQ string; interned when sent on a socket, see PropSchemas
     Frame 2: time in ms epoch utc, 8 bytes in network order
     Frame 3: value, 8 bytes in network order
     Frame 4: base value, 8 bytes in network order; only for average and percent types
@@ -32,6 +231,9 @@ class Data(DCMsg, _PROPS):
     seqid      = "config-seqid=" <integer>
     """
 
+    # samples are the bulk of all traffic; trace only a few of them
+    trace_every = 100
+
     def __init__(self, source, properties, time=None, value=None, base_value=None):
         DCMsg.__init__(self)
         _PROPS.__init__(self, properties)
@@ -96,6 +298,15 @@ class Data(DCMsg, _PROPS):
     def is_hugz(self):
         return isinstance(self, DataHugz)
 
+    @property
+    def is_batch(self):
+        return False
+
+    @property
+    def samples(self):
+        """ list of data samples carried by this message; see DataBatch """
+        return [self]
+
     def __is_compatible(self, given):
         return (self.source == given.source and
                 self.m_type == given.m_type and
@@ -132,41 +343,44 @@ class Data(DCMsg, _PROPS):
                                               self.value)
 
     def log_str(self):
-        props = {
-            'source': self.source,
-            'value': self.value,
-            'base': self.base_value,
-        }
-        props.update(self.properties)
-        logstr = '{}'.format(self.time)
-        for p in props.keys():
-            v = props[p]
-            if p in ('value', 'base') and v is not None:
-                logstr += ' {}={:.2f}'.format(p, v)
-            else:
-                logstr += ' {}={}'.format(p, v)
-        return logstr
+        return log_str(self.time, self.source, self.properties, self.value,
+                       self.base_value)
 
     @property
     def frames(self):
+        return self.__frames(self._encode_dict(self.properties))
+
+    def _frames_for(self, socket):
+        return self.__frames(_schemas.encode(socket, self.properties))
+
+    def __frames(self, props):
         return [
             self.source.encode(),
-            self._encode_dict(self.properties),
+            props,
             self._encode_uint(self.time),
             self._encode_float(self.value),
             self._encode_float(self.base_value),
         ]
 
     @classmethod
-    def from_msg(cls, msg, peer_id):
+    def _from_frames(cls, frames, peer_id, socket):
+        return cls.from_msg(frames, peer_id, socket)
+
+    @classmethod
+    def from_msg(cls, msg, peer_id, socket=None):
+        """ socket is required to decode interned properties; see PropSchemas """
         assert isinstance(msg, list)
 
-        # make sure we have six frames
+        # batched samples share the data socket with single samples
+        if DataBatch.NUM_FRAMES == len(msg):
+            return DataBatch.from_msg(msg, peer_id, socket)
+
+        # make sure we have five frames
         if 5 != len(msg):
             raise ValueError('wrong number of frames')
 
         source = EndpntSpec.decode(msg[0])
-        props = _PROPS._decode_dict(msg[1])
+        props = _schemas.decode(socket, msg[1])
 
         # validate given type
         assert 'type' in props, 'missing metric "type" key'
@@ -187,6 +401,8 @@ class Data(DCMsg, _PROPS):
 
 
 class DataHugz(Data):
+    trace_every = 1
+
     def __init__(self, the_source, the_time=None):
         super().__init__(
             source=the_source,
@@ -284,16 +500,35 @@ class DataAggregate(DataBasic):
         aggr-source  : EndpntSpec, aggregation source (Metric for max/min, Collector for sum/avg
         node-cnt     : int, number of nodes included in aggregation
         samples-type : str, type of metric being aggregated
-
+        p-sum        : float, sum of all nodes' values  \
+        p-min        : float, min of all nodes' values   > partial aggregate
+        p-max        : float, max of all nodes' values  /
+
+    The partial aggregate (along with node-cnt) makes aggregates mergeable: when the
+    samples given to add_sample() are themselves (final) aggregates, the latest one from
+    each child is merged (e.g. the avg is the sum of sums over the sum of node counts)
+    instead of aggregating the children's values. A child's partial is kept for one more
+    period after it was aggregated, so a partial arriving just after the aggregation (i.e.
+    jitter) does not leave the next one without the child; once it was not replaced for a
+    whole period, the child is left out.
     """
+
+    # properties set by aggregate() and cleared by reset()
+    FINAL_PROPS = ('node-cnt', 'aggr-source', 'p-sum', 'p-min', 'p-max')
+
     def __init__(self, source, properties, time=None, value=None, base_value=None):
         DataBasic.__init__(self, source, properties, time, value, base_value)
         assert self.m_type.startswith('aggregate')
         assert 'aggr-group' in properties
         assert base_value is None
 
-        # { EndpntSpec : [ Data, ... ] }
-        self._samples_cache = {}
+        # first and last sample per node
+        self._samples = SampleTable()
+
+        # { EndpntSpec : Data }, latest partial aggregate per child
+        self._partials = {}
+        # children whose partial was not replaced since the last reset()
+        self._stale = set()
 
         if 'is-final' in properties:
             assert self['is-final']
@@ -317,33 +552,31 @@ class DataAggregate(DataBasic):
         else:
             assert msg.m_type == self['samples-type']
 
-        if msg.source not in self._samples_cache:
-            # add empty list to dict
-            self._samples_cache[msg.source] = []
-
-        # cache at most two samples, keeping the first and last
-        cache = self._samples_cache[msg.source]
-        if len(cache) < 2:
-            cache.append(msg)
+        if self._is_partial(msg):
+            latest = self._partials.get(msg.source)
+            if latest is None or msg.time > latest.time:
+                self._partials[msg.source] = msg
+                self._stale.discard(msg.source)
         else:
-            assert msg.time > cache[1].time
-            cache[1] = msg
-            assert cache[1].time > cache[0].time
+            self._samples.add(msg)
+
+    def _is_partial(self, msg):
+        return 'p-sum' in msg.properties
 
     def reset(self):
         # clear properties state
-        for p in ('node-cnt', 'aggr-source'):
+        for p in self.FINAL_PROPS:
             try:
                 del(self[p])
             except KeyError:
                 continue
         self['is-final'] = False
 
-        # clear samples (only keep last sample)
-        for (node, cache) in self._samples_cache.items():
-            if len(cache) == 2:
-                cache.pop(0)
-            assert len(cache) == 1
+        # clear samples (only keep last sample); keep partials for one more period
+        self._samples.reset()
+        for source in self._stale:
+            del self._partials[source]
+        self._stale = set(self._partials)
 
         # clear time, value, base_value
         self.value = None
@@ -355,51 +588,12 @@ class DataAggregate(DataBasic):
         if self['is-final']:
             return self.value
 
-        source = None
-        value = None
-
-        op = self.m_type[len('aggregate-'):]
-
-        node_cnt = 0
-        # find largest sample (doing calculation)
-        for (node, cache) in self._samples_cache.items():
-            if len(cache) < 2:
-                continue
-            node_cnt += 1
-            calc = cache[0].calculate(cache[1])
-
-            if op in ('sum', 'avg'):
-                if value is None:
-                    value = 0
-
-                value += calc
-                source = self.source
-
-            else:
-                if value is None:
-                    value = calc
-                    source = node
-                elif op == 'min':
-                    if calc < value:
-                        value = calc
-                        source = node
-                elif op == 'max':
-                    if calc > value:
-                        value = calc
-                        source = node
-                else:
-                    raise NotImplementedError('unknown aggregation type: {}'.format(op))
+        (value, node_cnt, source) = self._reduce()
 
         if node_cnt < 1:
-            logger = self.logger
-            if dev_mode:
-                logger = get_logger_from_caller(self.logger)
-            logger.error('{}: not enough samples to aggregate'.format(self['aggr-group']))
+            # not enough samples to aggregate; left to the caller to report
             return None
 
-        if op == 'avg':
-            value /= node_cnt
-
         self.time = time
         self.value = value
         self['node-cnt'] = node_cnt
@@ -408,6 +602,276 @@ class DataAggregate(DataBasic):
         self['is-final'] = True
         return self.value
 
+    def _reduce(self):
+        """ @returns (value, node-cnt, aggr-source) for the cached samples or partials """
+        op = self.m_type[len('aggregate-'):]
+        if op not in ('sum', 'avg', 'min', 'max'):
+            raise NotImplementedError('unknown aggregation type: {}'.format(op))
+
+        if len(self._partials) > 0:
+            # merge children's partial aggregates
+            parts = list(self._partials.values())
+            cnt = sum(p['node-cnt'] for p in parts)
+            total = sum(p['p-sum'] for p in parts)
+            lo = min(parts, key=lambda p: p['p-min'])
+            hi = max(parts, key=lambda p: p['p-max'])
+            (lo, lo_node, hi, hi_node) = (lo['p-min'], lo['aggr-source'],
+                                          hi['p-max'], hi['aggr-source'])
+        else:
+            # calculate and summarize all nodes' samples at once
+            summary = self._samples.summary(self['samples-type'])
+            (cnt, total, lo, lo_node, hi, hi_node) = summary
+
+        if cnt < 1:
+            return None, 0, None
+
+        self['p-sum'] = total
+        self['p-min'] = lo
+        self['p-max'] = hi
+
+        return {
+            'sum': (total, cnt, self.source),
+            'avg': (total / cnt, cnt, self.source),
+            'min': (lo, cnt, lo_node),
+            'max': (hi, cnt, hi_node),
+        }[op]
+
+
+class DataSketch(DataAggregate):
+    """
+    quantile (and histogram) aggregated metrics; see DataAggregate for other properties
+
+    FINALLY SET (is-final==true)
+    --------------
+        sketch       : str, encoded DDSketch of all aggregated values
+
+    The value is the quantile given by the type (the median for histograms). Collectors
+    sketch the calculated values of their nodes' samples; higher levels merge the latest
+    sketch from each child instead, so the raw samples never leave the collectors.
+    """
+
+    QUANTILES = {
+        'aggregate-p50': 0.50,
+        'aggregate-p95': 0.95,
+        'aggregate-p99': 0.99,
+        'aggregate-histogram': 0.50,
+    }
+
+    FINAL_PROPS = ('node-cnt', 'aggr-source', 'sketch')
+
+    def __init__(self, source, properties, time=None, value=None, base_value=None):
+        DataAggregate.__init__(self, source, properties, time, value, base_value)
+        assert self.m_type in DataSketch.QUANTILES
+        if self['is-final']:
+            assert 'sketch' in properties
+
+    @property
+    def sketch(self):
+        """ returns the decoded sketch (only once final) """
+        return DDSketch.decode(self['sketch'])
+
+    def _is_partial(self, msg):
+        return 'sketch' in msg.properties
+
+    def _reduce(self):
+        sketch = DDSketch()
+        if len(self._partials) > 0:
+            # merge children's sketches
+            node_cnt = 0
+            for p in self._partials.values():
+                sketch.merge(p.sketch)
+                node_cnt += p['node-cnt']
+        else:
+            (values, _) = self._samples.values(self['samples-type'])
+            sketch.add_all(values)
+            node_cnt = len(values)
+
+        if node_cnt < 1:
+            return None, 0, None
+
+        self['sketch'] = sketch.encode()
+        return sketch.quantile(DataSketch.QUANTILES[self.m_type]), node_cnt, self.source
+
+
+class DataBatch(DCMsg, _PROPS):
+    """
+    Multiple samples from one source with identical properties, stored as columns.
+
+    Frame 0: data source (leaf or collector node endpoint), as 0MQ string
+    Frame 1: properties shared by all samples, as 0MQ string; see Data
+    Frame 2: number of samples (N), 8 bytes in network order
+    Frame 3: times in ms epoch utc, N x 8 bytes in network order
+    Frame 4: values, N x 8 bytes in network order; NaN for no value
+    Frame 5: base values, N x 8 bytes in network order; NaN for no value
+    """
+
+    NUM_FRAMES = 6
+    trace_every = 100
+
+    def __init__(self, source, properties, times, values, base_values):
+        DCMsg.__init__(self)
+        _PROPS.__init__(self, properties)
+
+        assert isinstance(source, EndpntSpec)
+        self.source = source
+
+        assert 'type' in properties, 'missing metric "type" key'
+        assert self.m_type in _MTYPES.keys(), 'given metric "type" not valid'
+        assert self.m_type != 'HUGZ', 'HUGZ cannot be batched'
+
+        assert len(times) == len(values) == len(base_values)
+        self.times = times
+        self.values = values
+        self.base_values = base_values
+
+    def __len__(self):
+        return len(self.times)
+
+    def __eq__(self, other):
+        if not isinstance(other, DataBatch):
+            return False
+        this = (self.source, self.properties, self.times, self.values, self.base_values)
+        that = (other.source, other.properties, other.times, other.values,
+                other.base_values)
+        return this == that
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return '%s -- %s [%d] x %d' % (self.source, self.detail, self.config_seqid,
+                                       len(self))
+
+    @property
+    def m_type(self):
+        return self['type']
+
+    @property
+    def detail(self):
+        return self.get('detail', None)
+
+    @property
+    def config_name(self):
+        return self.get('config-name', None)
+
+    @property
+    def config_seqid(self):
+        return self.get('config-seqid', None)
+
+    @property
+    def is_hugz(self):
+        return False
+
+    @property
+    def is_batch(self):
+        return True
+
+    @property
+    def samples(self):
+        """ list of Data messages, one per sample in this batch """
+        real_class = _MTYPES[self.m_type]
+        return [real_class(self.source, dict(self.properties), t, v, b)
+                for (t, v, b) in zip(self.times, self.values, self.base_values)]
+
+    @classmethod
+    def from_samples(cls, samples):
+        """ creates batch from given Data messages, all of same source and properties """
+        first = samples[0]
+        for s in samples[1:]:
+            assert s.source == first.source and s.properties == first.properties
+
+        return cls(first.source, dict(first.properties),
+                   [s.time for s in samples],
+                   [s.value for s in samples],
+                   [s.base_value for s in samples])
+
+    @staticmethod
+    def _encode_floats(vals):
+        # NaN marks "no value"; sample values are never NaN
+        return pack('!%dd' % len(vals), *[float('nan') if v is None else v for v in vals])
+
+    @staticmethod
+    def _decode_floats(buffer, count):
+        return [None if v != v else v for v in unpack('!%dd' % count, buffer)]
+
+    @property
+    def frames(self):
+        return self.__frames(self._encode_dict(self.properties))
+
+    def _frames_for(self, socket):
+        return self.__frames(_schemas.encode(socket, self.properties))
+
+    def __frames(self, props):
+        return [
+            self.source.encode(),
+            props,
+            self._encode_uint(len(self)),
+            pack('!%dQ' % len(self), *self.times),
+            self._encode_floats(self.values),
+            self._encode_floats(self.base_values),
+        ]
+
+    @classmethod
+    def _from_frames(cls, frames, peer_id, socket):
+        return cls.from_msg(frames, peer_id, socket)
+
+    @classmethod
+    def from_msg(cls, msg, peer_id, socket=None):
+        """ socket is required to decode interned properties; see PropSchemas """
+        assert isinstance(msg, list)
+
+        if cls.NUM_FRAMES != len(msg):
+            raise ValueError('wrong number of frames')
+
+        source = EndpntSpec.decode(msg[0])
+        props = _schemas.decode(socket, msg[1])
+        count = DCMsg._decode_uint(msg[2])
+
+        times = list(unpack('!%dQ' % count, msg[3]))
+        values = cls._decode_floats(msg[4], count)
+        base_values = cls._decode_floats(msg[5], count)
+
+        return cls(source, props, times, values, base_values)
+
+
+def batch(samples):
+    """
+    Groups given Data messages into as few messages as possible, preserving sample order
+    within each group. Samples sharing a source and properties are combined into a single
+    DataBatch; lone samples are returned as-is.
+    """
+    # { (source, properties) : [ Data, ... ] }
+    groups = {}
+    for s in samples:
+        key = (s.source, tuple(sorted(s.properties.items())))
+        groups.setdefault(key, []).append(s)
+
+    result = []
+    for group in groups.values():
+        if len(group) == 1:
+            result.append(group[0])
+        else:
+            result.append(DataBatch.from_samples(group))
+    return result
+
+
+def log_str(time, source, properties, value, base_value):
+    """ returns the data log text line for the given sample fields; see Data.log_str() """
+    props = {
+        'source': source,
+        'value': value,
+        'base': base_value,
+    }
+    props.update(properties)
+    logstr = '{}'.format(time)
+    for p in props.keys():
+        v = props[p]
+        if p in ('value', 'base') and v is not None:
+            logstr += ' {}={:.2f}'.format(p, v)
+        else:
+            logstr += ' {}={}'.format(p, v)
+    return logstr
+
 
 _MTYPES = {
     'HUGZ': DataHugz,
@@ -422,4 +886,9 @@ _MTYPES = {
     'aggregate-max': DataAggregate,
     'aggregate-min': DataAggregate,
     'aggregate-avg': DataAggregate,
+
+    'aggregate-p50': DataSketch,
+    'aggregate-p95': DataSketch,
+    'aggregate-p99': DataSketch,
+    'aggregate-histogram': DataSketch,
 }
@@ -1,12 +1,14 @@
 from collections import namedtuple
 
 from dcamp.util.functions import seconds_to_str, now_msecs, str_to_seconds
+from dcamp.util.threshold import compile_expr
 
 __all__ = [
     'EndpntSpec',
     'FilterSpec',
     'GroupSpec',
     'MetricSpec',
+    'ReduceSpec',
     'SerializableSpecTypes',
     'ThreshSpec',
     'MetricCollection',
@@ -16,7 +18,10 @@ GroupSpec = namedtuple('GroupSpec', ['endpoints', 'filters', 'metrics'])
 
 
 class ThreshSpec(namedtuple('ThreshSpec', ['op', 'value'])):
-    """Class representing a Threshold specification"""
+    """
+    Class representing a Threshold specification; the "?" operation's value is a threshold
+    expression (see dcamp.util.threshold), which is only evaluated through compile()
+    """
     __slots__ = ()
 
     def check(self, value):
@@ -24,15 +29,41 @@ class ThreshSpec(namedtuple('ThreshSpec', ['op', 'value'])):
             return self.__limit(value)
         elif self.op in ['+', '*']:
             return self.__timed(value)
+        elif self.is_expr:
+            raise NotImplementedError('threshold expressions are stateful; use compile()')
+        raise NotImplementedError('unknown threshold operation')
+
+    def compile(self):
+        """
+        @returns function(value, time) checking this threshold against given value,
+                 calculated at given time (in msecs); expressions get new state per call
+                 of compile()
+        """
+        limit = self.value
+        if '<' == self.op:
+            return lambda value, time: value <= limit
+        elif '>' == self.op:
+            return lambda value, time: value >= limit
+        elif self.is_timed:
+            limit = self.value * 1000
+            return lambda value, time: value + limit <= time
+        elif self.is_expr:
+            return compile_expr(self.value)
         raise NotImplementedError('unknown threshold operation')
 
     def __str__(self):
-        return '%s%s' % (self.op,
-                         self.op in ['<', '>'] and self.value or seconds_to_str(self.value))
+        if self.is_timed:
+            return '%s%s' % (self.op, seconds_to_str(self.value))
+        return '%s%s' % (self.op, self.value)
 
     @property
     def is_limit(self):
-        return self.op in ['<', '>']
+        """ limits (including expressions) are checked against calculated values """
+        return self.op in ['<', '>', '?']
+
+    @property
+    def is_expr(self):
+        return '?' == self.op
 
     @property
     def is_timed(self):
@@ -73,6 +104,13 @@ class ThreshSpec(namedtuple('ThreshSpec', ['op', 'value'])):
             except ValueError:
                 errmsg = 'value-based threshold specification contains invalid value'
 
+        elif '?' == op:
+            value = val_str.strip()
+            try:
+                compile_expr(value)
+            except ValueError as e:
+                errmsg = 'threshold expression invalid (%s)' % e
+
         else:
             errmsg = 'invalid op for threshold specification'
 
@@ -82,19 +120,129 @@ class ThreshSpec(namedtuple('ThreshSpec', ['op', 'value'])):
         return cls(op, value)
 
 
+class ReduceSpec(namedtuple('ReduceSpec', ['mode', 'value', 'relative', 'silence'])):
+    """
+    Class representing a data Reduction specification; one of:
+
+        deadband <value>[%] [<max-silence>] -- forward when the value moved over given
+                                               amount (or percent) since last forwarded
+        change [<max-silence>]              -- forward when the value changed
+        summary                             -- release a hold as one summary sample
+
+    Without a change, a sample is still forwarded once max-silence (secs) has passed.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        result = self.mode
+        if 'deadband' == self.mode:
+            result += ' %g%s' % (self.value, self.relative and '%' or '')
+        if self.silence is not None:
+            result += ' %s' % seconds_to_str(self.silence)
+        return result
+
+    @property
+    def is_summary(self):
+        return 'summary' == self.mode
+
+    def exceeds(self, last, value):
+        """ @returns True if given value is to be forwarded, given last forwarded one """
+        assert not self.is_summary
+        if last is None:
+            return True
+
+        delta = abs(value - last)
+        if 'change' == self.mode:
+            return delta != 0
+        elif 'deadband' == self.mode:
+            limit = self.value
+            if self.relative:
+                limit = self.value * abs(last) / 100
+            return delta > limit
+        raise NotImplementedError('unknown reduce mode')
+
+    @classmethod
+    def from_str(cls, given):
+        assert isinstance(given, str)
+
+        errmsg = None
+
+        parts = given.split()
+        mode = parts and parts[0] or None
+        args = parts[1:]
+        (value, relative, silence) = (None, False, None)
+
+        if 'deadband' == mode:
+            if len(args) not in [1, 2]:
+                errmsg = 'deadband reduce specification requires value and optional time'
+            else:
+                val_str = args.pop(0)
+                relative = val_str.endswith('%')
+                try:
+                    value = float(val_str.rstrip('%'))
+                    if value < 0:
+                        raise ValueError()
+                except ValueError:
+                    errmsg = 'deadband reduce specification contains invalid value'
+
+        elif 'change' == mode:
+            if len(args) > 1:
+                errmsg = 'change reduce specification allows only optional time'
+
+        elif 'summary' == mode:
+            if len(args) > 0:
+                errmsg = 'summary reduce specification allows no values'
+
+        else:
+            errmsg = 'invalid mode for reduce specification'
+
+        if errmsg is None and len(args) > 0:
+            try:
+                silence = str_to_seconds(args[0])
+            except (NotImplementedError, ValueError):
+                errmsg = 'reduce specification contains invalid time'
+
+        if errmsg:
+            raise ValueError('%s: [%s]' % (errmsg, given))
+
+        return cls(mode, value, relative, silence)
+
+
 class MetricSpec(namedtuple('MetricSpec', ['config_name', 'rate', 'threshold', 'detail', 'param',
-                                           'aggr'])):
-    """ Class Representing a Metric Specification """
+                                           'aggr', 'reduce', 'rate_min', 'rate_max'],
+                            defaults=[None, None, None])):
+    """
+    Class Representing a Metric Specification; adaptive specs (see AdaptiveRate) sample
+    between every rate_min and rate_max seconds, starting at rate
+    """
     __slots__ = ()
 
     def __str__(self):
-        return "%s(detail='%s', rate='%s', threshold='%s', param='%s', aggr='%s')" % (
-            self.config_name, self.detail, seconds_to_str(self.rate),
-            self.threshold, self.param or '', self.aggr or '')
+        rate = seconds_to_str(self.rate)
+        if self.is_adaptive:
+            rate = '%s..%s..%s' % (seconds_to_str(self.rate_min), rate,
+                                   seconds_to_str(self.rate_max))
+        return ("%s(detail='%s', rate='%s', threshold='%s', param='%s', aggr='%s', "
+                "reduce='%s')" % (self.config_name, self.detail, rate, self.threshold,
+                                  self.param or '', self.aggr or '', self.reduce or ''))
+
+    @property
+    def is_adaptive(self):
+        return self.rate_min is not None
+
+    @property
+    def longest_rate(self):
+        """ longest time (in secs) between two samples of this spec """
+        return self.is_adaptive and self.rate_max or self.rate
+
+    @property
+    def shortest_rate(self):
+        """ shortest time (in secs) between two samples of this spec """
+        return self.is_adaptive and self.rate_min or self.rate
 
 
 class MetricCollection(namedtuple('MetricCollection', 'epoch, spec')):
-    """ Class Representing a Metric Collection Specification """
+    """ Class Representing a Metric Collection Specification; epoch is in msecs """
     __slots__ = ()
     pass
 
@@ -126,8 +274,9 @@ class EndpntSpec(namedtuple('EndpntSpec', ['host', 'port'])):
     DATA_EXTERNAL = 4  # Filter (PUB) ---------------connects-to--> Aggregation (SUB)
     DATA_INTERNAL = 5  # Sensor|Aggregation (PUSH) --connects-to--> Filter (PULL)
 
-    __RESERVED6__ = 6
-    __RESERVED7__ = 7
+    # inproc only
+    CONFIG_NOTIFY = 6  # Service (SUB) -------------connects-to--> Configuration (PUB)
+    PROBE_RESULTS = 7  # probe pool (PUSH) ---------connects-to--> Sensor (PULL)
     __RESERVED8__ = 8
     __RESERVED9__ = 9
 
@@ -141,8 +290,8 @@ class EndpntSpec(namedtuple('EndpntSpec', ['host', 'port'])):
         DATA_EXTERNAL,
         DATA_INTERNAL,
 
-        __RESERVED6__,
-        __RESERVED7__,
+        CONFIG_NOTIFY,
+        PROBE_RESULTS,
         __RESERVED8__,
         __RESERVED9__,
     ]
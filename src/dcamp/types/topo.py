@@ -1,11 +1,11 @@
 import logging
-from re import compile
 from uuid import UUID
 from sys import stdout
 from functools import total_ordering
 from datetime import datetime
 
 from dcamp.util.decorators import prefixable
+from dcamp.types import codec
 from dcamp.types.specs import EndpntSpec
 from dcamp.types.messages.control import ASSIGN
 
@@ -27,6 +27,10 @@ class DuplicateNodeError(TopoError):
 
 @total_ordering
 class TopoNode(object):
+    # trees hold a node per base node; keep them small
+    __slots__ = ('endpoint', 'uuid', 'level', 'group', 'key', 'parent', 'children',
+                 'last_seen')
+
     def __init__(self, endpoint, uuid, level, group):
         assert isinstance(endpoint, EndpntSpec)
         assert isinstance(uuid, UUID)
@@ -36,9 +40,12 @@ class TopoNode(object):
         self.uuid = uuid
         self.level = level
         self.group = group
+        # endpoint, level and group never change; see get_key()
+        self.key = self.__make_key()
 
         self.parent = None
-        self.children = []
+        # { endpoint : TopoNode }, in insertion order
+        self.children = {}
         self.last_seen = 0
 
     def __eq__(self, given):
@@ -69,13 +76,13 @@ class TopoNode(object):
 
     def add_child(self, child):
         assert isinstance(child, TopoNode)
-        assert child not in self.children
-        self.children.append(child)
+        assert child.endpoint not in self.children
+        self.children[child.endpoint] = child
 
     def del_child(self, child):
         assert isinstance(child, TopoNode)
-        assert child in self.children
-        self.children.remove(child)
+        assert child.endpoint in self.children
+        del self.children[child.endpoint]
 
     def touch(self):
         self.last_seen = datetime.now()
@@ -93,6 +100,9 @@ class TopoNode(object):
         /TOPO/<group>/collector = BranchNode
         /TOPO/<group>/leaves/<ep> = LeafNode
         """
+        return self.key
+
+    def __make_key(self):
         root_key = '/TOPO/root'
         bran_key = '/TOPO/{}/collector'.format(self.group)
         leaf_key = '/TOPO/{}/leaves/{}'.format(self.group, self.endpoint)
@@ -106,6 +116,20 @@ class TopoNode(object):
 
         raise NotImplementedError('unknown level')
 
+    def _codec_fields(self):
+        # parent and children are not replicated; see TopoTreeMixin.kv_update()
+        return self.endpoint, self.uuid, self.level, self.group, self.last_seen
+
+    @classmethod
+    def _from_codec_fields(cls, fields):
+        (endpoint, uuid, level, group, last_seen) = fields
+        node = cls(endpoint, uuid, level, group)
+        node.last_seen = last_seen
+        return node
+
+
+codec.register(TopoNode, 'n', TopoNode._codec_fields, TopoNode._from_codec_fields, 5)
+
 
 @prefixable
 class TopoTreeMixin(object):
@@ -118,10 +142,17 @@ class TopoTreeMixin(object):
         /TOPO/root = RootNode
         /TOPO/<group>/collector = BranchNode
         /TOPO/<group>/leaves/<ep> = LeafNode
+
+    Keys are not parsed; a node's key follows from its level, group and endpoint (see
+    TopoNode.get_key()), so updates only have to match the key of their node.
+
+    Besides the tree itself, the leaves of each group are indexed, so group sizes are
+    found without walking the group's collector.
+
+    Nodes are also held as values by the key-value store and its published snapshots, so
+    touching a node does not modify it: the tree keeps last-seen times of touched nodes
+    itself (see last_seen()), and a node's own last_seen is its time when it was written.
     """
-    root_pattern = compile(r'/TOPO/root')
-    bran_pattern = compile(r'/TOPO/(?P<group>[\w\-.]+)/collector')
-    leaf_pattern = compile(r'/TOPO/(?P<group>[\w\-.]+)/leaves/(?P<endpoint>[\w\-.]+:\d+)')
 
     def __init__(self):
         self.logger = logging.getLogger('dcamp.types.topo')
@@ -130,6 +161,10 @@ class TopoTreeMixin(object):
         self.__root = None  # root node
         # { group : TopoNode }
         self.__collectors = {}  # collector nodes, by group
+        # { group : { endpoint : TopoNode } }
+        self.__leaves = {}
+        # { endpoint : last-seen }, of nodes touched since they were inserted
+        self.__seen = {}
 
     def __len__(self):
         return len(self.__nodes)
@@ -141,7 +176,7 @@ class TopoTreeMixin(object):
 
         yield node.get_key_value()
 
-        for child in node.children:
+        for child in node.children.values():
             yield from self.walk(child)
 
     def print(self, out=stdout, node=None):
@@ -157,36 +192,27 @@ class TopoTreeMixin(object):
 
         # these fields are not marshallable
         v.parent = None
-        v.children = []
+        v.children = {}
 
-        # check key in common-case order
+        if k != v.get_key():
+            self.logger.error('key / value do not match; {} != {}'.format(k, v.get_key()))
+            return False
 
-        m = TopoTreeMixin.leaf_pattern.match(k)
-        if m is not None:
-            return self.__kv_update_leaf(m, v)
+        # check level in common-case order
 
-        m = TopoTreeMixin.bran_pattern.match(k)
-        if m is not None:
-            return self.__kv_update_branch(m, v)
+        if 'leaf' == v.level:
+            return self.__kv_update_leaf(v)
 
-        m = TopoTreeMixin.root_pattern.match(k)
-        if m is not None:
-            return self.__insert_root_node(v)
+        if 'branch' == v.level:
+            return self.__kv_update_branch(v)
 
-        self.logger.error('unknown topo key')
-        return False
+        return self.__insert_root_node(v)
 
-    def __kv_update_leaf(self, m, v):
+    def __kv_update_leaf(self, v):
         assert self.__root is not None
-        (m_g, m_e) = (m.group('group'), m.group('endpoint'))
-        if (m_g, m_e, 'leaf') != (v.group, str(v.endpoint), v.level):
-            self.logger.error('key / value do not match; {} != {}'.format(
-                (m_g, m_e), (v.group, v.endpoint, v.level)))
-            return False
 
         # if new node
         if v.endpoint not in self.__nodes:
-            assert v not in self.__nodes.values()
             # v.parent is not valid at this point; lookup parent by group
             parent = self.get_collector(v.group)
             if parent is None:
@@ -200,19 +226,11 @@ class TopoTreeMixin(object):
 
         # v.parent and v.children are not valid at this point; get from
         # current node before replacing
-        old = self.__nodes[v.endpoint]
-        v.parent = old.parent
-        v.children = old.children
-
-        self.__nodes[v.endpoint] = v
+        self.__replace(self.__nodes[v.endpoint], v)
         return True
 
-    def __kv_update_branch(self, m, v):
+    def __kv_update_branch(self, v):
         assert self.__root is not None
-        m_g = m.group('group')
-        if (m_g, 'branch') != (v.group, v.level):
-            self.logger.error('key / value do not match; {} != {}'.format(m_g, (v.group, v.level)))
-            return False
 
         # group currently exists
         if v.group in self.__collectors:
@@ -220,14 +238,8 @@ class TopoTreeMixin(object):
 
             if v == old:
                 # same node; just update
-                assert v.endpoint in self.__nodes
-                assert v in self.__nodes.values()
-                # v.parent and v.children are not valid at this point; get from
-                # current node before replacing
-                v.parent = old.parent
-                v.children = old.children
-
-                self.__nodes[v.endpoint] = v
+                assert self.__nodes.get(v.endpoint) is old
+                self.__replace(old, v)
                 self.__collectors[v.group] = v
                 return True
 
@@ -238,10 +250,21 @@ class TopoTreeMixin(object):
 
         # otherwise, new group
         assert v.endpoint not in self.__nodes
-        assert v not in self.__nodes.values()
         self.insert_node(v, self.__root)
         return True
 
+    def __replace(self, old, new):
+        """ replaces given node (in place) with given updated copy of it """
+        (new.parent, new.children) = (old.parent, old.children)
+        if new.parent is not None:
+            new.parent.children[new.endpoint] = new
+        for c in new.children.values():
+            c.parent = new
+
+        self.__nodes[new.endpoint] = new
+        if 'leaf' == new.level:
+            self.__index_leaf(new)
+
     #####
     # root access
 
@@ -273,12 +296,13 @@ class TopoTreeMixin(object):
         # if replacing the current root node, update child-parent relationships
         if old_root is not None:
             self.logger.warn('root node {} replaced by {}'.format(old_root, new_root))
-            for c in old_root.children:
+            for c in old_root.children.values():
                 c.parent = new_root
                 new_root.add_child(c)
 
             # remove old root from dict; no kv update needed for deletion since it is being replaced
             del self.__nodes[old_root.endpoint]
+            self.__seen.pop(old_root.endpoint, None)
 
         # add kv update for new root
         kvlist.append(self.__root.get_key_value())
@@ -306,38 +330,51 @@ class TopoTreeMixin(object):
         node.parent.del_child(node)
 
         # then remove each of node's children from the tree
-        for c in node.children:
+        for c in node.children.values():
             del self.__nodes[c.endpoint]
+            self.__seen.pop(c.endpoint, None)
             kvlist.append((c.get_key(), None))
 
         # and lastly remove node from the tree
         del self.__nodes[node.endpoint]
+        self.__seen.pop(node.endpoint, None)
         del self.__collectors[node.group]
+        self.__leaves.pop(node.group, None)
         kvlist.append((node.get_key(), None))
 
         # return kv updates
         return kvlist
 
+    def group_size(self, group):
+        """ @returns number of leaves in given group """
+        return len(self.__leaves.get(group, ()))
+
     #####
     # leaf/node access
 
     def get_node(self, endpoint):
         return None if endpoint not in self.__nodes else self.__nodes[endpoint]
 
+    def __in_tree(self, node):
+        return self.__nodes.get(node.endpoint) is node
+
     def insert_node(self, node, parent):
         assert self.__root is not None
         assert isinstance(parent, TopoNode)
-        assert parent in self.__nodes.values()
+        assert self.__in_tree(parent)
 
         kvlist = []
 
-        if node.endpoint in self.__nodes or node in self.__nodes.values():
+        if node.endpoint in self.__nodes:
             raise DuplicateNodeError('node already exists: %s' % self.__nodes[node.endpoint])
 
         parent.add_child(node)
         node.parent = parent
         self.__nodes[node.endpoint] = node
 
+        if 'leaf' == node.level:
+            self.__index_leaf(node)
+
         if 'branch' == node.level:
             assert node.parent == self.__root
             if node.group in self.__collectors:
@@ -352,14 +389,19 @@ class TopoTreeMixin(object):
         return kvlist
 
     def update_node(self, node):
-        assert node in self.__nodes.values()
-        assert node.endpoint in self.__nodes
+        assert self.__in_tree(node)
         # no assignment actually needed since TopoNode is reference to node already in tree
         return [node.get_key_value()]
 
-    def touch_node(self, node):
-        assert node in self.__nodes.values()
-        assert node.endpoint in self.__nodes
-        # no assignment actually needed since TopoNode is reference to node already in tree
-        node.touch()
-        return [node.get_key_value()]
+    def touch_node(self, node, last_seen=None):
+        """ sets given node's last-seen time (default now); the node is not modified """
+        assert self.__in_tree(node)
+        self.__seen[node.endpoint] = datetime.now() if last_seen is None else last_seen
+
+    def last_seen(self, node):
+        """ @returns given node's last-seen time """
+        return self.__seen.get(node.endpoint, node.last_seen)
+
+    def __index_leaf(self, leaf):
+        """ (re)inserts given leaf into the index of its group """
+        self.__leaves.setdefault(leaf.group, {})[leaf.endpoint] = leaf
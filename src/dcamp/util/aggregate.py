@@ -0,0 +1,181 @@
+try:
+    import numpy
+except ImportError:  # optional; see SampleTable
+    numpy = None
+
+__all__ = [
+    'SampleTable',
+]
+
+
+class SampleTable(object):
+    """
+    Column store of the first and last sample per node, used by DataAggregate.
+
+    Each node gets a fixed slot in parallel columns of time, value and base value (for
+    both the first and the last sample of the aggregation period), so calculating every
+    node's value is a single vectorized pass over the columns, as is summarizing them.
+    Calculations match Data.calculate() for the sample type (see _calculate()).
+
+    Columns are numpy arrays if numpy is installed, otherwise plain lists.
+    """
+
+    INITIAL_SLOTS = 16
+
+    # (first, last) column names, per field
+    COLUMNS = ('first_time', 'first_value', 'first_base',
+               'last_time', 'last_value', 'last_base')
+
+    def __init__(self):
+        # { EndpntSpec : slot }, and the reverse
+        self.slots = {}
+        self.nodes = []
+
+        self.__size = SampleTable.INITIAL_SLOTS
+        # number of samples per slot: 0, 1 (first only), or 2 (first and last)
+        self.count = SampleTable.__column(self.__size, int)
+        self.first_time = SampleTable.__column(self.__size)
+        self.first_value = SampleTable.__column(self.__size)
+        self.first_base = SampleTable.__column(self.__size)
+        self.last_time = SampleTable.__column(self.__size)
+        self.last_value = SampleTable.__column(self.__size)
+        self.last_base = SampleTable.__column(self.__size)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @staticmethod
+    def __column(size, dtype=float, old=None):
+        """ returns new column with room for given number of slots, copying old column """
+        if numpy is not None:
+            column = numpy.zeros(size, dtype=dtype)
+        else:
+            column = [dtype(0)] * size
+        if old is not None:
+            column[:len(old)] = old
+        return column
+
+    def __grow(self):
+        """ doubles the number of slots of all columns """
+        self.__size *= 2
+        self.count = SampleTable.__column(self.__size, int, self.count)
+        self.first_time = SampleTable.__column(self.__size, old=self.first_time)
+        self.first_value = SampleTable.__column(self.__size, old=self.first_value)
+        self.first_base = SampleTable.__column(self.__size, old=self.first_base)
+        self.last_time = SampleTable.__column(self.__size, old=self.last_time)
+        self.last_value = SampleTable.__column(self.__size, old=self.last_value)
+        self.last_base = SampleTable.__column(self.__size, old=self.last_base)
+
+    def add(self, msg):
+        """ adds given sample, keeping the node's first and (replacing any) last one """
+        slot = self.slots.get(msg.source)
+        if slot is None:
+            slot = len(self.nodes)
+            if slot == self.__size:
+                self.__grow()
+            self.slots[msg.source] = slot
+            self.nodes.append(msg.source)
+
+        value = float('nan') if msg.value is None else msg.value
+        base = float('nan') if msg.base_value is None else msg.base_value
+
+        count = self.count[slot]
+        if count == 0:
+            (self.first_time[slot], self.first_value[slot], self.first_base[slot]) = \
+                (msg.time, value, base)
+            self.count[slot] = 1
+        elif msg.time > (self.last_time[slot] if count == 2 else self.first_time[slot]):
+            (self.last_time[slot], self.last_value[slot], self.last_base[slot]) = \
+                (msg.time, value, base)
+            self.count[slot] = 2
+        # else: sample not newer than the node's newest one (i.e. re-sent); ignore it
+
+    def reset(self):
+        """ keeps only the last sample of each node, which becomes its first sample """
+        n = len(self.nodes)
+        if numpy is not None:
+            full = self.count[:n] == 2
+            for f in ('time', 'value', 'base'):
+                first = getattr(self, 'first_' + f)
+                first[:n][full] = getattr(self, 'last_' + f)[:n][full]
+            self.count[:n][full] = 1
+        else:
+            for i in range(n):
+                if self.count[i] == 2:
+                    self.first_time[i] = self.last_time[i]
+                    self.first_value[i] = self.last_value[i]
+                    self.first_base[i] = self.last_base[i]
+                    self.count[i] = 1
+
+    def values(self, m_type):
+        """
+        Calculates the values (for samples of given type) of all nodes with two samples.
+
+        @returns (values, slots) as numpy arrays (if available) or lists
+        """
+        n = len(self.nodes)
+        if numpy is not None:
+            slots = numpy.flatnonzero(self.count[:n] == 2)
+            columns = [getattr(self, c)[slots] for c in SampleTable.COLUMNS]
+            return SampleTable._calculate(m_type, *columns), slots
+
+        slots = [i for i in range(n) if self.count[i] == 2]
+        values = [SampleTable._calculate(m_type, *[getattr(self, c)[i]
+                                                   for c in SampleTable.COLUMNS])
+                  for i in slots]
+        return values, slots
+
+    def summary(self, m_type):
+        """
+        Calculates all nodes' values (for samples of given type) and summarizes them in
+        one pass. Only nodes with two samples are included.
+
+        @returns (node-cnt, sum, min, min-node, max, max-node), with None for all but the
+                 count if no node has two samples
+        """
+        (values, slots) = self.values(m_type)
+        if len(slots) == 0:
+            return 0, None, None, None, None, None
+
+        if numpy is not None:
+            (total, lo, hi) = (values.sum(), values.argmin(), values.argmax())
+        else:
+            total = sum(values)
+            (lo, hi) = (values.index(min(values)), values.index(max(values)))
+
+        return (len(slots), float(total),
+                float(values[lo]), self.nodes[slots[lo]],
+                float(values[hi]), self.nodes[slots[hi]])
+
+    @staticmethod
+    def _calculate(m_type, first_time, first_value, first_base,
+                   last_time, last_value, last_base):
+        """
+        Calculates value(s) from given first and last samples, as Data.calculate() does
+        for the given sample type; arguments are either scalars or numpy arrays.
+        """
+        if m_type == 'delta':
+            return last_value - first_value
+
+        elif m_type in ('average', 'percent', 'rate'):
+            if m_type == 'rate':
+                numerator = last_value - first_value
+                denominator = last_time - first_time
+                scale = 1e3
+            else:
+                numerator = last_value - first_value
+                denominator = last_base - first_base
+                scale = 100.0 if m_type == 'percent' else 1.0
+
+            # zero denominator calculates as zero
+            if numpy is not None and isinstance(denominator, numpy.ndarray):
+                result = numpy.zeros(len(denominator))
+                nonzero = denominator != 0
+                result[nonzero] = numerator[nonzero] / denominator[nonzero]
+                return result * scale
+            if denominator == 0:
+                return 0.0
+            return (numerator / denominator) * scale
+
+        # basic (and aggregated) samples calculate as the last value
+        return last_value
@@ -0,0 +1,306 @@
+import logging
+from math import isnan
+from os import fdopen, makedirs
+from struct import Struct
+from tempfile import mkstemp
+from time import strftime
+
+from dcamp.types.messages.common import _PROPS
+from dcamp.types.messages.data import PropSchemas, log_str
+from dcamp.types.specs import EndpntSpec
+from dcamp.util.functions import now_msecs
+
+__all__ = [
+    'DataSink',
+    'TextDataSink',
+    'BinaryDataSink',
+    'open_sink',
+    'read_records',
+    'convert',
+]
+
+
+class DataSink(object):
+    """
+    Buffered, rotating data log file writer used by the Filter service.
+
+    Samples are encoded into an in-memory buffer when written and only hit the disk
+    when flush() finds the flush interval has passed (or the buffer has grown past
+    BUFFER_BYTES). After each flush, the file is rotated once it is larger than max_bytes
+    or older than max_age; rotated files are never reopened.
+
+    Sub-classes implement the file format via _header() and _encode().
+    """
+
+    SUFFIX = None
+    BUFFER_BYTES = 64 * 1024
+
+    # defaults for the [global] datalog options; see ConfigFileMixin
+    FLUSH_INTERVAL = 5  # units: seconds
+    MAX_AGE = 60 * 60  # units: seconds
+    MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, directory, prefix, flush_interval=None, max_age=None,
+                 max_bytes=None):
+        self.logger = logging.getLogger('dcamp.util.datalog')
+
+        self.directory = directory
+        self.prefix = prefix
+
+        # msecs; 0 flushes on every write
+        self.flush_interval = 1000 * (DataSink.FLUSH_INTERVAL if flush_interval is None
+                                      else flush_interval)
+        self.max_age = 1000 * (max_age or DataSink.MAX_AGE)  # msecs
+        self.max_bytes = max_bytes or DataSink.MAX_BYTES
+
+        self.__buffer = bytearray()
+        self.__next_flush = None  # msecs; None when nothing is buffered
+
+        self.file = None
+        self.name = None
+        self.__opened = None  # msecs
+        self.__written = 0  # bytes
+
+        makedirs(self.directory, exist_ok=True)
+        self.__open()
+
+    def __open(self):
+        prefix = '{}.{}.'.format(self.prefix, strftime('%Y%m%d-%H%M%S'))
+        (fd, path) = mkstemp(prefix=prefix, suffix=self.SUFFIX, dir=self.directory)
+        self.file = fdopen(fd, mode='wb')
+        self.name = path
+        self.__opened = now_msecs()
+        self.__written = 0
+
+        self.__buffer += self._header()
+        self.logger.debug('writing data to %s' % path)
+
+    def write(self, samples):
+        """ encodes given Data samples into the write buffer """
+        if len(samples) == 0:
+            return
+
+        self.__buffer += self._encode(samples)
+
+        if self.__next_flush is None:
+            self.__next_flush = now_msecs() + self.flush_interval
+        if len(self.__buffer) >= DataSink.BUFFER_BYTES or self.flush_interval == 0:
+            self.flush(force=True)
+
+    def next_flush(self):
+        """ @returns next flush time (as msecs delta) or None if nothing is buffered """
+        if self.__next_flush is None:
+            return None
+        return max(0, self.__next_flush - now_msecs())
+
+    def flush(self, force=False):
+        """ writes buffered data to disk if the flush interval has passed (or forced) """
+        if self.__next_flush is None and not force:
+            return
+
+        now = now_msecs()
+        if not force and now < self.__next_flush:
+            return
+
+        self.__write_buffer()
+
+        if self.__written >= self.max_bytes or now - self.__opened >= self.max_age:
+            self.file.close()
+            self._rotated()
+            self.__open()
+
+    def __write_buffer(self):
+        if len(self.__buffer) > 0:
+            self.file.write(self.__buffer)
+            self.file.flush()
+            self.__written += len(self.__buffer)
+            self.__buffer = bytearray()
+        self.__next_flush = None
+
+    def close(self):
+        self.__write_buffer()
+        self.file.close()
+
+    def _header(self):
+        return b''
+
+    def _encode(self, samples):
+        raise NotImplementedError('sub-class implementation missing')
+
+    def _rotated(self):
+        pass
+
+
+class TextDataSink(DataSink):
+    """ data log with one Data.log_str() line per sample (the original format) """
+
+    SUFFIX = '.dcamp-data'
+
+    def _encode(self, samples):
+        return ''.join(s.log_str() + '\n' for s in samples).encode()
+
+
+class BinaryDataSink(DataSink):
+    """
+    Compact, append-only binary data log; see read_records() for reading it back.
+
+    File format is the header followed by records, all in network byte order:
+        MAGIC version                                          -- header
+        'N' stream-id source-length props-length source props  -- new stream
+        'D' stream-id time value base-value                    -- sample (fixed width)
+        'E' stream-id time value base-value props-length props -- sample, changed props
+
+    A stream is a unique source and schema (see PropSchemas.SCHEMA_KEYS), i.e. one per
+    metric spec and source. The properties of a stream's first sample are written once
+    per file and each sample then only refers to the interned stream id; when the
+    properties outside of the schema change (e.g. those of aggregates), the sample is
+    written with the changed properties only, and removed properties as null. Values and
+    base values of None are written as NaN.
+
+    Version 1 files interned all properties in 'N' records; they are read the same way.
+    """
+
+    SUFFIX = '.dcamp-bin'
+
+    MAGIC = b'DCAMPLOG'
+    VERSION = 2
+
+    HEADER = Struct('!8sB')
+    STREAM = Struct('!cIHH')
+    SAMPLE = Struct('!cIQdd')
+    EXTRA = Struct('!cIQddH')
+
+    def __init__(self, directory, prefix, flush_interval=None, max_age=None,
+                 max_bytes=None):
+        # { (source, schema) : (stream-id, properties) }; reset per file so each file
+        # stands alone
+        self.__streams = {}
+        super().__init__(directory, prefix, flush_interval, max_age, max_bytes)
+
+    def _header(self):
+        return BinaryDataSink.HEADER.pack(BinaryDataSink.MAGIC, BinaryDataSink.VERSION)
+
+    def _rotated(self):
+        self.__streams = {}
+
+    def _encode(self, samples):
+        result = bytearray()
+        for s in samples:
+            schema = tuple((k, s.properties[k]) for k in PropSchemas.SCHEMA_KEYS
+                           if k in s.properties)
+            key = (s.source, schema)
+            (sid, last) = self.__streams.get(key, (None, None))
+            if sid is None:
+                sid = len(self.__streams)
+                source = s.source.encode()
+                props = _PROPS._encode_dict(s.properties)
+                result += BinaryDataSink.STREAM.pack(b'N', sid, len(source), len(props))
+                result += source + props
+                last = dict(s.properties)
+                self.__streams[key] = (sid, last)
+
+            value = float('nan') if s.value is None else s.value
+            base_value = float('nan') if s.base_value is None else s.base_value
+            if s.properties == last:
+                result += BinaryDataSink.SAMPLE.pack(b'D', sid, s.time, value, base_value)
+            else:
+                delta = {k: v for (k, v) in s.properties.items() if last.get(k) != v}
+                delta.update((k, None) for k in last if k not in s.properties)
+                props = _PROPS._encode_dict(delta)
+                result += BinaryDataSink.EXTRA.pack(b'E', sid, s.time, value, base_value,
+                                                    len(props))
+                result += props
+                self.__streams[key] = (sid, dict(s.properties))
+        return result
+
+
+def open_sink(directory, prefix, kind='binary', **kwargs):
+    """ returns new data sink of given kind ('binary' or 'text'); kwargs per DataSink """
+    sinks = {
+        'binary': BinaryDataSink,
+        'text': TextDataSink,
+    }
+    if kind not in sinks:
+        raise ValueError('unknown data log format: %s' % kind)
+    return sinks[kind](directory, prefix, **kwargs)
+
+
+def read_records(file):
+    """
+    Generator reading given binary data log file (opened in binary mode).
+
+    @yields (time, source, properties, value, base_value) tuples in file order
+    """
+    (header, stream, sample, extra) = (BinaryDataSink.HEADER, BinaryDataSink.STREAM,
+                                       BinaryDataSink.SAMPLE, BinaryDataSink.EXTRA)
+
+    buffer = file.read(header.size)
+    if len(buffer) < header.size:
+        raise ValueError('not a dcamp binary data log')
+    (magic, version) = header.unpack(buffer)
+    if magic != BinaryDataSink.MAGIC:
+        raise ValueError('not a dcamp binary data log')
+    if version not in (1, BinaryDataSink.VERSION):
+        raise ValueError('unsupported data log version: %d' % version)
+
+    # { stream-id : (source, properties) }
+    streams = {}
+
+    while True:
+        tag = file.read(1)
+        if len(tag) == 0:
+            return
+
+        if b'D' == tag:
+            buffer = tag + file.read(sample.size - 1)
+            if len(buffer) < sample.size:
+                break
+            (_, sid, time, value, base_value) = sample.unpack(buffer)
+            (source, props) = streams[sid]
+            yield (time, source, props,
+                   None if isnan(value) else value,
+                   None if isnan(base_value) else base_value)
+
+        elif b'E' == tag:
+            buffer = tag + file.read(extra.size - 1)
+            if len(buffer) < extra.size:
+                break
+            (_, sid, time, value, base_value, props_len) = extra.unpack(buffer)
+            buffer = file.read(props_len)
+            if len(buffer) < props_len:
+                break
+            (source, props) = streams[sid]
+            props = dict(props)
+            for (k, v) in _PROPS._decode_dict(buffer).items():
+                if v is None:
+                    del props[k]
+                else:
+                    props[k] = v
+            streams[sid] = (source, props)
+            yield (time, source, props,
+                   None if isnan(value) else value,
+                   None if isnan(base_value) else base_value)
+
+        elif b'N' == tag:
+            buffer = tag + file.read(stream.size - 1)
+            if len(buffer) < stream.size:
+                break
+            (_, sid, source_len, props_len) = stream.unpack(buffer)
+            buffer = file.read(source_len + props_len)
+            if len(buffer) < source_len + props_len:
+                break
+            streams[sid] = (EndpntSpec.decode(buffer[:source_len]),
+                            _PROPS._decode_dict(buffer[source_len:]))
+
+        else:
+            raise ValueError('invalid data log record: %r' % tag)
+
+    # writer died mid-record; everything before it is still good
+    logging.getLogger('dcamp.util.datalog').warning(
+        'truncated data log record at end of file')
+
+
+def convert(infile, outfile):
+    """ converts given binary data log to the text data log format; see TextDataSink """
+    for record in read_records(infile):
+        outfile.write(log_str(*record) + '\n')
@@ -51,6 +51,27 @@ def str_to_seconds(string):
         raise NotImplementedError('invalid time unit given--valid units: %s' % valid_units)
 
 
+def str_to_bytes(string):
+    """
+    Method determines how size in given string is specified and returns an int value in
+    bytes.
+
+        >>> str_to_bytes('64M')
+        67108864
+
+    valid size units (powers of 1024; optional):
+        K, M, G
+    """
+    valid_units = ['K', 'M', 'G']
+    if string[-1:] in valid_units:
+        return int(string[:-1]) * 1024 ** (valid_units.index(string[-1]) + 1)
+    elif string.isdigit():
+        return int(string)
+    else:
+        raise NotImplementedError('invalid size unit given--valid units: %s' %
+                                  valid_units)
+
+
 def plural(count, ending='s', word=None):
     """return plural form of given word based on given count"""
     return (word or '') + (count != 1.0 and ending or '')
@@ -89,20 +110,3 @@ def format_bytes(given, use_short=True, num_or_suffix='both'):
     else:
         return '{:.2f}{}'.format(num, use_short and suffix or ' ' + suffix)
 
-
-def get_logger_from_caller(default):
-    import inspect
-
-    # we want the caller's logger which does not match the given logger
-
-    stack = inspect.stack()
-    frame = 1
-    while frame < len(stack):
-        caller = stack[frame][0]
-        if 'self' in caller.f_locals:
-            up_logger = caller.f_locals['self'].logger
-            if up_logger != default:
-                return up_logger
-        frame += 1
-
-    return default
@@ -0,0 +1,88 @@
+from threading import Lock
+
+from dcamp.types.specs import EndpntSpec
+from dcamp.util.trace import TracedSocket
+
+__all__ = [
+    'register',
+    'unregister',
+    'bind_alias',
+    'connect_alias',
+    'LocalSocket',
+]
+
+# Registry of the node endpoints running in this process (see Host role). Sockets of
+# services (see ServiceMixin._socket()) bind the tcp ports of registered endpoints to an
+# inproc alias as well, and connect to registered endpoints through that alias, not tcp.
+
+_lock = Lock()
+# { port : host } of all ports (i.e. all offsets) of the registered endpoints
+_ports = {}
+
+
+def register(endpoint):
+    """ registers given endpoint as running in this process """
+    assert isinstance(endpoint, EndpntSpec)
+    with _lock:
+        for offset in range(EndpntSpec.MAX_OFFSET):
+            _ports[endpoint.port + offset] = endpoint.host
+
+
+def unregister(endpoint):
+    with _lock:
+        for offset in range(EndpntSpec.MAX_OFFSET):
+            _ports.pop(endpoint.port + offset, None)
+
+
+def _split(uri):
+    """ @returns (host, port) of given tcp uri, or (None, None) """
+    if not uri.startswith('tcp://'):
+        return None, None
+    (host, _, port) = uri[len('tcp://'):].rpartition(':')
+    if not port.isdecimal():
+        return None, None
+    return host, int(port)
+
+
+def _alias(host, port):
+    # distinct from the inproc uris of EndpntSpec, which use the same host:port form
+    return 'inproc://tcp-%s:%d' % (host, port)
+
+
+def bind_alias(uri):
+    """ @returns inproc alias of given tcp bind uri of a registered endpoint, or None """
+    (host, port) = _split(uri)
+    if '*' != host or port not in _ports:
+        return None
+    return _alias(_ports[port], port)
+
+
+def connect_alias(uri):
+    """ @returns inproc alias of given tcp connect uri of registered endpoint, or None """
+    (host, port) = _split(uri)
+    if host is None or _ports.get(port) != host:
+        return None
+    return _alias(host, port)
+
+
+class LocalSocket(TracedSocket):
+    """ traced socket using inproc instead of tcp between endpoints of this process """
+
+    def bind(self, addr):
+        result = super().bind(addr)
+        alias = bind_alias(addr)
+        if alias is not None:
+            super().bind(alias)
+        return result
+
+    def unbind(self, addr):
+        alias = bind_alias(addr)
+        if alias is not None:
+            super().unbind(alias)
+        return super().unbind(addr)
+
+    def connect(self, addr):
+        return super().connect(connect_alias(addr) or addr)
+
+    def disconnect(self, addr):
+        return super().disconnect(connect_alias(addr) or addr)
@@ -0,0 +1,331 @@
+import os
+import pickle
+import signal
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import count
+from multiprocessing import get_context
+from struct import pack, unpack
+from threading import Lock
+
+import psutil
+from zmq import Context, PUSH, NOBLOCK, ZMQError  # pylint: disable-msg=E0611
+
+from dcamp.util.functions import now_msecs
+
+__all__ = [
+    'ProbePool',
+    'disk_io',
+    'scan_processes',
+]
+
+#####
+# probes; run in worker processes, so they must be module-level functions of picklable
+# arguments and results
+
+
+def disk_io():
+    """ @returns bytes read and written by all disks """
+    disk = psutil.disk_io_counters()
+    return disk.read_bytes + disk.write_bytes
+
+
+def scan_processes(wanted):
+    """
+    Scans the process table once for all given PROC_* metrics; wanted is
+    { process-name: set(detail) }.
+
+    Returns { (process-name, detail): (process-count, value, base-value) }; base values
+    are the system totals read along with the scan, i.e. at the same instant as values.
+    """
+    details = set().union(*wanted.values())
+    bases = {
+        # cpu_times() is accurate to two decimal points
+        'PROC_CPU': int(sum(psutil.cpu_times()) * 1e2) if 'PROC_CPU' in details else None,
+        'PROC_MEM': psutil.virtual_memory().total if 'PROC_MEM' in details else None,
+    }
+
+    # get new list of processes every time in order to not miss any new processes that
+    # are started after the first collection; only the name is fetched for each process
+    table = {}
+    for proc in psutil.process_iter(attrs=['name']):
+        name = proc.info['name']
+        if name not in wanted:
+            continue
+
+        try:
+            # read all requested values for this process with a single set of syscalls
+            with proc.oneshot():
+                values = [(d, _get_proc_value(d, proc)) for d in wanted[name]]
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+
+        for (detail, value) in values:
+            (pcount, total, base) = table.get((name, detail), (0, 0, bases.get(detail)))
+            table[(name, detail)] = (pcount + 1, total + value, base)
+
+    return table
+
+
+def _get_proc_value(detail, proc):
+    if 'PROC_CPU' == detail:
+        # cpu_times() is accurate to two decimal points
+        return int(sum(proc.cpu_times()) * 1e2)
+
+    elif 'PROC_MEM' == detail:
+        return proc.memory_info().rss
+
+    elif 'PROC_IO' == detail:
+        try:
+            io = proc.io_counters()
+            value = io.read_bytes + io.write_bytes
+            if value < 0:
+                # no support for *_bytes in bsd
+                value = 0
+        except AttributeError:
+            # no support for io_counters() in osx
+            value = 0
+
+        return value
+
+    raise NotImplementedError('unknown process metric type: {}'.format(detail))
+
+
+def _timed(fn, *args):
+    """ @returns (time, result) of fn(*args); time (in msecs) is when the probe began """
+    return now_msecs(), fn(*args)
+
+
+#####
+# worker pool
+
+# number of worker processes shared by all Sensor services of this process
+WORKERS = 2
+
+_executor = None
+_executor_lock = Lock()
+# bumped whenever the executor is replaced; see _recycle()
+_generation = 0
+# futures of no-op tasks starting the workers; see _workers_started()
+_warmup = []
+# queue the executor's workers report their pids to; see _recycle()
+_pids = None
+
+# runs shared between pools: { share-key : (future, submit-time, generation) }
+_shared = {}
+_shared_lock = Lock()
+
+
+def _get_executor():
+    """ @returns (executor, generation) """
+    global _executor, _generation, _warmup, _pids
+    with _executor_lock:
+        if _executor is None:
+            # workers are started by a fork server, not forked from this (multi-threaded)
+            # process; they only need this module
+            context = get_context('forkserver')
+            context.set_forkserver_preload([__name__])
+            _pids = context.SimpleQueue()
+            _executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context,
+                                            initializer=_report_pid, initargs=(_pids,))
+            _generation += 1
+            # start the workers now, not with the first probe
+            _warmup = [_executor.submit(int) for _ in range(WORKERS)]
+        return _executor, _generation
+
+
+def _recycle(generation):
+    """
+    Replaces the executor of given generation, killing its workers; a hung probe would
+    otherwise occupy its worker for good. Runs still pending in the killed workers fail
+    with BrokenProcessPool.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None or generation != _generation:
+            return  # already replaced
+        (executor, _executor) = (_executor, None)
+
+    # shutdown() does not stop running probes
+    while not _pids.empty():
+        try:
+            os.kill(_pids.get(), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _report_pid(pids):
+    """ worker initializer """
+    pids.put(os.getpid())
+
+
+def _workers_started():
+    return all(f.done() for f in _warmup)
+
+
+class _Run(namedtuple('_Run', 'name, timeout, deadline, context, generation')):
+    """
+    pending probe run; deadline (in msecs) is None until the workers are started,
+    generation is that of the executor running it
+    """
+    __slots__ = ()
+
+
+class ProbePool(object):
+    """
+    Runs probes in the process's worker pool on behalf of one service, and delivers their
+    results to the service's PULL socket bound at the given (inproc) address.
+
+    Each probe has a name; a probe is not started again while its last run has not
+    finished. Runs not finished by their deadline are reported by expire(), which also
+    replaces the workers of the process so a hung probe cannot hold on to one; results of
+    expired runs are dropped when they arrive. Deadlines are not set before the workers
+    are started, which takes a while for the first probes of the process.
+    """
+
+    # how often (in msecs) to check whether the workers are started
+    STARTUP_POLL = 100
+    # how long (in msecs) a finished run is shared; shorter than any sample rate (whole
+    # seconds), so a pool never gets the same run twice
+    SHARE_WINDOW = 500
+
+    def __init__(self, address):
+        self.address = address
+        _get_executor()
+
+        self.__ids = count()
+        # { probe-id : _Run }
+        self.__pending = {}
+        # { name : probe-id } of pending runs
+        self.__running = {}
+
+    def __len__(self):
+        return len(self.__pending)
+
+    @property
+    def next_deadline(self):
+        """ @returns earliest deadline (in msecs) of pending runs, or None """
+        if len(self.__pending) == 0:
+            return None
+        now = now_msecs()
+        self.__set_deadlines(now)
+        return min(now + self.STARTUP_POLL if run.deadline is None else run.deadline
+                   for run in self.__pending.values())
+
+    def __set_deadlines(self, now):
+        if not _workers_started():
+            return
+        for (probe_id, run) in self.__pending.items():
+            if run.deadline is None:
+                deadline = now + (run.timeout * 1e3)
+                self.__pending[probe_id] = run._replace(deadline=deadline)
+
+    def submit(self, name, timeout, context, fn, *args, share=None):
+        """
+        Runs fn(*args) in the worker pool, with given timeout (in secs); context is
+        returned with the result. @returns False if the named probe is still running.
+
+        Runs of the same (hashable) share key are shared by all pools of the process: a
+        run still pending, or submitted less than SHARE_WINDOW ago, is used instead of
+        starting another one.
+        """
+        if name in self.__running:
+            return False
+
+        probe_id = next(self.__ids)
+        (future, generation) = ProbePool.__start(share, fn, args)
+
+        self.__pending[probe_id] = _Run(name, timeout, None, context, generation)
+        self.__set_deadlines(now_msecs())
+        self.__running[name] = probe_id
+
+        address = self.address
+        future.add_done_callback(lambda f: ProbePool.__deliver(address, probe_id, f))
+        return True
+
+    @staticmethod
+    def __start(share, fn, args):
+        """ @returns (future, generation) of a new or (given share key) shared run """
+        now = now_msecs()
+        with _shared_lock:
+            for (key, (future, time, generation)) in list(_shared.items()):
+                if future.done() and time + ProbePool.SHARE_WINDOW <= now:
+                    del _shared[key]
+
+            # runs of a replaced executor are not shared; they fail or are dropped
+            if (share in _shared and _executor is not None and
+                    _shared[share][2] == _generation):
+                (future, time, generation) = _shared[share]
+                return future, generation
+
+            (executor, generation) = _get_executor()
+            try:
+                future = executor.submit(_timed, fn, *args)
+            except (BrokenProcessPool, RuntimeError):
+                # a worker died, or the executor was just replaced; start over with new
+                # workers
+                _recycle(generation)
+                (executor, generation) = _get_executor()
+                future = executor.submit(_timed, fn, *args)
+
+            if share is not None:
+                _shared[share] = (future, now, generation)
+            return future, generation
+
+    @staticmethod
+    def __deliver(address, probe_id, future):
+        """ sends result of given future; called by the pool's thread, or by submit() """
+        try:
+            (time, value) = future.result()
+            result = (value, None, time)
+        except Exception as e:
+            result = (None, e, None)
+
+        try:
+            socket = Context.instance().socket(PUSH)
+        except ZMQError:
+            return  # context terminated; we're exiting
+        try:
+            socket.linger = 1000  # do not drop the result when closing below
+            socket.connect(address)
+            socket.send_multipart([pack('!Q', probe_id), pickle.dumps(result)])
+        finally:
+            socket.close()
+
+    def recv(self, socket):
+        """
+        Receives next result from given socket; raises zmq.Again if none is available.
+
+        @returns (name, context, value, error, time), or None if the result arrived after
+                 its deadline; time (in msecs) is when the probe started, or None on error
+        """
+        (frame, blob) = socket.recv_multipart(flags=NOBLOCK)
+
+        (probe_id,) = unpack('!Q', frame)
+        (value, error, time) = pickle.loads(blob)
+
+        run = self.__pending.pop(probe_id, None)
+        if run is None:
+            return None  # expired
+
+        del self.__running[run.name]
+        return run.name, run.context, value, error, time
+
+    def expire(self, now=None):
+        """
+        @returns [ (name, context) ] of pending runs past their deadline; their probes can
+                 be submitted again right away
+        """
+        if now is None:
+            now = now_msecs()
+        self.__set_deadlines(now)
+        expired = [(probe_id, run) for (probe_id, run) in self.__pending.items()
+                   if run.deadline is not None and run.deadline <= now]
+
+        for (probe_id, run) in expired:
+            del self.__pending[probe_id]
+            del self.__running[run.name]
+            _recycle(run.generation)
+        return [(run.name, run.context) for (_, run) in expired]
@@ -0,0 +1,73 @@
+from dcamp.types.specs import ReduceSpec
+
+__all__ = [
+    'Reducer',
+]
+
+
+class Reducer(object):
+    """
+    Reduces the samples of one metric before the Filter forwards them, per the metric's
+    ReduceSpec.
+
+    Values are compared as the parent calculates them, i.e. between the last forwarded
+    sample and the next one (see Data.calculate()), so dropped samples are folded into the
+    value of the next forwarded sample rather than lost.
+
+    Summaries replace a released hold with its last sample, carrying the count, min, max,
+    mean and last of the held values as "r-count", "r-min", "r-max", "r-mean" and "r-last"
+    properties.
+    """
+
+    def __init__(self, spec):
+        assert isinstance(spec, ReduceSpec)
+        self.spec = spec
+
+        # last forwarded sample, and its calculated value
+        self.last = None
+        self.last_value = None
+
+    def reduce(self, samples):
+        """ @returns list of given samples (in order) to forward """
+        if self.spec.is_summary:
+            return [self.__summarize(samples)]
+        return [s for s in samples if self.__keep(s)]
+
+    def __keep(self, sample):
+        if self.last is None:
+            # parent needs a first sample to calculate values from
+            self.last = sample
+            return True
+
+        value = self.last.calculate(sample)
+        silent = (self.spec.silence is not None and
+                  sample.time - self.last.time >= self.spec.silence * 1e3)
+        if not silent and not self.spec.exceeds(self.last_value, value):
+            return False
+
+        (self.last, self.last_value) = (sample, value)
+        return True
+
+    def __summarize(self, samples):
+        assert len(samples) > 0
+
+        values = []
+        previous = self.last
+        for s in samples:
+            if previous is not None:
+                values.append(previous.calculate(s))
+            previous = s
+
+        last = self.last = samples[-1]
+        if len(values) == 0:
+            return last
+
+        props = dict(last.properties)
+        props.update({
+            'r-count': len(values),
+            'r-min': min(values),
+            'r-max': max(values),
+            'r-mean': sum(values) / len(values),
+            'r-last': values[-1],
+        })
+        return last.__class__(last.source, props, last.time, last.value, last.base_value)
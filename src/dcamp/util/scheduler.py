@@ -0,0 +1,131 @@
+from heapq import heapify, heappush, heappop
+from itertools import count
+
+from dcamp.types.specs import MetricCollection
+
+__all__ = [
+    'AdaptiveRate',
+    'Scheduler',
+]
+
+
+class Scheduler(object):
+    """
+    Min-heap of metric collections ordered by next collection epoch (in msecs).
+
+    Used by the Sensor and Aggregation services to find the specs due for collection /
+    aggregation. Insert and pop are O(log n); the next epoch of a collection is always
+    calculated from its previously scheduled epoch (not the time it was actually
+    processed), so periodic collections do not drift.
+    """
+
+    def __init__(self, collections=None):
+        # heap entries are [ epoch, tie-breaker, spec ]; the tie-breaker keeps the heap
+        # from ever comparing specs (and keeps FIFO order for specs scheduled at the same
+        # epoch)
+        self.__counter = count()
+        self.__heap = []
+
+        for c in collections or []:
+            assert isinstance(c, MetricCollection)
+            self.__heap.append([c.epoch, next(self.__counter), c.spec])
+        heapify(self.__heap)
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def __iter__(self):
+        """ iterates over all scheduled collections in epoch order """
+        for (epoch, _, spec) in sorted(self.__heap):
+            yield MetricCollection(epoch, spec)
+
+    def __str__(self):
+        return str(list(self))
+
+    @property
+    def next_epoch(self):
+        """ returns epoch (in msecs) of the next scheduled collection, or None """
+        if len(self.__heap) == 0:
+            return None
+        return self.__heap[0][0]
+
+    def schedule(self, spec, epoch):
+        """ add given spec to the schedule with the given epoch (in msecs) """
+        heappush(self.__heap, [epoch, next(self.__counter), spec])
+
+    def pop_due(self, now):
+        """ pop and return list of all collections scheduled at or before given msecs """
+        due = []
+        while len(self.__heap) > 0 and self.__heap[0][0] <= now:
+            (epoch, _, spec) = heappop(self.__heap)
+            due.append(MetricCollection(epoch, spec))
+        return due
+
+    def reschedule(self, collection, now, period=None):
+        """
+        Push given (popped) collection back onto the schedule for its next period.
+
+        The next epoch is based on the collection's scheduled epoch, not on the given
+        time; if one or more periods were missed entirely, they are skipped instead of
+        being collected in a burst. Given period is in msecs, defaulting to the spec's
+        rate.
+
+        @returns the new epoch (in msecs)
+        """
+        if period is None:
+            period = collection.spec.rate * 1000
+        period = max(1, int(period))
+
+        epoch = collection.epoch + period
+        if epoch <= now:
+            # missed at least one whole period; skip to the first epoch after now
+            epoch += ((now - epoch) // period + 1) * period
+
+        self.schedule(collection.spec, epoch)
+        return epoch
+
+    def clear(self):
+        self.__heap = []
+
+
+class AdaptiveRate(object):
+    """
+    Sampling period (in msecs) of an adaptive metric spec, used by the Sensor to
+    reschedule the spec's collections.
+
+    Each sample's calculated value (see Data.calculate()) is compared to the previous one:
+    a relative change of at least VOLATILE halves the period, a change of at most FLAT
+    lengthens it by BACKOFF; the period stays within the spec's rate-min and rate-max.
+    """
+
+    VOLATILE = 0.10
+    FLAT = 0.02
+    BACKOFF = 1.5
+
+    def __init__(self, spec):
+        assert spec.is_adaptive
+        (self.shortest, self.longest) = (spec.rate_min * 1000, spec.rate_max * 1000)
+        self.period = spec.rate * 1000
+
+        # last sample, and its calculated value
+        self.last = None
+        self.last_value = None
+
+    def update(self, sample):
+        """ adapts the period to given (next) sample; @returns the new period """
+        (last, self.last) = (self.last, sample)
+        if last is None or last.time >= sample.time:
+            return self.period
+
+        (previous, value) = (self.last_value, last.calculate(sample))
+        self.last_value = value
+        if previous is None:
+            return self.period
+
+        scale = max(abs(previous), abs(value))
+        change = 0 == scale and 0.0 or abs(value - previous) / scale
+        if change >= AdaptiveRate.VOLATILE:
+            self.period = max(self.shortest, self.period // 2)
+        elif change <= AdaptiveRate.FLAT:
+            self.period = min(self.longest, int(self.period * AdaptiveRate.BACKOFF))
+        return self.period
@@ -0,0 +1,141 @@
+from math import ceil, log
+
+try:
+    import numpy
+except ImportError:  # optional; only used to bucket many values at once
+    numpy = None
+
+__all__ = [
+    'DDSketch',
+]
+
+
+class DDSketch(object):
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch, Masson et al.).
+
+    Values are counted in logarithmically sized buckets: bucket k holds values in
+    (gamma^(k-1), gamma^k], where gamma = (1 + alpha) / (1 - alpha). Any quantile is then
+    estimated within a relative error of alpha, and two sketches (with the same alpha)
+    merge by adding bucket counts--so partial sketches can be shipped up the topology and
+    merged without the raw samples. Negative values are kept in a mirrored set of buckets.
+
+    The sketch encodes to a compact string for use as a message property:
+        alpha '|' zero-count '|' k:count,... '|' k:count,...  (positive, negative buckets)
+    """
+
+    ALPHA = 0.01
+
+    def __init__(self, alpha=None):
+        self.alpha = alpha or DDSketch.ALPHA
+        self.gamma = (1 + self.alpha) / (1 - self.alpha)
+        self.__log_gamma = log(self.gamma)
+
+        self.zero = 0
+        self.positive = {}  # { bucket : count }
+        self.negative = {}  # { bucket : count }
+
+    def __eq__(self, other):
+        return (isinstance(other, DDSketch) and
+                (self.alpha, self.zero, self.positive, self.negative) ==
+                (other.alpha, other.zero, other.positive, other.negative))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __str__(self):
+        return 'DDSketch(alpha=%s, count=%d)' % (self.alpha, self.count)
+
+    @property
+    def count(self):
+        return self.zero + sum(self.positive.values()) + sum(self.negative.values())
+
+    def __bucket(self, magnitude):
+        return int(ceil(log(magnitude) / self.__log_gamma))
+
+    def __value(self, bucket):
+        """ representative value of given bucket, within alpha of all values in it """
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        if value > 0:
+            k = self.__bucket(value)
+            self.positive[k] = self.positive.get(k, 0) + count
+        elif value < 0:
+            k = self.__bucket(-value)
+            self.negative[k] = self.negative.get(k, 0) + count
+        else:
+            self.zero += count
+
+    def add_all(self, values):
+        """ adds all given values (list or numpy array) """
+        if numpy is None or len(values) < 64:
+            for v in values:
+                self.add(v)
+            return
+
+        values = numpy.asarray(values, dtype=float)
+        self.zero += int(numpy.count_nonzero(values == 0))
+        for (store, magnitudes) in ((self.positive, values[values > 0]),
+                                    (self.negative, -values[values < 0])):
+            if len(magnitudes) == 0:
+                continue
+            buckets = numpy.ceil(numpy.log(magnitudes) / self.__log_gamma).astype(int)
+            (keys, counts) = numpy.unique(buckets, return_counts=True)
+            for (k, c) in zip(keys.tolist(), counts.tolist()):
+                store[k] = store.get(k, 0) + c
+
+    def merge(self, other):
+        """ adds given sketch's counts to this sketch """
+        if other.alpha != self.alpha:
+            raise ValueError('cannot merge sketches with different accuracy: %s != %s' %
+                             (self.alpha, other.alpha))
+        self.zero += other.zero
+        for (store, given) in ((self.positive, other.positive),
+                               (self.negative, other.negative)):
+            for (k, c) in given.items():
+                store[k] = store.get(k, 0) + c
+
+    def buckets(self):
+        """ returns list of (value, count) for all non-empty buckets, in value order """
+        result = [(-self.__value(k), self.negative[k])
+                  for k in sorted(self.negative, reverse=True)]
+        if self.zero > 0:
+            result.append((0.0, self.zero))
+        result += [(self.__value(k), self.positive[k]) for k in sorted(self.positive)]
+        return result
+
+    def quantile(self, q):
+        """ returns estimate of given quantile (0 <= q <= 1), or None if empty """
+        assert 0 <= q <= 1
+        count = self.count
+        if count == 0:
+            return None
+
+        rank = q * (count - 1)
+        seen = 0
+        for (value, c) in self.buckets():
+            seen += c
+            if seen > rank:
+                return value
+        return value
+
+    def encode(self):
+        stores = [','.join('%d:%d' % kc for kc in sorted(s.items()))
+                  for s in (self.positive, self.negative)]
+        return '%r|%d|%s|%s' % (self.alpha, self.zero, stores[0], stores[1])
+
+    @classmethod
+    def decode(cls, given):
+        try:
+            (alpha, zero, positive, negative) = given.split('|')
+            sketch = cls(float(alpha))
+            sketch.zero = int(zero)
+            for (store, encoded) in ((sketch.positive, positive),
+                                     (sketch.negative, negative)):
+                for kc in filter(None, encoded.split(',')):
+                    (k, c) = kc.split(':')
+                    store[int(k)] = int(c)
+        except ValueError:
+            raise ValueError('invalid sketch: %r' % given)
+        return sketch
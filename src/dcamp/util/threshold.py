@@ -0,0 +1,198 @@
+import re
+
+__all__ = [
+    'compile_expr',
+]
+
+# Threshold expressions (see ThreshSpec, "?" operation):
+#
+#     expr      = term *( "or" term )
+#     term      = factor *( "and" factor )
+#     factor    = "(" expr ")" / condition
+#     condition = [ "rate" ] ( "<" / ">" ) number [ "~" number ] [ "for" integer ]
+#
+# A condition compares the calculated value (or with "rate", its change per second since
+# the previous sample) against a limit. With "~", the condition has a hysteresis band: it
+# becomes true at the first limit and stays true until the value crosses back over the
+# second one. With "for", the condition must be true for given number of samples in a row.
+#
+# Examples:
+#
+#     > 90 ~ 80               -- above 90, until below 80 again
+#     > 90 for 3 or rate > 5  -- above 90 for 3 samples, or rising by more than 5/sec
+#
+# Expressions are compiled into a closure per condition, keeping the condition's state;
+# all conditions are evaluated for every sample (no short-circuit) to keep state current.
+
+_TOKENS = re.compile(r'\s*(?:(?P<num>-?(?:\d+\.?\d*|\.\d+))|'
+                     r'(?P<sym>[<>~()])|'
+                     r'(?P<word>[a-z]+))')
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKENS.match(text, pos)
+        if match is None:
+            raise ValueError('invalid threshold expression at "%s"' % text[pos:].strip())
+        tokens.append(match.group(match.lastgroup))
+        pos = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """ recursive-descent parser of threshold expressions, returning compiled closures """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.pos < len(self.tokens) and self.tokens[self.pos] or None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise ValueError('expected %s in threshold expression, found %s' % (
+                expected or 'more', token or 'end'))
+        self.pos += 1
+        return token
+
+    def number(self):
+        token = self.take()
+        try:
+            return float(token)
+        except ValueError:
+            raise ValueError('expected number in threshold expression, found %s' % token)
+
+    def parse(self):
+        result = self.expr()
+        if self.peek() is not None:
+            raise ValueError('unexpected %s in threshold expression' % self.peek())
+        return result
+
+    def expr(self):
+        terms = [self.term()]
+        while self.peek() == 'or':
+            self.take()
+            terms.append(self.term())
+        return _any(terms)
+
+    def term(self):
+        factors = [self.factor()]
+        while self.peek() == 'and':
+            self.take()
+            factors.append(self.factor())
+        return _all(factors)
+
+    def factor(self):
+        if self.peek() == '(':
+            self.take()
+            result = self.expr()
+            self.take(')')
+            return result
+        return self.condition()
+
+    def condition(self):
+        rate = False
+        if self.peek() == 'rate':
+            self.take()
+            rate = True
+
+        op = self.take()
+        if op not in ['<', '>']:
+            raise ValueError('expected < or > in threshold expression, found %s' % op)
+        enter = self.number()
+
+        leave = enter
+        if self.peek() == '~':
+            self.take()
+            leave = self.number()
+            if ('>' == op and leave > enter) or ('<' == op and leave < enter):
+                raise ValueError('hysteresis limit %g must be inside of %s%g'
+                                 % (leave, op, enter))
+
+        count = 1
+        if self.peek() == 'for':
+            self.take()
+            count = self.number()
+            if count < 1 or count != int(count):
+                raise ValueError('sample count must be a positive integer: %g' % count)
+
+        result = _limit(op, enter, leave)
+        if rate:
+            result = _rate(result)
+        if count > 1:
+            result = _sustained(result, int(count))
+        return result
+
+
+def _limit(op, enter, leave):
+    state = [False]  # condition is entered
+
+    # all conditions are called with (value, time); limits only look at the value
+    if '>' == op:
+        def check(value, _time):
+            state[0] = value >= (leave if state[0] else enter)
+            return state[0]
+    else:
+        def check(value, _time):
+            state[0] = value <= (leave if state[0] else enter)
+            return state[0]
+
+    return check
+
+
+def _rate(condition):
+    previous = [None, None]  # value, time
+
+    def check(value, time):
+        (last_value, last_time) = previous
+        previous[:] = [value, time]
+        if last_time is None or time <= last_time:
+            return False
+        return condition((value - last_value) * 1e3 / (time - last_time), time)
+
+    return check
+
+
+def _sustained(condition, count):
+    streak = [0]
+
+    def check(value, time):
+        streak[0] = streak[0] + 1 if condition(value, time) else 0
+        return streak[0] >= count
+
+    return check
+
+
+def _any(conditions):
+    if len(conditions) == 1:
+        return conditions[0]
+
+    def check(value, time):
+        return any([c(value, time) for c in conditions])
+
+    return check
+
+
+def _all(conditions):
+    if len(conditions) == 1:
+        return conditions[0]
+
+    def check(value, time):
+        return all([c(value, time) for c in conditions])
+
+    return check
+
+
+def compile_expr(text):
+    """
+    Compiles given threshold expression; raises ValueError if invalid.
+
+    @returns function(value, time) returning whether the condition holds for given value
+             (calculated at given time, in msecs); the function keeps state between calls
+    """
+    return _Parser(text).parse()
@@ -0,0 +1,71 @@
+import logging
+
+from zmq import Socket  # pylint: disable-msg=E0611
+
+__all__ = [
+    'MsgTracer',
+    'TracedSocket',
+]
+
+
+class MsgTracer(object):
+    """
+    Sampled, level-checked tracing of sent and received messages for one service.
+
+    A tracer is bound to a socket (see TracedSocket) when the socket is created, so
+    messages are traced with their service's logger without inspecting the call stack.
+    Nothing is formatted unless the logger is enabled for DEBUG; even then, only one of
+    every N messages of each type is traced, where N is the message class's trace_every
+    (overridable per message type via the every dict). The number of messages seen so
+    far is included in sampled trace lines. Verbose tracers also log the contents of
+    traced messages.
+
+    Tracers without their own every dict or verbose flag use the process-wide EVERY and
+    VERBOSE, set by the command line (see dcamp.cli).
+    """
+
+    EVERY = {}  # { message-name : N }
+    VERBOSE = False
+
+    def __init__(self, logger, every=None, verbose=None):
+        self.logger = logger
+        self.every = every  # { message-name : N }, or None
+        self.verbose = verbose
+
+        # { message-name : count }
+        self.__counts = {}
+
+    def trace(self, direction, msg):
+        """ traces given message; direction is 'S' (sent) or 'R' (received) """
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        name = msg.name
+        count = self.__counts.get(name, 0) + 1
+        self.__counts[name] = count
+
+        every = (MsgTracer.EVERY if self.every is None else self.every).get(
+            name, msg.trace_every)
+        if (count - 1) % every != 0:
+            return
+
+        if every == 1:
+            self.logger.debug('%s:%s', direction, name)
+        else:
+            self.logger.debug('%s:%s (%d)', direction, name, count)
+
+        verbose = MsgTracer.VERBOSE if self.verbose is None else self.verbose
+        if verbose:
+            for part in str(msg).split('\n'):
+                self.logger.debug('  %s', part)
+
+
+class TracedSocket(Socket):
+    """ 0MQ socket carrying the MsgTracer used by DCMsg.send() and DCMsg.recv() """
+
+    # declared on the class so pyzmq does not treat it as a socket option
+    tracer = None
+
+    # implemented by pyzmq's compiled backend, which pylint cannot see (W0223)
+    get = Socket.get
+    set = Socket.set
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main
+
+from dcamp.types.admission import AdmissionIndex, parse_filter
+from dcamp.types.specs import EndpntSpec, FilterSpec
+
+
+def ep(host, port=9000):
+    return EndpntSpec(host, port)
+
+
+class TestParseFilter(TestCase):
+    def test_kinds(self):
+        (kind, net) = parse_filter('192.168.1.0/24')
+        self.assertEqual('net', kind)
+        self.assertEqual(24, net.prefixlen)
+        self.assertEqual(32, parse_filter('10.0.0.1')[1].prefixlen)
+        self.assertEqual(64, parse_filter('fe80::/64')[1].prefixlen)
+
+        self.assertEqual(('suffix', '.example.com'), parse_filter('.example.com'))
+        self.assertEqual(('suffix', '.example.com'), parse_filter('*.Example.com'))
+        self.assertEqual(('host', 'node-1.example.com'),
+                         parse_filter('node-1.example.com'))
+
+    def test_invalid(self):
+        for match in ['', '.', 'a..b', 'a.b.', '*', 'a b', 'host:9000',
+                      '192.168.1.0/33x']:
+            self.assertRaises(ValueError, parse_filter, match)
+
+
+class TestAdmissionIndex(TestCase):
+    def setUp(self):
+        self.index = AdmissionIndex({
+            'group1': ([ep('localhost', 9010), ep('localhost', 9020)], []),
+            'group2': ([ep('192.168.1.5'), ep('192.168.2.5'), ep('node.netapp.com'),
+                        ep('node.example.com'), ep('other.example.com')], [
+                FilterSpec('+', '192.168.1.5'),
+                FilterSpec('-', '192.168.1.0/24'),
+                FilterSpec('-', 'other.example.com'),
+                FilterSpec('+', '.example.com'),
+                FilterSpec('-', '.com'),
+            ]),
+        })
+
+    def test_endpoints(self):
+        self.assertEqual(7, len(self.index))
+        self.assertEqual(('group1', None, True), self.index.lookup(ep('localhost', 9010)))
+        self.assertEqual('group1', self.index.admit(ep('localhost', 9020)))
+
+        # unknown endpoints
+        self.assertEqual((None, None, False), self.index.lookup(ep('localhost', 9030)))
+        self.assertIsNone(self.index.admit(ep('192.168.1.6')))
+
+    def test_networks(self):
+        # first matching filter wins
+        self.assertEqual(('group2', FilterSpec('+', '192.168.1.5'), True),
+                         self.index.lookup(ep('192.168.1.5')))
+        self.assertEqual('group2', self.index.admit(ep('192.168.1.5')))
+
+        # no filter matches
+        self.assertEqual(('group2', None, True), self.index.lookup(ep('192.168.2.5')))
+        self.assertEqual('group2', self.index.admit(ep('192.168.2.5')))
+
+    def test_names(self):
+        self.assertEqual(('group2', FilterSpec('-', '.com'), False),
+                         self.index.lookup(ep('node.netapp.com')))
+        self.assertIsNone(self.index.admit(ep('node.netapp.com')))
+
+        self.assertEqual(('group2', FilterSpec('+', '.example.com'), True),
+                         self.index.lookup(ep('node.example.com')))
+        self.assertEqual('group2', self.index.admit(ep('node.example.com')))
+
+        self.assertEqual(('group2', FilterSpec('-', 'other.example.com'), False),
+                         self.index.lookup(ep('other.example.com')))
+        self.assertIsNone(self.index.admit(ep('other.example.com')))
+
+    def test_excluded_network(self):
+        index = AdmissionIndex({
+            'group1': ([ep('192.168.1.%d' % i) for i in range(1, 255)],
+                       [FilterSpec('-', '192.168.1.128/25')]),
+        })
+        admitted = [e for e in [ep('192.168.1.%d' % i) for i in range(1, 255)]
+                    if index.admit(e) is not None]
+        self.assertEqual(127, len(admitted))
+        self.assertEqual(ep('192.168.1.127'), admitted[-1])
+
+
+if __name__ == '__main__':
+    main()
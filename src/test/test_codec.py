@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import pickle
+from datetime import datetime
+from random import Random
+from unittest import TestCase, main
+
+from dcamp.types import codec
+from dcamp.types.messages.common import DCMsg
+from dcamp.types.messages.topology import gen_uuid
+from dcamp.types.specs import EndpntSpec, FilterSpec, MetricSpec, ReduceSpec, ThreshSpec
+from dcamp.types.topo import TopoNode
+
+
+class TestCodec(TestCase):
+    def setUp(self):
+        self.metrics = [
+            MetricSpec('cpu', 60, ThreshSpec('>', 90.0), 'CPU', None, None),
+            MetricSpec('mem', 30, ThreshSpec('*', 120), 'MEMORY', 'x', None),
+            MetricSpec('disk', 5, None, 'DISK', None, 'p99'),
+            MetricSpec('net', 5, None, 'NETWORK', None, None,
+                       ReduceSpec('deadband', 5.0, True, 60)),
+            MetricSpec('proc', 10, None, 'PROC_CPU', 'x', None, None, 1, 60),
+        ]
+        self.values = [
+            None, True, False, 0, -1, 60, 2 ** 63 - 1, -2 ** 63, 2 ** 100, -2 ** 70, 0.5,
+            float('inf'), '', 'partial', 'ünïcode', b'\x00bytes', [], (), {},
+            [EndpntSpec('localhost', 9000), EndpntSpec('10.0.0.1', 9010)],
+            [FilterSpec('+', '*.example.com')],
+            self.metrics,
+            {'a': [1, (2, 3)], 4: None},
+            gen_uuid(),
+            datetime(2013, 11, 13, 5, 49, 2, 123456),
+        ]
+
+    def test_roundtrip(self):
+        for v in self.values:
+            encoded = codec.encode(v)
+            self.assertFalse(codec.is_pickle(encoded))
+            decoded = codec.decode(encoded)
+            self.assertEqual(v, decoded)
+            self.assertEqual(type(v), type(decoded))
+
+            # same as the pickle path
+            self.assertEqual(pickle.loads(pickle.dumps(v)), decoded)
+
+        # types are kept, not just equality
+        spec = MetricSpec('a', 60, None, 'b', None, None)
+        self.assertIs(int, type(codec.decode(codec.encode(spec)).rate))
+
+    def test_topo_node(self):
+        root = TopoNode(EndpntSpec('localhost', 9000), gen_uuid(), 'root', None)
+        leaf = TopoNode(EndpntSpec('localhost', 9010), gen_uuid(), 'leaf', 'group1')
+        leaf.touch()
+        leaf.parent = root
+        root.add_child(leaf)
+
+        for node in (root, leaf):
+            decoded = codec.decode(codec.encode(node))
+            fields = ('endpoint', 'uuid', 'level', 'group', 'last_seen')
+            self.assertEqual([getattr(node, f) for f in fields],
+                             [getattr(decoded, f) for f in fields])
+            # parent and children are not replicated
+            self.assertEqual((None, {}), (decoded.parent, decoded.children))
+
+    def test_blob(self):
+        # messages fall back to pickle for unsupported types, and decode legacy pickles
+        for v in ({1, 2}, self.metrics, [datetime.now()]):
+            self.assertEqual(v, DCMsg._decode_blob(pickle.dumps(v)))
+        self.assertTrue(codec.is_pickle(DCMsg._encode_blob({1, 2})))
+        self.assertEqual({1, 2}, DCMsg._decode_blob(DCMsg._encode_blob({1, 2})))
+        self.assertRaises(codec.CodecError, codec.encode, [{1, 2}])
+
+    def test_invalid(self):
+        self.assertRaises(codec.CodecError, codec.decode, b'')
+        self.assertRaises(codec.CodecError, codec.decode, b'\x09N')  # unknown version
+        self.assertRaises(codec.CodecError, codec.decode, codec.encode('abc') + b'N')
+        self.assertRaises(codec.CodecError, codec.decode, codec.encode('abc')[:-1])
+        self.assertRaises(codec.CodecError, codec.decode,
+                          bytes([codec.VERSION]) + b'l\xff\xff\xff\xff')
+
+    def test_old_record(self):
+        # metric spec as encoded before rate_min and rate_max were added
+        spec = MetricSpec('cpu', 60, ThreshSpec('>', 90.0), 'CPU', None, None)
+        record = b'm' + b''.join(codec.encode(v)[1:] for v in spec[:7])
+        self.assertRaises(codec.CodecError, codec.decode, bytes([2]) + record)
+
+        # ...and not mistaken for the current layout
+        self.assertRaises(codec.CodecError, codec.decode, bytes([codec.VERSION]) + record)
+        self.assertEqual(spec, codec.decode(bytes([codec.VERSION]) + b'm' + b''.join(
+            codec.encode(v)[1:] for v in spec)))
+
+    def test_fuzz(self):
+        # truncated and corrupted values either decode or raise CodecError
+        rand = Random(42)
+        for v in self.values:
+            encoded = codec.encode(v)
+            for i in range(1, len(encoded)):
+                self.assertRaises(codec.CodecError, codec.decode, encoded[:i])
+
+            for _ in range(50):
+                corrupt = bytearray(encoded)
+                for _ in range(rand.randint(1, 3)):
+                    corrupt[rand.randrange(1, len(corrupt))] = rand.randrange(256)
+                try:
+                    codec.decode(bytes(corrupt))
+                except codec.CodecError:
+                    pass
+
+        for _ in range(500):
+            garbage = bytes([codec.VERSION] + [rand.randrange(256)
+                                               for _ in range(rand.randint(0, 40))])
+            try:
+                codec.decode(garbage)
+            except codec.CodecError:
+                pass
+
+
+if __name__ == '__main__':
+    main()
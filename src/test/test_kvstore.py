@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main
+
+from dcamp.types.kvstore import KVStore
+
+
+class TestKVStore(TestCase):
+    def setUp(self):
+        self.store = KVStore()
+        for (i, k) in enumerate(['/TOPO/root', '/CONFIG/b/endpoints',
+                                 '/CONFIG/a/endpoints', '/CONFIG/a/metrics',
+                                 '/CONFIG/global/heartbeat', '/CONFIGURE']):
+            self.store[k] = ('v%d' % i, i)
+
+    def test_dict(self):
+        s = self.store
+        self.assertEqual(6, len(s))
+        self.assertEqual(('v0', 0), s['/TOPO/root'])
+        self.assertEqual(sorted(s.copy()), list(s))
+        self.assertIsNone(s.get('/missing'))
+
+        s['/TOPO/root'] = ('new', 9)
+        self.assertEqual(6, len(s))
+        del s['/CONFIG/a/metrics']
+        self.assertNotIn('/CONFIG/a/metrics', s)
+        self.assertEqual(sorted(s.copy()), list(s))
+        self.assertRaises(KeyError, s.__delitem__, '/CONFIG/a/metrics')
+
+    def test_prefix(self):
+        s = self.store
+        self.assertEqual(['/CONFIG/a/endpoints', '/CONFIG/a/metrics',
+                          '/CONFIG/b/endpoints', '/CONFIG/global/heartbeat'],
+                         s.keys('/CONFIG/'))
+        self.assertEqual([('/CONFIG/a/endpoints', ('v2', 2)),
+                          ('/CONFIG/a/metrics', ('v3', 3))],
+                         s.items('/CONFIG/a/'))
+        self.assertEqual([], s.keys('/CONFIG/c/'))
+        self.assertEqual(list(s), s.keys())
+
+    def test_view(self):
+        calls = []
+
+        def groups(store):
+            calls.append(1)
+            return frozenset(k.split('/')[2] for k in store.keys('/CONFIG/')
+                             if k.endswith('/endpoints'))
+
+        s = self.store
+        s.add_view('groups', '/CONFIG/', groups)
+        self.assertEqual({'a', 'b'}, s.view('groups'))
+        self.assertEqual({'a', 'b'}, s.view('groups'))
+        self.assertEqual(1, len(calls))
+
+        # writes outside the prefix keep the cached view
+        s['/TOPO/root'] = ('new', 10)
+        s['/CONFIGURE'] = ('new', 11)
+        self.assertEqual({'a', 'b'}, s.view('groups'))
+        self.assertEqual(1, len(calls))
+
+        s['/CONFIG/c/endpoints'] = ('v', 12)
+        self.assertEqual({'a', 'b', 'c'}, s.view('groups'))
+        del s['/CONFIG/a/endpoints']
+        self.assertEqual({'b', 'c'}, s.view('groups'))
+        self.assertEqual(3, len(calls))
+
+    def test_freeze(self):
+        s = self.store
+        s.add_view('count', '/CONFIG/', lambda store: len(store.keys('/CONFIG/')))
+        snap = s.freeze()
+        self.assertEqual(s.version, snap.version)
+        self.assertEqual(4, snap.view('count'))
+
+        # writes after freezing do not change the snapshot
+        s['/CONFIG/c/endpoints'] = ('v', 12)
+        del s['/CONFIG/a/metrics']
+        s['/TOPO/root'] = ('new', 13)
+        self.assertEqual(('v0', 0), snap['/TOPO/root'])
+        self.assertIn('/CONFIG/a/metrics', snap)
+        self.assertNotIn('/CONFIG/c/endpoints', snap)
+        self.assertEqual(['/CONFIG/a/endpoints', '/CONFIG/a/metrics',
+                          '/CONFIG/b/endpoints', '/CONFIG/global/heartbeat'],
+                         snap.keys('/CONFIG/'))
+        self.assertEqual(4, snap.view('count'))
+        self.assertLess(snap.version, s.version)
+
+        snap2 = s.freeze()
+        self.assertEqual(('new', 13), snap2['/TOPO/root'])
+        self.assertEqual(4, snap2.view('count'))
+        self.assertEqual(sorted(snap2.copy()), list(snap2))
+        self.assertEqual(6, len(snap))
+        self.assertEqual(6, len(snap2))
+
+    def test_shared(self):
+        s = self.store
+        for i in range(1000):
+            s['/TOPO/node%d' % i] = ('v', i)
+        snap = s.freeze()
+
+        # updating a key copies its shard only, and not the sorted keys
+        s['/TOPO/node1'] = ('new', 1001)
+        self.assertEqual(('v', 1), snap['/TOPO/node1'])
+        self.assertEqual(('new', 1001), s['/TOPO/node1'])
+        self.assertIs(snap._keys, s._keys)
+        self.assertEqual(1, sum(a is not b for (a, b) in zip(snap._shards, s._shards)))
+
+        s['/TOPO/node2'] = ('new', 1002)
+        s['/TOPO/zzz'] = ('v', 1003)
+        self.assertIsNot(snap._keys, s._keys)
+        self.assertNotIn('/TOPO/zzz', snap)
+        self.assertEqual(1006, len(snap))
+        self.assertEqual(1007, len(s))
+        self.assertEqual(sorted(s.copy()), list(s))
+
+
+if __name__ == '__main__':
+    main()
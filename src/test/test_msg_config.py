@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+from datetime import datetime
+from unittest import TestCase, main
+
+from dcamp.types.messages.configuration import (CONFIG, ICANHAZ, KTHXBAI, KVBATCH,
+                                               KVPUBBATCH, MOAR, TOUCH)
+from dcamp.types.specs import EndpntSpec
+
+
+class TestKVBATCH(TestCase):
+    def setUp(self):
+        self.pid = b'\x00peer'
+        self.items = [('/CONFIG/global/heartbeat', 60, 3),
+                      ('/CONFIG/group1/endpoints', [EndpntSpec('localhost', 9000)], 7),
+                      ('/CONFIG/group1/deleted', None, 5)]
+
+    def test_roundtrip(self):
+        batch = KVBATCH(self.pid, '/CONFIG/', self.items)
+        self.assertEqual(3, len(batch))
+        self.assertEqual(7, batch.sequence)
+
+        msg = CONFIG.from_msg(list(batch.frames), self.pid)
+        self.assertIsInstance(msg, KVBATCH)
+        self.assertEqual('/CONFIG/', msg.subtree)
+        self.assertEqual(self.items, msg.items)
+        self.assertEqual(self.pid, msg.peer_id)
+
+    def test_bounded(self):
+        value = 'x' * (KVBATCH.MAX_BYTES // 3)
+        batch = KVBATCH(self.pid, '/')
+        self.assertTrue(batch.add('/a', value, 1))
+        self.assertTrue(batch.add('/b', value, 2))
+        self.assertFalse(batch.add('/c', value, 3))
+        self.assertEqual(2, len(batch))
+        self.assertLessEqual(len(batch.frames[4]), KVBATCH.MAX_BYTES)
+
+        # oversized pair is sent alone
+        batch = KVBATCH(self.pid, '/')
+        self.assertTrue(batch.add('/big', 'x' * KVBATCH.MAX_BYTES, 1))
+        self.assertFalse(batch.add('/a', 1, 2))
+
+    def test_truncated(self):
+        frames = list(KVBATCH(self.pid, '/', self.items).frames)
+        frames[4] = frames[4][:-3]
+        self.assertRaises(ValueError, CONFIG.from_msg, frames, self.pid)
+
+    def test_credit(self):
+        msg = CONFIG.from_msg(list(ICANHAZ('/', 4).frames), self.pid)
+        self.assertEqual(('/', 4), (msg.value, msg.credit))
+        self.assertIsNone(CONFIG.from_msg(list(ICANHAZ('/').frames), self.pid).credit)
+
+        msg = CONFIG.from_msg(list(ICANHAZ('/', 4, 0).frames), self.pid)
+        self.assertEqual((4, 0), (msg.credit, msg.since))
+        self.assertIsNone(CONFIG.from_msg(list(ICANHAZ('/', 4).frames), self.pid).since)
+
+        msg = CONFIG.from_msg(list(MOAR('/TOPO').frames), self.pid)
+        self.assertIsInstance(msg, MOAR)
+        self.assertEqual(('/TOPO', 1), (msg.value, msg.credit))
+
+    def test_delta(self):
+        msg = CONFIG.from_msg(list(KTHXBAI(12, self.pid, '/', True).frames), self.pid)
+        self.assertEqual(('/', 12, True), (msg.value, msg.sequence, msg.delta))
+        msg = CONFIG.from_msg(list(KTHXBAI(12, self.pid, '/').frames), self.pid)
+        self.assertFalse(msg.delta)
+
+
+class TestKVPUBBATCH(TestCase):
+    def test_topic(self):
+        self.assertEqual('/TOPO/root', KVPUBBATCH.topic('/TOPO/root'))
+        self.assertEqual('/CONFIG/global/', KVPUBBATCH.topic('/CONFIG/global/heartbeat'))
+        self.assertEqual('/TOPO/group1/',
+                         KVPUBBATCH.topic('/TOPO/group1/leaves/localhost:9000'))
+
+    def test_roundtrip(self):
+        items = [('/CONFIG/group1/endpoints', [EndpntSpec('localhost', 9000)], 7),
+                 ('/CONFIG/group1/deleted', None, 8)]
+        batch = KVPUBBATCH('/CONFIG/group1/', items)
+        # key is the subscription topic
+        self.assertEqual('/CONFIG/group1/KVPUB', batch.key)
+        self.assertEqual('/TOPO/root/KVPUB', KVPUBBATCH('/TOPO/root').key)
+
+        msg = CONFIG.from_msg(list(batch.frames), None)
+        self.assertIsInstance(msg, KVPUBBATCH)
+        self.assertEqual(('/CONFIG/group1/', items, 8),
+                         (msg.subtree, msg.items, msg.sequence))
+
+    def test_touch(self):
+        touched = {'/TOPO/group1/leaves/localhost:9000': datetime(2013, 11, 13, 5, 49, 2)}
+        msg = CONFIG.from_msg(list(TOUCH(touched).frames), None)
+        self.assertIsInstance(msg, TOUCH)
+        self.assertEqual(touched, msg.value)
+        # leaves only subscribe to /TOPO/root and /CONFIG/<group>/ topics
+        self.assertFalse(msg.key.startswith('/TOPO/root') or
+                         msg.key.startswith('/CONFIG/'))
+
+
+if __name__ == '__main__':
+    main()
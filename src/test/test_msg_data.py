@@ -3,8 +3,10 @@ from logging import getLogger
 
 from unittest import TestCase, main
 
+import dcamp.types.messages.data as data
 from dcamp.types.specs import EndpntSpec
 from dcamp.types.messages.data import *
+from dcamp.util.functions import now_msecs
 
 
 class TestHugz(TestCase):
@@ -46,6 +48,143 @@ class TestData(TestCase):
         self.assertEqual(self.d1, Data.from_msg(self.d1.frames, None))
 
 
+class TestDataBatch(TestCase):
+    def setUp(self):
+        self.time = 1384321742000
+        self.props = {
+            'type': 'rate',
+            'detail': 'test-batch-data',
+            'config-name': 'rate-b1',
+            'config-seqid': 0,
+        }
+        self.samples = [
+            DataRate(EndpntSpec('local', 9090), dict(self.props),
+                     time=self.time + (i * 1000), value=100 * i)
+            for i in range(3)
+        ]
+
+    def test_marshal(self):
+        b = DataBatch.from_samples(self.samples)
+        self.assertEqual(3, len(b))
+
+        msg = Data.from_msg(b.frames, None)
+        self.assertTrue(msg.is_batch)
+        self.assertEqual(b, msg)
+        self.assertEqual(self.samples, msg.samples)
+        self.assertIsNone(msg.samples[0].base_value)
+
+    def test_batch(self):
+        other = DataBasic(EndpntSpec('local', 9091), {
+            'type': 'basic',
+            'detail': 'test-batch-data',
+            'config-name': 'basic-b2',
+            'config-seqid': 0,
+        }, time=self.time, value=1)
+
+        msgs = batch(self.samples[:2] + [other] + self.samples[2:])
+        self.assertEqual(2, len(msgs))
+        self.assertTrue(msgs[0].is_batch)
+        self.assertEqual(self.samples, msgs[0].samples)
+        self.assertFalse(msgs[1].is_batch)
+        self.assertEqual([other], msgs[1].samples)
+
+
+class TestPropSchemas(TestCase):
+    class Socket(object):
+        """ stand-in for a zmq socket; schemas are tracked per (weak-ref'd) socket """
+        pass
+
+    def setUp(self):
+        self.schemas = PropSchemas()
+        self.source = EndpntSpec('local', 9090)
+        self.props = {
+            'type': 'percent',
+            'detail': 'PROC_CPU',
+            'config-name': 'pcpu',
+            'config-seqid': 3,
+            'p-count': 2,
+        }
+
+    def test_announce_then_reference(self):
+        (tx, rx) = (self.Socket(), self.Socket())
+
+        announce = self.schemas.encode(tx, self.props)
+        self.assertEqual(b'=', announce[:1])
+        self.assertEqual(self.props, self.schemas.decode(rx, announce))
+
+        ref = self.schemas.encode(tx, self.props)
+        self.assertEqual(b'@', ref[:1])
+        self.assertLess(len(ref), len(announce))
+        self.assertEqual(self.props, self.schemas.decode(rx, ref))
+
+        # dynamic properties are still sent with the reference
+        self.props['p-count'] = 5
+        self.assertEqual(self.props,
+                         self.schemas.decode(rx, self.schemas.encode(tx, self.props)))
+
+    def test_per_socket(self):
+        (tx, rx) = (self.Socket(), self.Socket())
+        self.schemas.encode(tx, self.props)
+
+        # announced on tx already, but never received on rx
+        ref = self.schemas.encode(tx, self.props)
+        self.assertRaises(ValueError, self.schemas.decode, rx, ref)
+
+        # other sockets get their own announcement
+        self.assertEqual(b'=', self.schemas.encode(self.Socket(), self.props)[:1])
+
+    def test_reannounce(self):
+        tx = self.Socket()
+        self.schemas.encode(tx, self.props)
+        self.assertEqual(b'@', self.schemas.encode(tx, self.props)[:1])
+
+        # e.g. the subscriber rejoined; announced on the next send, not after the back-off
+        self.schemas.reannounce(tx)
+        self.assertEqual(b'=', self.schemas.encode(tx, self.props)[:1])
+        self.assertEqual(b'@', self.schemas.encode(tx, self.props)[:1])
+
+    def test_other_sender(self):
+        (tx, rx) = (self.Socket(), self.Socket())
+        self.schemas.decode(rx, self.schemas.encode(tx, self.props))
+
+        # same schema id from another (or a restarted) sender is not mistaken for ours
+        other = PropSchemas()
+        other.encode(tx, {'type': 'HUGZ'})
+        ref = other.encode(tx, {'type': 'HUGZ'})
+        self.assertRaises(ValueError, self.schemas.decode, rx, ref)
+
+    def test_forget_old_config(self):
+        (tx, rx) = (self.Socket(), self.Socket())
+        self.schemas.decode(rx, self.schemas.encode(tx, self.props))
+        old_ref = self.schemas.encode(tx, self.props)
+
+        # newer config-seqid; the old schema gets a new id (and announcement) if reused
+        newer = dict(self.props, **{'config-seqid': 4})
+        self.assertEqual(newer, self.schemas.decode(rx, self.schemas.encode(tx, newer)))
+        self.assertRaises(ValueError, self.schemas.decode, rx, old_ref)
+        self.assertEqual(b'=', self.schemas.encode(tx, self.props)[:1])
+
+    def test_forget_sender(self):
+        (tx, rx) = (self.Socket(), self.Socket())
+        self.schemas.decode(rx, self.schemas.encode(tx, self.props))
+        ref = self.schemas.encode(tx, self.props)
+
+        # another sender announcing after FORGET_MS; the silent sender is forgotten
+        other = PropSchemas()
+        data.now_msecs = lambda: now_msecs() + PropSchemas.FORGET_MS + 1
+        try:
+            self.schemas.decode(rx, other.encode(self.Socket(), {'type': 'HUGZ'}))
+        finally:
+            data.now_msecs = now_msecs
+        self.assertRaises(ValueError, self.schemas.decode, rx, ref)
+
+    def test_plain(self):
+        d = DataPercent(self.source, self.props, time=1384321742000, value=1,
+                        base_value=2)
+        self.assertEqual(d, Data.from_msg(d.frames, None))
+        self.assertEqual(self.props, self.schemas.decode(None, d.frames[1]))
+
+
 class TestAggregateData(TestCase):
     logger = getLogger('dcamp.test.messages.data')
 
@@ -144,6 +283,9 @@ class TestAggregateData(TestCase):
                 'samples-type': 'average',
                 'node-cnt': 3,
                 'aggr-source': EndpntSpec('local', 9096),
+                'p-sum': 221.0,
+                'p-min': 1.0,
+                'p-max': 120.0,
             },
             time=self.time1,
             value=221.0,
@@ -335,6 +477,131 @@ class TestAggregateData(TestCase):
         sum_of_sums.add_sample(d)
         self.assertEqual(sum_of_sums.aggregate(self.time2), 442.0)
 
+    def test_merge_partials(self):
+        props = {
+            'type': 'aggregate-avg',
+            'detail': 'test-aggr-data',
+            'config-name': 'aggr-avg',
+            'config-seqid': 0,
+            'aggr-group': 'avg-aggr',
+        }
+
+        # calcs: 100, 1, 120 (a) and 100, 1, 120, 10 (b)
+        (a, b) = (DataAggregate(EndpntSpec('local', 9097), dict(props)),
+                  DataAggregate(EndpntSpec('local', 9098), dict(props)))
+        self.add_samples(a)
+        self.add_samples(b)
+        b.add_sample(DataAverage(EndpntSpec('local', 9094), dict(self.d1[0].properties),
+                                 time=self.time1, value=0, base_value=0))
+        b.add_sample(DataAverage(EndpntSpec('local', 9094), dict(self.d1[0].properties),
+                                 time=self.time2, value=10, base_value=1))
+        a.aggregate(self.time1)
+        b.aggregate(self.time1)
+
+        # average of all nodes, not the average of the averages
+        root = DataAggregate(EndpntSpec('local', 9099),
+                             dict(props, **{'aggr-group': 'ROOT'}))
+        root.add_sample(Data.from_msg(a.frames, None))
+        root.add_sample(Data.from_msg(b.frames, None))
+        self.assertAlmostEqual(452 / 7, root.aggregate(self.time2))
+        self.assertEqual(7, root['node-cnt'])
+        self.assertEqual((452.0, 1.0, 120.0),
+                         (root['p-sum'], root['p-min'], root['p-max']))
+
+        root.reset()
+        self.assertNotIn('p-sum', root.properties)
+
+        # partials are kept for one more period, e.g. when the next partials are late
+        self.assertAlmostEqual(452 / 7, root.aggregate(self.time2 + 1000))
+        root.reset()
+
+        # b is left out once its partial was not replaced for a whole period
+        a2 = DataAggregate(EndpntSpec('local', 9097), dict(props))
+        self.add_samples(a2)
+        a2.aggregate(self.time2)
+        root.add_sample(Data.from_msg(a2.frames, None))
+        self.assertAlmostEqual(221 / 3, root.aggregate(self.time2 + 2000))
+        self.assertEqual(3, root['node-cnt'])
+
+    def test_merge_partials_min(self):
+        props = {
+            'type': 'aggregate-min',
+            'detail': 'test-aggr-data',
+            'config-name': 'aggr-min',
+            'config-seqid': 0,
+            'aggr-group': 'min-aggr',
+        }
+
+        (a, b) = (DataAggregate(EndpntSpec('local', 9097), dict(props)),
+                  DataAggregate(EndpntSpec('local', 9098), dict(props)))
+        for s in self.d1 + self.d3:
+            a.add_sample(s)
+        for s in self.d2:
+            b.add_sample(s)
+        a.aggregate(self.time1)
+        b.aggregate(self.time1)
+
+        # min source is the node, not the child that sent it
+        root = DataAggregate(EndpntSpec('local', 9099),
+                             dict(props, **{'aggr-group': 'ROOT'}))
+        root.add_sample(Data.from_msg(a.frames, None))
+        root.add_sample(Data.from_msg(b.frames, None))
+        self.assertEqual(1.0, root.aggregate(self.time2))
+        self.assertEqual(EndpntSpec('local', 9092), root['aggr-source'])
+        self.assertEqual(3, root['node-cnt'])
+
+    def test_sketch(self):
+        a = DataSketch(
+            EndpntSpec('local', 9096),
+            {
+                'type': 'aggregate-p99',
+                'detail': 'test-aggr-data',
+                'config-name': 'aggr-p99',
+                'config-seqid': 0,
+                'aggr-group': 'p99-aggr',
+            },
+        )
+        self.assertIsNone(a.aggregate(self.time1))
+
+        # calcs: 100, 1, 120; rank of p99 is 0.99 * (3 - 1)
+        self.add_samples(a)
+        self.assertAlmostEqual(100.0, a.aggregate(self.time2), delta=1.0)
+        self.assertEqual(3, a['node-cnt'])
+        self.assertEqual(3, a.sketch.count)
+        self.assertEqual(a, Data.from_msg(a.frames, None))
+
+        a.reset()
+        self.assertNotIn('sketch', a.properties)
+
+    def test_sketch_of_sketches(self):
+        props = {
+            'type': 'aggregate-histogram',
+            'detail': 'test-aggr-data',
+            'config-name': 'aggr-hist',
+            'config-seqid': 0,
+            'aggr-group': 'hist-aggr',
+        }
+
+        (a, b) = (DataSketch(EndpntSpec('local', 9097), dict(props)),
+                  DataSketch(EndpntSpec('local', 9098), dict(props)))
+        self.add_samples(a)
+        self.add_samples(b)
+        b.add_sample(DataAverage(EndpntSpec('local', 9094), dict(self.d1[0].properties),
+                                 time=self.time1, value=0, base_value=0))
+        b.add_sample(DataAverage(EndpntSpec('local', 9094), dict(self.d1[0].properties),
+                                 time=self.time2, value=10, base_value=1))
+        a.aggregate(self.time1)
+        b.aggregate(self.time1)
+
+        # merged from the children's sketches, not their (median) values
+        root = DataSketch(EndpntSpec('local', 9099),
+                          dict(props, **{'aggr-group': 'ROOT'}))
+        root.add_sample(Data.from_msg(a.frames, None))
+        root.add_sample(Data.from_msg(b.frames, None))
+        root.aggregate(self.time2)
+        self.assertEqual(7, root['node-cnt'])
+        self.assertEqual([1, 1, 10, 100, 100, 120, 120],
+                         [round(v) for (v, c) in root.sketch.buckets() for _ in range(c)])
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main
+
+from zmq import Context, PAIR, POLLIN  # pylint: disable-msg=E0611
+from zhelpers import zpipe
+
+from dcamp.service.runtime import create_runtime, RUNTIMES
+from dcamp.service.service import ServiceMixin
+from dcamp.types.messages.topology import gen_uuid
+from dcamp.types.specs import EndpntSpec
+
+
+class Echo(ServiceMixin):
+    """ echoes messages received on its socket; counts polls """
+
+    def __init__(self, control_pipe, local_ep, local_uuid, config_svc, address):
+        ServiceMixin.__init__(self, control_pipe, local_ep, local_uuid, config_svc)
+        self.socket = self.ctx.socket(PAIR)
+        self.socket.bind(address)
+        self.poller.register(self.socket, POLLIN)
+        self.poller_timer = 10  # msecs
+        self.polls = 0
+
+    def _pre_poll(self):
+        self.polls += 1
+
+    def _post_poll(self, items):
+        if self.socket in items:
+            self.socket.send(self.socket.recv())
+
+    def _cleanup(self):
+        self.socket.close()
+        ServiceMixin._cleanup(self)
+
+
+class TestRuntime(TestCase):
+    def setUp(self):
+        self.ctx = Context.instance()
+
+    def test_runtimes(self):
+        for name in sorted(RUNTIMES):
+            runtime = create_runtime(name, 'Test')
+            services = []
+            for i in range(3):
+                (pipe, peer) = zpipe(self.ctx)
+                svc = Echo(peer, EndpntSpec('localhost', 9000), gen_uuid(), None,
+                           'inproc://test-runtime-%s-%d' % (name, i))
+                services.append((pipe, svc))
+
+            runtime.start([svc for (pipe, svc) in services])
+            try:
+                for (i, (pipe, svc)) in enumerate(services):
+                    self.assertTrue(runtime.is_alive(svc))
+                    client = self.ctx.socket(PAIR)
+                    client.connect('inproc://test-runtime-%s-%d' % (name, i))
+                    client.send(b'hello')
+                    self.assertEqual(1, client.poll(2000), name)
+                    self.assertEqual(b'hello', client.recv())
+                    client.close()
+            finally:
+                for (pipe, svc) in services:
+                    pipe.send_string('STOP')
+                for (pipe, svc) in services:
+                    self.assertEqual('STOPPED', pipe.recv_string())
+                    runtime.join(svc, timeout=5)
+                    self.assertFalse(runtime.is_alive(svc))
+                    self.assertTrue(svc.polls > 0)
+                    pipe.close()
+
+
+if __name__ == '__main__':
+    main()
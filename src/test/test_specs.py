@@ -2,7 +2,7 @@
 
 from unittest import TestCase, main
 
-from dcamp.types.specs import EndpntSpec, ThreshSpec
+from dcamp.types.specs import EndpntSpec, ReduceSpec, ThreshSpec
 
 
 class TestEndpntSpec(TestCase):
@@ -35,6 +35,59 @@ class TestThreshSpec(TestCase):
         t3 = ThreshSpec('<', 99.0)
         self.assertEqual(self.t1, t3)
 
+    def test_expr(self):
+        t = ThreshSpec.from_str('?> 90 ~ 80 for 2')
+        self.assertEqual(ThreshSpec('?', '> 90 ~ 80 for 2'), t)
+        self.assertEqual(t, ThreshSpec.from_str(str(t)))
+        self.assertTrue(t.is_limit)
+        self.assertRaises(ValueError, ThreshSpec.from_str, '?> 90 and')
+
+        check = t.compile()
+        self.assertEqual([False, True, True, False],
+                         [check(v, 0) for v in (95.0, 95.0, 85.0, 75.0)])
+
+    def test_compile(self):
+        check = self.t1.compile()
+        self.assertTrue(check(99.0, 0))
+        self.assertFalse(check(99.5, 0))
+
+        hold = ThreshSpec.from_str('*60s').compile()
+        self.assertTrue(hold(1000, 61000))
+        self.assertFalse(hold(1000, 60999))
+
+
+class TestReduceSpec(TestCase):
+    def test_to_from(self):
+        for given in ['deadband 0.5', 'deadband 10%', 'deadband 2 60s', 'change',
+                      'change 300s', 'summary']:
+            spec = ReduceSpec.from_str(given)
+            self.assertEqual(spec, eval(repr(spec)))
+            self.assertEqual(spec, ReduceSpec.from_str(str(spec)))
+
+        self.assertEqual(ReduceSpec('deadband', 10.0, True, 60),
+                         ReduceSpec.from_str('deadband 10% 60s'))
+        self.assertEqual(ReduceSpec('change', None, False, None),
+                         ReduceSpec.from_str('change'))
+
+    def test_invalid(self):
+        for given in ['', 'sometimes', 'deadband', 'deadband x', 'deadband -1',
+                      'deadband 1 2 3', 'change 60', 'change 60s 60s', 'summary 60s']:
+            self.assertRaises(ValueError, ReduceSpec.from_str, given)
+
+    def test_exceeds(self):
+        self.assertTrue(ReduceSpec.from_str('change').exceeds(None, 1.0))
+        self.assertTrue(ReduceSpec.from_str('change').exceeds(1.0, 1.5))
+        self.assertFalse(ReduceSpec.from_str('change').exceeds(1.0, 1.0))
+
+        absolute = ReduceSpec.from_str('deadband 0.5')
+        self.assertFalse(absolute.exceeds(10.0, 10.5))
+        self.assertTrue(absolute.exceeds(10.0, 9.4))
+
+        relative = ReduceSpec.from_str('deadband 10%')
+        self.assertFalse(relative.exceeds(200.0, 219.0))
+        self.assertTrue(relative.exceeds(200.0, 221.0))
+        self.assertTrue(relative.exceeds(0.0, 0.1))
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+from os import listdir, path
+from tempfile import TemporaryDirectory
+
+from unittest import TestCase, main
+
+from dcamp.store.segment import Segment
+from dcamp.store.store import Store
+from dcamp.types.specs import EndpntSpec
+from dcamp.types.messages.data import DataBasic, DataBatch, DataPercent
+
+
+class TestSegment(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.filename = path.join(self.tmp.name, 'test.seg')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ring(self):
+        s = Segment(self.filename, 4)
+        for i in range(6):
+            self.assertTrue(s.append(i * 10, float(i), None))
+
+        # oldest rows overwritten
+        self.assertEqual(4, len(s))
+        self.assertEqual((20, 50), (s.first_time, s.last_time))
+        self.assertEqual(([20, 30, 40, 50], [2.0, 3.0, 4.0, 5.0], [None] * 4),
+                         s.rows(*s.bounds()))
+
+        # out of order rows are dropped
+        self.assertFalse(s.append(45, 0.0, None))
+        s.close()
+
+    def test_bounds(self):
+        s = Segment(self.filename, 4)
+        for i in range(6):
+            s.append(i * 10, float(i), float(i))
+        self.assertEqual((1, 4), s.bounds(25, 55))
+        self.assertEqual((0, 2), s.bounds(None, 40))
+        self.assertEqual((4, 4), s.bounds(60, None))
+        self.assertEqual(([30, 40], [3.0, 4.0], [3.0, 4.0]), s.rows(*s.bounds(30, 50)))
+
+        self.assertEqual(2, s.drop_before(40))
+        self.assertEqual(([40, 50], [4.0, 5.0], [4.0, 5.0]), s.rows(*s.bounds()))
+        s.close()
+
+    def test_reopen(self):
+        s = Segment(self.filename, 4)
+        s.append(10, 1.0, None)
+        s.close()
+
+        # existing segment keeps its capacity
+        s = Segment(self.filename, 100)
+        self.assertEqual(4, s.capacity)
+        self.assertEqual(([10], [1.0], [None]), s.rows(*s.bounds()))
+        s.close()
+
+    def test_peek(self):
+        s = Segment(self.filename, 4)
+        self.assertEqual((4, 0, None, None), Segment.peek(self.filename))
+        for i in range(6):
+            s.append(i * 10, float(i), None)
+        self.assertEqual((4, 4, 20, 50), Segment.peek(self.filename))
+        self.assertEqual(s.state, Segment.peek(self.filename))
+        s.close()
+
+    def test_invalid(self):
+        with open(self.filename, 'wb') as f:
+            f.write(b'\0' * 128)
+        self.assertRaises(ValueError, Segment, self.filename, 4)
+
+
+class TestStore(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.store = Store(self.tmp.name, capacity=16)
+
+        self.time = 1384321740000
+        self.source = EndpntSpec('local', 9090)
+        self.cpu = {'type': 'percent', 'detail': 'CPU', 'config-name': 'cpu',
+                    'config-seqid': 0}
+        self.mem = {'type': 'basic', 'detail': 'MEMORY', 'config-name': 'mem',
+                    'config-seqid': 0}
+
+        # cpu is busy 50% for the first 4 seconds, then 10%
+        self.cpu_samples = [DataPercent(self.source, self.cpu, time=self.time + i * 1000,
+                                        value=sum(50 if j < 4 else 10 for j in range(i)),
+                                        base_value=i * 100)
+                            for i in range(10)]
+        self.mem_samples = [DataBasic(self.source, self.mem, time=self.time + i * 1000,
+                                      value=float(i))
+                            for i in range(10)]
+        self.store.write(self.cpu_samples + self.mem_samples)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_query(self):
+        self.assertEqual(2, len(self.store.series()))
+        self.assertIsNone(self.store.query(self.source, 'nope'))
+
+        batch = self.store.query(self.source, 'cpu', self.time + 2000, self.time + 5000)
+        self.assertEqual(self.cpu_samples[2:5], batch.samples)
+
+        batch = self.store.query(self.source, 'mem')
+        self.assertEqual(self.mem_samples, batch.samples)
+
+    def test_batch(self):
+        # samples of a batch are appended at once; older ones are dropped
+        other = EndpntSpec('local', 9091)
+        batch = DataBatch.from_samples([
+            DataBasic(other, self.mem, time=self.time + i * 1000, value=float(i))
+            for i in range(3)])
+        self.store.write([batch])
+        self.assertEqual(batch.samples, self.store.query(other, 'mem').samples)
+
+        self.store.write([DataBatch(other, self.mem, [self.time, self.time + 5000],
+                                    [1.0, 2.0], [None, None])])
+        self.assertEqual([self.time + i * 1000 for i in (0, 1, 2, 5)],
+                         self.store.query(other, 'mem').times)
+        self.assertEqual(1, self.store.drop_cnt)
+
+    def test_downsample(self):
+        buckets = self.store.downsample(self.source, 'cpu', 5000)
+        self.assertEqual([(self.time, 50.0), (self.time + 5000, 10.0)], buckets)
+
+        # calculated from the sample preceding the range
+        buckets = self.store.downsample(self.source, 'cpu', 1000, self.time + 5000)
+        self.assertEqual(5, len(buckets))
+        self.assertEqual((self.time + 5000, 10.0), buckets[0])
+
+        buckets = self.store.downsample(self.source, 'mem', 10000, how='max')
+        self.assertEqual(9.0, buckets[-1][1])
+        self.assertRaises(ValueError, self.store.downsample, self.source, 'mem', 10000,
+                          how='p99')
+
+    def test_reopen(self):
+        self.store.close()
+        self.store = Store(self.tmp.name, capacity=16)
+        self.assertEqual(2, len(self.store.series()))
+        self.assertEqual(self.mem_samples, self.store.query(self.source, 'mem').samples)
+
+    def test_index_saved(self):
+        # new series are saved in batches, not one by one
+        index = path.join(self.tmp.name, 'index.json')
+        self.assertFalse(path.exists(index))
+        self.store.expire(now=self.time)
+        self.assertTrue(path.exists(index))
+
+    def test_index_unsaved(self):
+        # as after a crash: the segments of unsaved series are left behind
+        store = Store(self.tmp.name, capacity=16)
+        self.assertEqual(0, len(store.series()))
+
+        other = DataBasic(EndpntSpec('local', 9091), self.mem, time=self.time, value=1.0)
+        store.write([other])
+        self.assertEqual([other], store.query(other.source, 'mem').samples)
+        store.close()
+
+    def test_expire_age(self):
+        late = DataBasic(EndpntSpec('local', 9091), self.mem, time=self.time + 60000,
+                         value=1.0)
+        self.store.write([late])
+        self.store.max_age = 50000
+        self.assertEqual(2, self.store.expire(now=self.time + 60000))
+
+        self.assertEqual(1, len(self.store.series()))
+        self.assertEqual(2, len(listdir(self.tmp.name)))  # index and one segment
+
+    def test_expire_unopened(self):
+        self.store.close()
+        self.store = Store(self.tmp.name, capacity=16)
+        opened = self.store._Store__open
+
+        # bounds are known without opening the segments
+        self.assertEqual(0, self.store.expire(now=self.time + self.store.max_age))
+        self.assertEqual(0, len(opened))
+
+        # only segments with expired rows are opened
+        self.assertEqual(0, self.store.expire(now=self.time + self.store.max_age + 5000))
+        self.assertEqual(2, len(opened))
+        self.assertEqual(self.mem_samples[5:],
+                         self.store.query(self.source, 'mem').samples)
+
+    def test_capacity(self):
+        self.store.max_age = 60 * 1000
+        self.store.set_rates({'mem': 1, 'mem-aggr': 30})
+        self.assertEqual(61, self.store.capacity_for('mem'))
+        self.assertEqual(3, self.store.capacity_for('mem-aggr'))
+        self.assertEqual(16, self.store.capacity_for('cpu'))
+
+        # series keeps max-age of samples at its rate
+        source = EndpntSpec('local', 9091)
+        self.store.write([DataBasic(source, self.mem, time=self.time + i * 1000,
+                                    value=float(i))
+                          for i in range(61)])
+        self.assertEqual(61, len(self.store.query(source, 'mem').samples))
+
+        # existing series keep their capacity
+        self.store.write([DataBasic(self.source, self.mem, time=self.time + i * 1000,
+                                    value=1.0)
+                          for i in range(10, 20)])
+        self.assertEqual(16, len(self.store.query(self.source, 'mem').samples))
+
+    def test_expire_size(self):
+        self.store.max_bytes = Segment.size_for(16)
+        self.store.write([DataBasic(self.source, self.mem, time=self.time + 20000,
+                                    value=1.0)])
+        self.assertEqual(1, self.store.expire(now=self.time))
+
+        # least recently updated series removed first
+        self.assertEqual(['mem'], [s.config_name for s in self.store.series()])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+from datetime import datetime
+from unittest import TestCase, main
+
+from dcamp.types.messages.topology import gen_uuid
+from dcamp.types.specs import EndpntSpec
+from dcamp.types.topo import DuplicateNodeError, TopoNode, TopoTreeMixin
+
+
+class TestTopoTree(TestCase):
+    def setUp(self):
+        self.tree = TopoTreeMixin()
+        self.tree.insert_root(EndpntSpec('localhost', 9000), gen_uuid())
+        self.collector = self.__insert(9010, 'branch', 'group1', self.tree.root())
+        self.leaves = [self.__insert(port, 'leaf', 'group1', self.collector)
+                       for port in (9020, 9030, 9040)]
+
+    def __insert(self, port, level, group, parent):
+        node = TopoNode(EndpntSpec('localhost', port), gen_uuid(), level, group)
+        self.tree.insert_node(node, parent)
+        return node
+
+    def __copy(self, node):
+        copy = TopoNode(node.endpoint, node.uuid, node.level, node.group)
+        copy.last_seen = node.last_seen
+        return copy
+
+    def test_keys(self):
+        self.assertEqual('/TOPO/root', self.tree.root().get_key())
+        self.assertEqual('/TOPO/group1/collector', self.collector.get_key())
+        self.assertEqual('/TOPO/group1/leaves/localhost:9020', self.leaves[0].get_key())
+
+    def test_insert(self):
+        self.assertEqual(5, len(self.tree))
+        self.assertEqual(3, self.tree.group_size('group1'))
+        self.assertEqual(0, self.tree.group_size('group2'))
+
+        # children keep their insertion order
+        self.assertEqual(self.leaves, list(self.collector.children.values()))
+        nodes = [self.tree.root(), self.collector] + self.leaves
+        self.assertEqual([n.get_key() for n in nodes], [k for (k, n) in self.tree.walk()])
+
+        self.assertRaises(DuplicateNodeError, self.__insert, 9020, 'leaf', 'group1',
+                          self.collector)
+
+    def test_kv_update(self):
+        # new leaf
+        leaf = TopoNode(EndpntSpec('localhost', 9050), gen_uuid(), 'leaf', 'group1')
+        self.assertTrue(self.tree.kv_update(leaf.get_key(), leaf))
+        self.assertIs(self.collector, leaf.parent)
+        self.assertEqual(4, self.tree.group_size('group1'))
+
+        # updated copy of a leaf replaces it in its parent
+        copy = self.__copy(self.leaves[0])
+        self.assertTrue(self.tree.kv_update(copy.get_key(), copy))
+        self.assertIs(copy, self.tree.get_node(copy.endpoint))
+        self.assertIs(copy, self.collector.children[copy.endpoint])
+        self.assertEqual(4, self.tree.group_size('group1'))
+
+        # updated copy of the collector is the new parent of its leaves
+        copy = self.__copy(self.collector)
+        self.assertTrue(self.tree.kv_update(copy.get_key(), copy))
+        self.assertIs(copy, self.tree.get_collector('group1'))
+        self.assertTrue(all(c.parent is copy for c in copy.children.values()))
+
+        # key must match the node
+        leaf = TopoNode(EndpntSpec('localhost', 9060), gen_uuid(), 'leaf', 'group1')
+        self.assertFalse(self.tree.kv_update('/TOPO/group2/leaves/localhost:9060', leaf))
+        self.assertFalse(self.tree.kv_update(leaf.get_key(), 'not-a-node'))
+        self.assertIsNone(self.tree.get_node(leaf.endpoint))
+
+    def test_touch(self):
+        for (i, leaf) in enumerate(self.leaves):
+            self.tree.touch_node(leaf, datetime(2013, 11, 13, 5, 49, i))
+
+        # touched nodes are not modified
+        self.assertEqual(datetime(2013, 11, 13, 5, 49, 1),
+                         self.tree.last_seen(self.leaves[1]))
+        self.assertEqual(0, self.leaves[1].last_seen)
+
+        self.tree.touch_node(self.leaves[0])
+        self.assertLess(datetime(2013, 11, 13, 5, 49, 2),
+                        self.tree.last_seen(self.leaves[0]))
+        self.assertEqual(len(self.leaves), self.tree.group_size('group1'))
+
+    def test_remove_collector(self):
+        kvlist = self.tree.remove_collector(self.collector)
+        self.assertEqual(sorted([n.get_key() for n in self.leaves + [self.collector]]),
+                         sorted(k for (k, v) in kvlist))
+        self.assertTrue(all(v is None for (k, v) in kvlist))
+
+        self.assertEqual(1, len(self.tree))
+        self.assertEqual({}, self.tree.root().children)
+        self.assertIsNone(self.tree.get_collector('group1'))
+        self.assertEqual(0, self.tree.group_size('group1'))
+
+    def test_replace_root(self):
+        self.tree.insert_root(EndpntSpec('localhost', 9100), gen_uuid())
+        root = self.tree.root()
+        self.assertEqual(EndpntSpec('localhost', 9100), root.endpoint)
+        self.assertIs(root, self.collector.parent)
+        self.assertEqual([self.collector], list(root.children.values()))
+        self.assertIsNone(self.tree.get_node(EndpntSpec('localhost', 9000)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main, skipIf
+
+import dcamp.util.aggregate as aggregate
+from dcamp.types.specs import EndpntSpec
+from dcamp.types.messages.data import (DataAverage, DataBasic, DataDelta, DataPercent,
+                                      DataRate)
+from dcamp.util.aggregate import SampleTable
+
+
+class TestSampleTable(TestCase):
+    numpy = aggregate.numpy
+
+    def setUp(self):
+        aggregate.numpy = self.numpy
+        self.time = 1384321742000
+
+    def tearDown(self):
+        aggregate.numpy = TestSampleTable.numpy
+
+    def samples(self, cls, m_type, n):
+        """ returns list of (first, last) Data pairs for n nodes """
+        props = {'type': m_type, 'detail': 'test', 'config-name': 'test',
+                 'config-seqid': 0}
+        result = []
+        for i in range(n):
+            ep = EndpntSpec('local', 9000 + i)
+            first = cls(ep, props, time=self.time, value=i * 3.0, base_value=100.0)
+            last = cls(ep, props, time=self.time + 1000 + i, value=i * 7.0 + 1,
+                       base_value=200.0 + i % 2)
+            result.append((first, last))
+        return result
+
+    def table(self, pairs):
+        t = SampleTable()
+        for (first, last) in pairs:
+            t.add(first)
+            t.add(last)
+        return t
+
+    def test_calculate(self):
+        # matches Data.calculate(); table grows past its initial slots
+        n = SampleTable.INITIAL_SLOTS * 3
+        for (cls, m_type) in ((DataBasic, 'basic'), (DataDelta, 'delta'),
+                              (DataRate, 'rate'), (DataAverage, 'average'),
+                              (DataPercent, 'percent')):
+            pairs = self.samples(cls, m_type, n)
+            calcs = [first.calculate(last) for (first, last) in pairs]
+            t = self.table(pairs)
+
+            (cnt, total, lo, lo_node, hi, hi_node) = t.summary(m_type)
+            self.assertEqual(n, cnt)
+            self.assertAlmostEqual(sum(calcs), total)
+
+            self.assertEqual(min(calcs), lo)
+            self.assertEqual(pairs[calcs.index(lo)][0].source, lo_node)
+
+            self.assertEqual(max(calcs), hi)
+            self.assertEqual(pairs[calcs.index(hi)][0].source, hi_node)
+
+    def test_zero_denominator(self):
+        pairs = self.samples(DataPercent, 'percent', 2)
+        pairs[0][1].base_value = pairs[0][0].base_value
+        self.assertEqual(0.0, self.table(pairs).summary('percent')[2])
+
+    def test_incomplete(self):
+        pairs = self.samples(DataBasic, 'basic', 3)
+        t = SampleTable()
+        self.assertEqual((0, None, None, None, None, None), t.summary('basic'))
+
+        # only nodes with two samples are included
+        t.add(pairs[0][0])
+        t.add(pairs[0][1])
+        t.add(pairs[1][0])
+        value = pairs[0][1].value
+        node = pairs[0][0].source
+        self.assertEqual((1, value, value, node, value, node), t.summary('basic'))
+
+    def test_resent(self):
+        # re-sent samples (not newer than the newest) are ignored
+        pairs = self.samples(DataBasic, 'basic', 1)
+        t = SampleTable()
+        t.add(pairs[0][0])
+        t.add(pairs[0][0])
+        self.assertEqual(0, t.summary('basic')[0])
+        t.add(pairs[0][1])
+        t.add(pairs[0][0])
+        self.assertEqual((1, pairs[0][1].value), t.summary('basic')[:2])
+
+    def test_reset(self):
+        pairs = self.samples(DataDelta, 'delta', 2)
+        t = self.table(pairs)
+        t.reset()
+        self.assertEqual(0, t.summary('delta')[0])
+
+        # last sample is now the first
+        later = DataDelta(pairs[0][1].source, pairs[0][1].properties,
+                          time=self.time + 5000, value=pairs[0][1].value + 5,
+                          base_value=None)
+        t.add(later)
+        self.assertEqual((1, 5.0), t.summary('delta')[:2])
+
+
+@skipIf(aggregate.numpy is None, 'numpy not installed; already tested without it')
+class TestSampleTableNoNumpy(TestSampleTable):
+    numpy = None
+
+
+if __name__ == '__main__':
+    main()
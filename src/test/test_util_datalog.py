@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+from io import BytesIO, StringIO
+from os import listdir, path
+from tempfile import TemporaryDirectory
+
+from unittest import TestCase, main
+
+from dcamp.types.specs import EndpntSpec
+from dcamp.types.messages.data import DataAggregate, DataBasic, DataPercent
+from dcamp.util.datalog import (BinaryDataSink, TextDataSink, convert, open_sink,
+                                read_records)
+
+
+class TestDataLog(TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.time = 1384321742000
+
+        source = EndpntSpec('local', 9090)
+        props = {
+            'type': 'percent',
+            'detail': 'CPU',
+            'config-name': 'cpu',
+            'config-seqid': 0,
+        }
+        self.samples = [DataPercent(source, props, time=self.time + i * 1000, value=i,
+                                    base_value=10)
+                        for i in range(3)]
+        self.samples.append(DataBasic(EndpntSpec('local', 9091),
+                                      {'type': 'basic', 'detail': 'MEMORY',
+                                       'config-name': 'mem', 'config-seqid': 0},
+                                      time=self.time, value=None))
+        self.samples.append(DataAggregate(
+            EndpntSpec('local', 9096),
+            {
+                'type': 'aggregate-avg',
+                'detail': 'CPU',
+                'config-name': 'cpu-aggr',
+                'config-seqid': 0,
+                'aggr-group': 'group1',
+
+                'is-final': True,
+                'samples-type': 'percent',
+                'node-cnt': 3,
+                'aggr-source': EndpntSpec('local', 9096),
+            },
+            time=self.time,
+            value=42.0,
+        ))
+        self.expected = ''.join(s.log_str() + '\n' for s in self.samples)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name, mode='r'):
+        with open(name, mode) as f:
+            return f.read()
+
+    def test_text(self):
+        sink = open_sink(self.tmp.name, 'root-local:9090', kind='text')
+        self.assertIsInstance(sink, TextDataSink)
+        sink.write(self.samples)
+        sink.close()
+        self.assertEqual(self.expected, self.read(sink.name))
+
+    def test_binary_convert(self):
+        sink = open_sink(self.tmp.name, 'root-local:9090')
+        self.assertIsInstance(sink, BinaryDataSink)
+        sink.write(self.samples[:2])
+        sink.write(self.samples[2:])
+        sink.close()
+
+        output = StringIO()
+        with open(sink.name, 'rb') as f:
+            convert(f, output)
+        self.assertEqual(self.expected, output.getvalue())
+
+    def test_binary_size(self):
+        # streams are interned, so each set of properties is only written once
+        samples = self.samples[:3] * 10
+        text = open_sink(self.tmp.name, 'text', kind='text')
+        binary = open_sink(self.tmp.name, 'binary')
+        for sink in (text, binary):
+            sink.write(samples)
+            sink.close()
+        self.assertLess(3 * len(self.read(binary.name, 'rb')),
+                        len(self.read(text.name, 'rb')))
+
+    def test_binary_streams(self):
+        # properties outside of the schema vary per sample, not per stream
+        aggr = self.samples[-1]
+        samples = []
+        for i in range(10):
+            props = dict(aggr.properties, **{'node-cnt': i})
+            samples.append(DataAggregate(aggr.source, props, time=self.time + i, value=i))
+        sink = BinaryDataSink(self.tmp.name, 'root')
+        sink.write(samples)
+        sink.close()
+
+        data = self.read(sink.name, 'rb')
+        self.assertEqual(1, data.count(b'group1'))
+        with open(sink.name, 'rb') as f:
+            self.assertEqual([(s.time, s.source, s.properties, s.value, s.base_value)
+                              for s in samples], list(read_records(f)))
+
+    def test_binary_version1(self):
+        sample = self.samples[0]
+        source = sample.source.encode()
+        props = sample._encode_dict(sample.properties)
+        data = (BinaryDataSink.HEADER.pack(BinaryDataSink.MAGIC, 1) +
+                BinaryDataSink.STREAM.pack(b'N', 0, len(source), len(props)) +
+                source + props +
+                BinaryDataSink.SAMPLE.pack(b'D', 0, sample.time, sample.value,
+                                           sample.base_value))
+        self.assertEqual([(sample.time, sample.source, sample.properties, sample.value,
+                           sample.base_value)], list(read_records(BytesIO(data))))
+
+    def test_buffered(self):
+        sink = BinaryDataSink(self.tmp.name, 'root', flush_interval=60)
+        self.assertIsNone(sink.next_flush())
+        sink.write(self.samples)
+
+        # nothing written until the flush interval passes (or a forced flush)
+        sink.flush()
+        self.assertEqual(b'', self.read(sink.name, 'rb'))
+        self.assertGreater(sink.next_flush(), 0)
+
+        sink.flush(force=True)
+        self.assertIsNone(sink.next_flush())
+        with open(sink.name, 'rb') as f:
+            self.assertEqual(len(self.samples), len(list(read_records(f))))
+        sink.close()
+
+    def test_unbuffered(self):
+        sink = BinaryDataSink(self.tmp.name, 'root', flush_interval=0)
+        sink.write(self.samples)
+        self.assertIsNone(sink.next_flush())
+        with open(sink.name, 'rb') as f:
+            self.assertEqual(len(self.samples), len(list(read_records(f))))
+        sink.close()
+
+    def test_rotate(self):
+        sink = BinaryDataSink(self.tmp.name, 'root', max_bytes=1)
+        first = sink.name
+        sink.write(self.samples[:1])
+        sink.flush(force=True)
+        self.assertNotEqual(first, sink.name)
+        sink.write(self.samples[1:])
+        sink.close()
+
+        # each file stands alone, re-declaring its streams
+        self.assertEqual(2, len(listdir(self.tmp.name)))
+        records = []
+        for name in (first, sink.name):
+            with open(name, 'rb') as f:
+                records += list(read_records(f))
+        self.assertEqual([(s.time, s.source, s.properties, s.value, s.base_value)
+                          for s in self.samples], records)
+
+    def test_truncated(self):
+        sink = BinaryDataSink(self.tmp.name, 'root')
+        sink.write(self.samples)
+        sink.close()
+
+        with open(sink.name, 'rb+') as f:
+            f.truncate(path.getsize(sink.name) - 1)
+        with open(sink.name, 'rb') as f:
+            self.assertEqual(len(self.samples) - 1, len(list(read_records(f))))
+
+    def test_not_datalog(self):
+        sink = open_sink(self.tmp.name, 'root', kind='text')
+        sink.write(self.samples)
+        sink.close()
+        with open(sink.name, 'rb') as f:
+            self.assertRaises(ValueError, list, read_records(f))
+
+        self.assertRaises(ValueError, open_sink, self.tmp.name, 'root', kind='csv')
+
+
+if __name__ == '__main__':
+    main()
@@ -24,5 +24,12 @@ class TestUtilFunctions(TestCase):
 		self.assertEqual('Kb', Util.format_bytes(1024, num_or_suffix='suffix'))
 		self.assertEqual('Kilobyte', Util.format_bytes(1024, use_short=False, num_or_suffix='suffix'))
 
+	def test_str_to_bytes(self):
+		self.assertEqual(9876, Util.str_to_bytes('9876'))
+		self.assertEqual(2048, Util.str_to_bytes('2K'))
+		self.assertEqual(64 * 1024 ** 2, Util.str_to_bytes('64M'))
+		self.assertEqual(1024 ** 3, Util.str_to_bytes('1G'))
+		self.assertRaises(NotImplementedError, Util.str_to_bytes, '64MB')
+
 if __name__ == '__main__':
 	main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main
+
+from zmq import Context, PAIR  # pylint: disable-msg=E0611
+
+from dcamp.types.specs import EndpntSpec
+from dcamp.util import inproc
+
+
+class TestInproc(TestCase):
+    def setUp(self):
+        self.ep = EndpntSpec('dcamp-test-host', 47000)
+        inproc.register(self.ep)
+
+    def tearDown(self):
+        inproc.unregister(self.ep)
+
+    def test_alias(self):
+        uri = self.ep.connect_uri(EndpntSpec.CONFIG_UPDATE)
+        alias = inproc.connect_alias(uri)
+        self.assertTrue(alias.startswith('inproc://'))
+        self.assertEqual(alias,
+                         inproc.bind_alias(self.ep.bind_uri(EndpntSpec.CONFIG_UPDATE)))
+
+        # other hosts, ports, and protocols are not local
+        self.assertIsNone(inproc.connect_alias('tcp://otherhost:47002'))
+        self.assertIsNone(inproc.connect_alias('tcp://dcamp-test-host:47010'))
+        self.assertIsNone(inproc.connect_alias(self.ep.connect_uri(EndpntSpec.BASE,
+                                                                   'inproc')))
+        self.assertIsNone(inproc.bind_alias('tcp://*:47010'))
+
+        inproc.unregister(self.ep)
+        self.assertIsNone(inproc.connect_alias(uri))
+
+    def test_socket(self):
+        ctx = Context.instance()
+        a = ctx.socket(PAIR, socket_class=inproc.LocalSocket)
+        b = ctx.socket(PAIR, socket_class=inproc.LocalSocket)
+        try:
+            a.bind(self.ep.bind_uri(EndpntSpec.CONFIG_UPDATE))
+            # host name does not resolve; only reachable through the inproc alias
+            b.connect(self.ep.connect_uri(EndpntSpec.CONFIG_UPDATE))
+            b.send(b'hello')
+            self.assertEqual(1, a.poll(2000))
+            self.assertEqual(b'hello', a.recv())
+            b.disconnect(self.ep.connect_uri(EndpntSpec.CONFIG_UPDATE))
+        finally:
+            a.close()
+            b.close()
+
+
+if __name__ == '__main__':
+    main()
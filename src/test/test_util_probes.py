@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import os
+from time import sleep
+from uuid import uuid4
+from unittest import TestCase, main
+
+import psutil
+
+from zmq import Context, PULL, Again  # pylint: disable-msg=E0611
+
+from dcamp.util.functions import now_msecs
+from dcamp.util.probes import ProbePool, disk_io, scan_processes
+
+
+def add(a, b):
+    return a + b
+
+
+def fail():
+    raise ValueError('probe failed')
+
+
+def slow(secs):
+    sleep(secs)
+    return secs
+
+
+class TestProbePool(TestCase):
+    def setUp(self):
+        self.address = 'inproc://test-probes-%s' % self._testMethodName
+        self.socket = Context.instance().socket(PULL)
+        self.socket.bind(self.address)
+        self.pool = ProbePool(self.address)
+
+    def tearDown(self):
+        self.socket.close()
+
+    def __recv(self):
+        self.assertEqual(1, self.socket.poll(10000))
+        return self.pool.recv(self.socket)
+
+    def test_result(self):
+        self.assertTrue(self.pool.submit('add', 10, 'ctx', add, 1, 2))
+        self.assertEqual(1, len(self.pool))
+        self.assertIsNotNone(self.pool.next_deadline)
+
+        (name, context, value, error, time) = self.__recv()
+        self.assertEqual(('add', 'ctx', 3, None), (name, context, value, error))
+        self.assertTrue(abs(now_msecs() - time) < 10000)
+        self.assertEqual(0, len(self.pool))
+        self.assertIsNone(self.pool.next_deadline)
+        self.assertRaises(Again, self.pool.recv, self.socket)
+
+    def test_error(self):
+        self.assertTrue(self.pool.submit('fail', 10, None, fail))
+        (name, context, value, error, time) = self.__recv()
+        self.assertEqual('fail', name)
+        self.assertIsNone(value)
+        self.assertIsInstance(error, ValueError)
+        self.assertIsNone(time)
+
+    def test_share(self):
+        address = self.address + '-other'
+        socket = Context.instance().socket(PULL)
+        socket.bind(address)
+        try:
+            other = ProbePool(address)
+            self.assertTrue(self.pool.submit('uuid', 10, None, uuid4, share='key'))
+            self.assertTrue(other.submit('uuid', 10, None, uuid4, share='key'))
+            self.assertEqual(1, socket.poll(10000))
+            shared = other.recv(socket)
+
+            # same run, delivered to both pools
+            self.assertEqual(shared, self.__recv())
+
+            # runs of other keys are not shared
+            self.assertTrue(self.pool.submit('uuid', 10, None, uuid4, share='other-key'))
+            self.assertNotEqual(shared[2], self.__recv()[2])
+        finally:
+            socket.close()
+
+    def test_timeout(self):
+        # timeouts start once the workers are started
+        self.assertTrue(self.pool.submit('add', 10, None, add, 1, 2))
+        self.assertIsNotNone(self.__recv())
+
+        # hung probe
+        self.assertTrue(self.pool.submit('slow', 0.1, 'ctx', slow, 60))
+        self.assertFalse(self.pool.submit('slow', 0.1, 'ctx', slow, 60))
+        self.assertEqual([], self.pool.expire())
+
+        sleep(0.2)
+        self.assertEqual([('slow', 'ctx')], self.pool.expire())
+        self.assertEqual(0, len(self.pool))
+
+        # expired probe's worker is replaced, so it can be started again right away; the
+        # expired run fails, and its result is dropped
+        self.assertTrue(self.pool.submit('slow', 10, 'ctx', slow, 0))
+        results = [self.__recv(), self.__recv()]
+        self.assertIn(None, results)
+        self.assertIn(('slow', 'ctx', 0, None), [r and r[:4] for r in results])
+
+
+class TestProbes(TestCase):
+    def test_disk_io(self):
+        try:
+            value = disk_io()
+        except AttributeError:
+            self.skipTest('no disk counters on this system')
+        self.assertIsInstance(value, int)
+
+    def test_scan_processes(self):
+        name = psutil.Process(os.getpid()).name()
+        table = scan_processes({name: {'PROC_MEM', 'PROC_CPU'},
+                                'no-such-proc': {'PROC_MEM'}})
+
+        (pcount, value, base) = table[(name, 'PROC_MEM')]
+        self.assertTrue(pcount >= 1)
+        self.assertTrue(0 < value < base)
+        self.assertEqual(psutil.virtual_memory().total, base)
+
+        (pcount, value, base) = table[(name, 'PROC_CPU')]
+        self.assertTrue(value <= base)
+        self.assertNotIn(('no-such-proc', 'PROC_MEM'), table)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main
+
+from dcamp.types.messages.data import DataBasic, DataRate
+from dcamp.types.specs import EndpntSpec, ReduceSpec
+from dcamp.util.reduce import Reducer
+
+
+class TestReducer(TestCase):
+    def setUp(self):
+        self.time = 1384321742000
+        self.source = EndpntSpec('local', 9090)
+
+    def __samples(self, cls, m_type, values):
+        props = {
+            'type': m_type,
+            'detail': 'test-data',
+            'config-name': 'reduce-test',
+            'config-seqid': 0,
+        }
+        return [cls(self.source, props, self.time + (i * 1000), v)
+                for (i, v) in enumerate(values)]
+
+    def test_change(self):
+        reducer = Reducer(ReduceSpec.from_str('change'))
+        samples = self.__samples(DataBasic, 'basic', [5, 5, 5, 6, 6, 5])
+        self.assertEqual([samples[i] for i in (0, 1, 3, 5)], reducer.reduce(samples))
+
+    def test_silence(self):
+        reducer = Reducer(ReduceSpec.from_str('change 3s'))
+        samples = self.__samples(DataBasic, 'basic', [5] * 8)
+        # first sample, its value, then every 3s of silence
+        self.assertEqual([samples[i] for i in (0, 1, 4, 7)], reducer.reduce(samples))
+
+    def test_deadband_rate(self):
+        reducer = Reducer(ReduceSpec.from_str('deadband 10%'))
+        # counter of a (nearly) flat rate of 100/sec, then 200/sec
+        samples = self.__samples(DataRate, 'rate', [0, 100, 205, 300, 405, 605, 805])
+        kept = []
+        for s in samples:
+            kept.extend(reducer.reduce([s]))
+        self.assertEqual([samples[i] for i in (0, 1, 5, 6)], kept)
+
+        # dropped samples are folded into the rate calculated by the parent
+        self.assertEqual(126.25, kept[1].calculate(kept[2]))
+        self.assertEqual(200.0, kept[2].calculate(kept[3]))
+
+    def test_summary(self):
+        reducer = Reducer(ReduceSpec.from_str('summary'))
+        samples = self.__samples(DataRate, 'rate', [0, 100, 300, 400, 1000])
+
+        (first,) = reducer.reduce(samples[:3])
+        self.assertEqual(samples[2].time, first.time)
+        self.assertEqual(samples[2].value, first.value)
+        self.assertEqual(2, first['r-count'])
+        self.assertEqual((100.0, 200.0, 150.0, 200.0),
+                         tuple(first[k] for k in ('r-min', 'r-max', 'r-mean', 'r-last')))
+
+        # values continue from the last released sample
+        (second,) = reducer.reduce(samples[3:])
+        self.assertEqual(2, second['r-count'])
+        self.assertEqual((100.0, 600.0, 350.0, 600.0),
+                         tuple(second[k] for k in ('r-min', 'r-max', 'r-mean', 'r-last')))
+
+        # original samples are left untouched
+        self.assertNotIn('r-count', samples[-1].properties)
+
+    def test_summary_single(self):
+        reducer = Reducer(ReduceSpec.from_str('summary'))
+        samples = self.__samples(DataBasic, 'basic', [5])
+        self.assertEqual(samples, reducer.reduce(samples))
+
+
+if __name__ == '__main__':
+    main()
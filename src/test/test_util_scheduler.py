@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+from unittest import TestCase, main
+
+from dcamp.types.specs import MetricSpec, MetricCollection
+from dcamp.types.messages.data import DataBasic
+from dcamp.types.specs import EndpntSpec
+from dcamp.util.scheduler import AdaptiveRate, Scheduler
+
+
+class TestScheduler(TestCase):
+    def setUp(self):
+        self.fast = MetricSpec('fast', 1, None, 'CPU', None, None)
+        self.slow = MetricSpec('slow', 10, None, 'MEMORY', None, None)
+        self.s = Scheduler([
+            MetricCollection(5000, self.slow),
+            MetricCollection(1000, self.fast),
+        ])
+
+    def test_order(self):
+        self.assertEqual(2, len(self.s))
+        self.assertEqual(1000, self.s.next_epoch)
+        self.assertEqual([self.fast, self.slow], [c.spec for c in self.s])
+
+    def test_pop_due(self):
+        self.assertEqual([], self.s.pop_due(999))
+        due = self.s.pop_due(5000)
+        self.assertEqual([MetricCollection(1000, self.fast),
+                          MetricCollection(5000, self.slow)], due)
+        self.assertEqual(0, len(self.s))
+        self.assertIsNone(self.s.next_epoch)
+
+    def test_same_epoch(self):
+        # specs are never compared; equal epochs pop in insertion order
+        s = Scheduler()
+        s.schedule(self.slow, 1000)
+        s.schedule(self.fast, 1000)
+        self.assertEqual([self.slow, self.fast], [c.spec for c in s.pop_due(1000)])
+
+    def test_no_drift(self):
+        # collection processed late still keeps its original cadence
+        (c,) = self.s.pop_due(1000)
+        self.assertEqual(2000, self.s.reschedule(c, now=1250))
+        self.assertEqual(2000, self.s.next_epoch)
+
+    def test_skip_missed(self):
+        # missed periods are skipped, not collected in a burst
+        (c,) = self.s.pop_due(1000)
+        self.assertEqual(4000, self.s.reschedule(c, now=3500))
+        self.assertEqual(4000,
+                         self.s.reschedule(MetricCollection(3000, self.fast), now=3000))
+
+    def test_period(self):
+        (c,) = self.s.pop_due(1000)
+        self.assertEqual(1250, self.s.reschedule(c, now=1000, period=250))
+
+
+class TestAdaptiveRate(TestCase):
+    def setUp(self):
+        self.spec = MetricSpec('adaptive', 8, None, 'MEMORY', None, None, None, 1, 30)
+        self.time = 1384321742000
+
+    def __sample(self, value):
+        props = {
+            'type': 'basic',
+            'detail': 'MEMORY',
+            'config-name': 'adaptive',
+            'config-seqid': 0,
+        }
+        self.time += 1000
+        return DataBasic(EndpntSpec('local', 9090), props, self.time, value)
+
+    def test_spec(self):
+        self.assertTrue(self.spec.is_adaptive)
+        self.assertEqual(30, self.spec.longest_rate)
+        fixed = MetricSpec('fixed', 8, None, 'MEMORY', None, None)
+        self.assertFalse(fixed.is_adaptive)
+        self.assertEqual(8, fixed.longest_rate)
+
+    def test_adapt(self):
+        rate = AdaptiveRate(self.spec)
+        self.assertEqual(8000, rate.period)
+
+        # first two samples only establish a value to compare against
+        self.assertEqual(8000, rate.update(self.__sample(100)))
+        self.assertEqual(8000, rate.update(self.__sample(100)))
+
+        # volatile: tighten down to rate-min
+        periods = [rate.update(self.__sample(v)) for v in (200, 100, 200, 100, 200)]
+        self.assertEqual([4000, 2000, 1000, 1000, 1000], periods)
+
+        # in between: keep the period
+        self.assertEqual(1000, rate.update(self.__sample(190)))
+
+        # flat: back off up to rate-max
+        periods = [rate.update(self.__sample(190)) for _ in range(10)]
+        self.assertEqual([1500, 2250, 3375, 5062, 7593, 11389, 17083, 25624, 30000,
+                          30000], periods)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+from random import Random
+
+from unittest import TestCase, main
+
+from dcamp.util.sketch import DDSketch
+
+
+class TestDDSketch(TestCase):
+    def setUp(self):
+        rand = Random(42)
+        self.values = [rand.lognormvariate(3, 1) for _ in range(5000)]
+
+    def exact(self, values, q):
+        return sorted(values)[int(q * (len(values) - 1))]
+
+    def assertRelative(self, expected, actual, alpha=DDSketch.ALPHA):
+        self.assertLessEqual(abs(actual - expected), alpha * abs(expected) + 1e-9)
+
+    def test_quantiles(self):
+        s = DDSketch()
+        s.add_all(self.values)
+        self.assertEqual(len(self.values), s.count)
+        for q in (0, 0.5, 0.95, 0.99, 1):
+            self.assertRelative(self.exact(self.values, q), s.quantile(q))
+
+    def test_add_all(self):
+        # bucketing many values at once matches adding them one by one
+        (a, b) = (DDSketch(), DDSketch())
+        a.add_all(self.values + [0.0, -1.5, -2000.0])
+        for v in self.values + [0.0, -1.5, -2000.0]:
+            b.add(v)
+        self.assertEqual(a, b)
+
+    def test_negative(self):
+        s = DDSketch()
+        s.add_all([-100.0, -10.0, 0.0, 10.0, 100.0])
+        self.assertRelative(-100.0, s.quantile(0))
+        self.assertEqual(0.0, s.quantile(0.5))
+        self.assertRelative(100.0, s.quantile(1))
+        self.assertEqual([-1, 0, 1], [(v > 0) - (v < 0) for (v, _) in s.buckets()[::2]])
+
+    def test_merge(self):
+        (a, b, whole) = (DDSketch(), DDSketch(), DDSketch())
+        a.add_all(self.values[:1000])
+        b.add_all(self.values[1000:])
+        whole.add_all(self.values)
+
+        a.merge(b)
+        self.assertEqual(whole, a)
+        self.assertRaises(ValueError, a.merge, DDSketch(0.05))
+
+    def test_encode(self):
+        s = DDSketch()
+        self.assertEqual(s, DDSketch.decode(s.encode()))
+        self.assertIsNone(s.quantile(0.5))
+
+        s.add_all(self.values + [0.0, -3.0])
+        self.assertEqual(s, DDSketch.decode(s.encode()))
+        self.assertRaises(ValueError, DDSketch.decode, 'garbage')
+
+
+if __name__ == '__main__':
+    main()
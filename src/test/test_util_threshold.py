@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+from unittest import TestCase, main
+
+from dcamp.util.threshold import compile_expr
+
+
+class TestThreshold(TestCase):
+    def __run(self, expr, values, times=None):
+        """ @returns results of compiled expression for given values, one second apart """
+        check = compile_expr(expr)
+        if times is None:
+            times = [i * 1000 for i in range(len(values))]
+        return [check(float(v), t) for (v, t) in zip(values, times)]
+
+    def test_limit(self):
+        self.assertEqual([False, True, True, False], self.__run('> 90', [80, 90, 95, 89]))
+        self.assertEqual([True, False], self.__run('< -5', [-10, 0]))
+
+    def test_hysteresis(self):
+        values = [85, 91, 85, 81, 79, 85, 91]
+        self.assertEqual([False, True, True, True, False, False, True],
+                         self.__run('> 90 ~ 80', values))
+        self.assertEqual([False, True, False, False, False, False, True],
+                         self.__run('> 90', values))
+        self.assertEqual([False, True, True, False],
+                         self.__run('< 10 ~ 20', [15, 10, 19, 21]))
+
+    def test_rate(self):
+        # change per second
+        self.assertEqual([False, False, True, False],
+                         self.__run('rate > 5', [0, 4, 20, 21]))
+        self.assertEqual([False, True], self.__run('rate > 5', [0, 5], [0, 500]))
+
+    def test_sustained(self):
+        self.assertEqual([False, False, True, True, False, False],
+                         self.__run('> 90 for 3', [95, 95, 95, 95, 80, 95]))
+
+    def test_compound(self):
+        expr = '(> 90 and rate > 0) or < 10'
+        self.assertEqual([False, True, False, True, False],
+                         self.__run(expr, [50, 95, 94, 5, 50]))
+
+        # conditions are evaluated for every sample, so the streak is kept up to date
+        self.assertEqual([True, True, True, True],
+                         self.__run('< 100 or > 90 for 3', [95, 95, 95, 95]))
+        self.assertEqual([False, False, True],
+                         self.__run('> 100 or > 90 for 3', [95, 95, 95]))
+
+    def test_state_per_compile(self):
+        first = compile_expr('> 90 for 2')
+        self.assertFalse(first(95.0, 0))
+        self.assertTrue(first(95.0, 1000))
+        self.assertFalse(compile_expr('> 90 for 2')(95.0, 2000))
+
+    def test_invalid(self):
+        for given in ['', '90', '> x', '> 90 or', '(> 90', '> 90)', '= 90', '> 90 ~ 95',
+                      '< 10 ~ 5', '> 90 for 0', '> 90 for 1.5', '> 90 $']:
+            self.assertRaises(ValueError, compile_expr, given)
+
+
+if __name__ == '__main__':
+    main()
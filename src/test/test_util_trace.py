@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+import logging
+from unittest import TestCase, main
+
+from zmq import Context, PAIR  # pylint: disable-msg=E0611
+
+from dcamp.types.messages.control import CONTROL
+from dcamp.types.messages.topology import gen_uuid
+from dcamp.types.messages.data import DataBasic
+from dcamp.types.specs import EndpntSpec
+from dcamp.util.trace import MsgTracer, TracedSocket
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record.getMessage())
+
+
+class TestMsgTracer(TestCase):
+    def setUp(self):
+        self.handler = ListHandler()
+        self.logger = logging.getLogger('dcamp.test.trace')
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.control = CONTROL('stop', EndpntSpec('local', 9090), gen_uuid())
+        self.data = DataBasic(EndpntSpec('local', 9090),
+                              {'type': 'basic', 'detail': 'test', 'config-name': 'test',
+                               'config-seqid': 0},
+                              time=1384321742000, value=1.0)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_sampling(self):
+        t = MsgTracer(self.logger)
+        for _ in range(3):
+            t.trace('S', self.control)
+        for _ in range(DataBasic.trace_every + 1):
+            t.trace('R', self.data)
+
+        self.assertEqual(['S:CONTROL'] * 3 +
+                         ['R:DataBasic (1)',
+                          'R:DataBasic (%d)' % (DataBasic.trace_every + 1)],
+                         self.handler.records)
+
+    def test_per_type(self):
+        t = MsgTracer(self.logger, every={'CONTROL': 2, 'DataBasic': 1})
+        for _ in range(3):
+            t.trace('S', self.control)
+            t.trace('S', self.data)
+        self.assertEqual(['S:CONTROL (1)', 'S:DataBasic', 'S:DataBasic', 'S:CONTROL (3)',
+                          'S:DataBasic'], self.handler.records)
+
+    def test_defaults(self):
+        # process-wide options apply to tracers without their own
+        (MsgTracer.EVERY, MsgTracer.VERBOSE) = ({'CONTROL': 2}, True)
+        try:
+            t = MsgTracer(self.logger)
+            for _ in range(2):
+                t.trace('S', self.control)
+            MsgTracer(self.logger, every={}, verbose=False).trace('S', self.control)
+        finally:
+            (MsgTracer.EVERY, MsgTracer.VERBOSE) = ({}, False)
+
+        self.assertEqual('S:CONTROL (1)', self.handler.records[0])
+        self.assertGreater(len(self.handler.records), 2)
+        self.assertEqual('S:CONTROL', self.handler.records[-1])
+
+    def test_level(self):
+        self.logger.setLevel(logging.INFO)
+        t = MsgTracer(self.logger, verbose=True)
+        t.trace('S', self.control)
+        self.assertEqual([], self.handler.records)
+
+    def test_socket(self):
+        ctx = Context.instance()
+        a = ctx.socket(PAIR, socket_class=TracedSocket)
+        a.tracer = MsgTracer(self.logger)
+        b = ctx.socket(PAIR)
+        try:
+            a.bind('inproc://test-trace')
+            b.connect('inproc://test-trace')
+            self.control.send(a)
+            self.control.send(b)
+            self.assertEqual('stop', CONTROL.recv(a).command)
+        finally:
+            a.close()
+            b.close()
+
+        # untraced socket uses the default tracer, not this one
+        self.assertEqual(['S:CONTROL', 'R:CONTROL'], self.handler.records)
+
+
+if __name__ == '__main__':
+    main()